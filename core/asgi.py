@@ -2,6 +2,14 @@
 ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Under ASGI the leaderboard, game history, wallet and profile reads are served
+by native async views (core.asgi_urls), so an in-flight request does not hold
+a worker thread while it waits on the database.
+The live leaderboard stream (Server-Sent Events) is only available here.
+
+Run it with an ASGI server, e.g.:
+
+    uvicorn core.asgi:application --host 0.0.0.0 --port 8000 --workers 4
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -11,6 +19,6 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings_asgi')
 
 application = get_asgi_application()
@@ -0,0 +1,23 @@
+"""
+URLconf for the ASGI deployment (core.settings_asgi).
+
+The hot read endpoints are served by native async views; everything else
+falls through to the regular URLconf in core.urls. Non-GET methods on the
+overridden paths are delegated to the original DRF views.
+"""
+from django.urls import path
+
+from core.urls import handler404, handler500, urlpatterns as sync_urlpatterns
+from src.api.v1.game.async_views import (
+    AsyncGameHistoryListView, AsyncLeaderboardStreamView, AsyncLeaderboardView
+)
+from src.api.v1.user.async_views import AsyncUserProfileAPIView, AsyncUserWalletAPIView
+
+urlpatterns = [
+    path('api/v1/game/list/', AsyncGameHistoryListView.as_view()),
+    path('api/v1/game/leaderboard/', AsyncLeaderboardView.as_view()),
+    # Server-Sent Events; only served under ASGI
+    path('api/v1/game/leaderboard/stream/', AsyncLeaderboardStreamView.as_view()),
+    path('api/v1/user/wallet/', AsyncUserWalletAPIView.as_view()),
+    path('api/v1/user/profile/', AsyncUserProfileAPIView.as_view()),
+] + sync_urlpatterns
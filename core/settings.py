@@ -1,5 +1,6 @@
 from pathlib import Path
 import environ
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 env = environ.Env(DEBUG=(bool, True))
@@ -88,12 +89,14 @@ INSTALLED_APPS = [
     "django_extensions",
 
     # Local apps
+    "src.commons",
     "src.services.user",
     "src.services.game",
 
 ]
 
 MIDDLEWARE = [
+    "src.commons.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
 
@@ -103,6 +106,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
+    "src.commons.middleware.ReplicaPinningMiddleware",
 
 ]
 
@@ -152,7 +156,44 @@ else:
         }
     }
 
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# ====================================================================================== READ REPLICAS
+# Leaderboard/history/download-page reads may be served by replicas (see src/commons/db_router.py).
+# Server: one replica per host in DB_REPLICA_HOSTS, same credentials as the primary.
+# Local: LOCAL_REPLICA=True adds a second SQLite file, filled by `manage.py sync_local_replica`.
+if ENVIRONMENT == "server":
+    for i, host in enumerate(env.list("DB_REPLICA_HOSTS", default=[]), start=1):
+        DATABASES[f"replica_{i}"] = {
+            **DATABASES["default"],
+            "HOST": host,
+            "PORT": env("DB_REPLICA_PORT", default=DATABASES["default"]["PORT"]),
+            "TEST": {"MIRROR": "default"},
+        }
+elif env.bool("LOCAL_REPLICA", default=False):
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.replica.sqlite3",
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["src.commons.db_router.ReadReplicaRouter"]
+REPLICA_MAX_LAG_SECONDS = env.float("REPLICA_MAX_LAG_SECONDS", default=5.0)
+REPLICA_PIN_SECONDS = env.int("REPLICA_PIN_SECONDS", default=10)
+
+# Mail is queued (OutboundEmail) and delivered by `manage.py send_queued_mail` through
+# EMAIL_DELIVERY_BACKEND – e.g. django.core.mail.backends.filebased.EmailBackend locally.
+# EMAIL_QUEUE=False sends inside the request again (src/commons/mail.py).
+EMAIL_DELIVERY_BACKEND = env("EMAIL_DELIVERY_BACKEND", default="django.core.mail.backends.smtp.EmailBackend")
+EMAIL_BACKEND = (
+    "src.commons.mail.QueuedEmailBackend" if env.bool("EMAIL_QUEUE", default=True)
+    else EMAIL_DELIVERY_BACKEND
+)
+EMAIL_QUEUE_BATCH_SIZE = env.int("EMAIL_QUEUE_BATCH_SIZE", default=50)
+EMAIL_QUEUE_MAX_ATTEMPTS = env.int("EMAIL_QUEUE_MAX_ATTEMPTS", default=6)
+# First retry delay; doubles on every further failure
+EMAIL_QUEUE_RETRY_SECONDS = env.int("EMAIL_QUEUE_RETRY_SECONDS", default=60)
+EMAIL_FILE_PATH = env("EMAIL_FILE_PATH", default=str(BASE_DIR / "sent_emails"))
+EMAIL_TIMEOUT = env.int("EMAIL_TIMEOUT", default=20)
 EMAIL_USE_TLS = True
 EMAIL_PORT = env("EMAIL_PORT")
 EMAIL_HOST = env("EMAIL_HOST")
@@ -192,8 +233,64 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ],
 }
-
-
+# orjson-backed JSON renderer/parser, same output as DRF's except floats below 1e-4 or from
+# 1e16 (same value, orjson spelling) and NaN/infinity (null instead of an error) –
+# see src/commons/renderers.py
+if env.bool("FAST_JSON", default=True):
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = [
+        "src.commons.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ]
+    REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"] = [
+        "src.commons.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ]
+
+# ====================================================================================== OPENAPI SCHEMA
+# Generated at deploy by `manage.py generate_openapi_schema` and served from disk (see src/api/schema.py).
+OPENAPI_SCHEMA_DIR = env("OPENAPI_SCHEMA_DIR", default=str(BASE_DIR / "openapi"))
+SWAGGER_SETTINGS = {"SPEC_URL": ("schema-json", {"format": ".json"})}
+REDOC_SETTINGS = {"SPEC_URL": ("schema-json", {"format": ".json"})}
+
+# ====================================================================================== CACHE
+# Shared tier of the TieredCache (src/commons/cache.py), also used for replica pinning.
+# Redis in production (CACHE_URL=redis://host:6379/1). The locmem default is per process;
+# filecache:///path shares it between local workers.
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+if ENVIRONMENT == "server" and CACHES["default"]["BACKEND"].endswith(".LocMemCache"):
+    # Invalidations (profile rows, wallets, seasons), read-your-writes pins and the live
+    # stream's page generation would stay in the worker that wrote them
+    raise ImproperlyConfigured("CACHE_URL must name a cache shared by all workers (e.g. Redis) on the server.")
+# Entries per namespace in the per-process L1
+TIERED_CACHE_L1_SIZE = env.int("TIERED_CACHE_L1_SIZE", default=1024)
+
+# Live leaderboard stream (ASGI): seconds between checks for new results – at most
+# one recompute per streamed page per interval (src/services/game/live.py)
+LEADERBOARD_STREAM_INTERVAL = env.float("LEADERBOARD_STREAM_INTERVAL", default=2.0)
+# Seconds leaderboard pages and "my rank" may lag behind new games, served from a
+# per-worker in-memory snapshot of each period (src/services/game/ranks.py);
+# 0 reads them from the database
+LEADERBOARD_RANKS_MAX_AGE = env.float("LEADERBOARD_RANKS_MAX_AGE", default=0)
+
+# ====================================================================================== GAME HISTORY
+# Games older than this many days are rolled up into daily per-player summaries by
+# `manage.py compact_game_history` (src/services/game/summaries.py)
+GAME_HISTORY_RETENTION_DAYS = env.int("GAME_HISTORY_RETENTION_DAYS", default=90)
+
+# ====================================================================================== COUNTERS
+# Rows per hot counter (wallet coins, game points), e.g. 8 during a referral campaign;
+# 0 keeps every increment on the main row. While set, run `manage.py fold_counter_shards`
+# periodically – and once more after unsetting it (src/services/user/counters.py)
+COUNTER_SHARDS = env.int("COUNTER_SHARDS", default=0)
+
+# ====================================================================================== METRICS
+# Prometheus text format on /metrics. Latency is recorded for every request; query
+# count/time and N+1 detection only for a sampled share of requests.
+METRICS_SAMPLE_RATE = env.float("METRICS_SAMPLE_RATE", default=0.05)
+METRICS_N_PLUS_ONE_THRESHOLD = env.int("METRICS_N_PLUS_ONE_THRESHOLD", default=5)
+# Bearer token required by /metrics. When empty the endpoint is only served in DEBUG.
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
 
 
 if not DEBUG:
@@ -0,0 +1,45 @@
+"""
+Settings for the API-only WSGI workers.
+
+Same as core.settings without the admin and UI apps (jazzmin, crispy forms,
+drf_yasg, django_extensions, phonenumber_field), which cuts worker startup
+time and memory. Token-authenticated /api/v1/ calls also skip the session,
+CSRF, auth and messages middleware (see TokenAPIMiddleware); auth
+endpoints and browser pages keep the full stack.
+
+    gunicorn core.wsgi --env DJANGO_SETTINGS_MODULE=core.settings_api
+
+Compare with the full profile: python manage.py bench_profiles
+"""
+from core.settings import *  # noqa: F401,F403
+from core.settings import INSTALLED_APPS
+
+UI_APPS = [
+    "jazzmin",
+    "django.contrib.admin",
+    "crispy_forms",
+    "crispy_bootstrap5",
+    "drf_yasg",
+    "django_extensions",
+    "phonenumber_field",
+]
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in UI_APPS]
+
+SESSION_STACK_MIDDLEWARE = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+]
+TOKEN_API_PATH_PREFIXES = ["/api/v1/"]
+
+MIDDLEWARE = [
+    "src.commons.middleware.RequestMetricsMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "src.commons.middleware.TokenAPIMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # allauth refuses to start unless this is listed here directly; it only sets request.allauth
+    "allauth.account.middleware.AccountMiddleware",
+    "src.commons.middleware.ReplicaPinningMiddleware",
+]
@@ -0,0 +1,7 @@
+"""
+Settings for the ASGI deployment (see core/asgi.py).
+Same as core.settings, with the hot read endpoints routed to async views.
+"""
+from core.settings import *  # noqa: F401,F403
+
+ROOT_URLCONF = "core.asgi_urls"
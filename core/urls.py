@@ -1,8 +1,8 @@
 from src.commons.handlers import handler404, handler500
-from src.commons.views import DownloadPageView, PasswordResetConfirmPageView, EmailConfirmPageView, AccountDeletionPageView
+from src.commons.views import DownloadPageView, PasswordResetConfirmPageView, EmailConfirmPageView, AccountDeletionPageView, MetricsView
 from core.settings import MEDIA_ROOT, STATIC_ROOT
 
-from django.contrib import admin
+from django.apps import apps
 from django.urls import path, include, re_path
 from django.views.static import serve
 from django.views.generic import RedirectView
@@ -12,7 +12,6 @@ handler404 = handler404
 handler500 = handler500
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('api/', include('src.api.urls')),
 
     # Email confirmation – branded page (must be BEFORE accounts/ include)
@@ -33,10 +32,19 @@ urlpatterns = [
     # Account deletion page (Google Play Data Safety requirement)
     path('jolpuzzles/delete-account/', AccountDeletionPageView.as_view(), name='delete_account'),
 
+    # Prometheus metrics (see src/commons/metrics.py)
+    path('metrics', MetricsView.as_view(), name='metrics'),
+
     # Redirect root to download page
     path('', RedirectView.as_view(url='/download/', permanent=False)),
 ]
 
+# Not installed in the API-only profile (core/settings_api.py)
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
+
 urlpatterns += [
     re_path(r'^media/(?P<path>.*)$', serve, {'document_root': MEDIA_ROOT}),
     re_path(r'^static/(?P<path>.*)$', serve, {'document_root': STATIC_ROOT}),
@@ -5,6 +5,7 @@ from dj_rest_auth.registration.views import SocialLoginView, SocialConnectView
 from dj_rest_auth.serializers import LoginSerializer
 from dj_rest_auth.views import LoginView
 from django.contrib.auth import authenticate
+from django.db import transaction
 from rest_framework import permissions, status
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
@@ -12,6 +13,7 @@ from rest_framework.views import APIView
 
 from core.settings import GOOGLE_CALLBACK_ADDRESS, APPLE_CALLBACK_ADDRESS
 from src.api.auth.serializer import PasswordSerializer
+from src.services.user.deletion import schedule_account_deletion
 
 class GoogleLogin(SocialLoginView):
     """ Handles Google social login """
@@ -89,7 +91,7 @@ class DeactivateUserAPIView(APIView):
 
 
 class DeleteUserAPIView(APIView):
-    """ Delete user account """
+    """ Delete user account – deactivates it and queues the data for chunked deletion """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = PasswordSerializer
 
@@ -109,9 +111,17 @@ class DeleteUserAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        request.user.delete()
+        # Deactivate now, remove the data in the background (see process_account_deletions)
+        with transaction.atomic():
+            request.user.is_active = False
+            request.user.save(update_fields=['is_active'])
+            Token.objects.filter(user=request.user).delete()
+            deletion = schedule_account_deletion(request.user)
 
         return Response(
-            data={'message': 'User account has been deleted'},
-            status=status.HTTP_200_OK
+            data={
+                'message': 'User account has been scheduled for deletion',
+                'due_at': deletion.due_at,
+            },
+            status=status.HTTP_202_ACCEPTED
         )
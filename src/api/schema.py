@@ -1,23 +1,165 @@
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+import gzip
+import hashlib
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.test import RequestFactory
 from django.urls import path, re_path
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.views import View
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.renderers import ReDocRenderer, SwaggerUIRenderer
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+from rest_framework.request import Request
+
+SCHEMA_VERSION = "v1"
+
+schema_info = openapi.Info(
+    title="JOl Game API",
+    default_version=SCHEMA_VERSION,
+    description="API documentation for Jaaloo backend",
+    terms_of_service="https://www.example.com/terms/",
+    contact=openapi.Contact(email="contact@example.com"),
+    license=openapi.License(name="BSD License"),
+)
 
 schema_view = get_schema_view(
-    openapi.Info(
-        title="JOl Game API",
-        default_version='v1',
-        description="API documentation for Jaaloo backend",
-        terms_of_service="https://www.example.com/terms/",
-        contact=openapi.Contact(email="contact@example.com"),
-        license=openapi.License(name="BSD License"),
-    ),
+    schema_info,
     public=True,
     permission_classes=[permissions.AllowAny],
 )
 
+# ====================================================================================== SCHEMA ARTIFACTS
+# The schema is generated once (`manage.py generate_openapi_schema`, run at deploy)
+# into OPENAPI_SCHEMA_DIR, plain and gzipped, and served from there. Introspecting
+# every view and serializer per request is too slow for clients that poll it.
+
+ARTIFACT_FORMATS = {
+    "json": (OpenAPICodecJson, "application/json"),
+    "yaml": (OpenAPICodecYaml, "application/yaml"),
+}
+CACHE_SECONDS = 300
+
+_accepts_gzip = re.compile(r"\bgzip\b")
+_artifacts = {}  # format -> (mtime, body, gzipped body, etag)
+
+
+def artifact_path(fmt):
+    return Path(settings.OPENAPI_SCHEMA_DIR) / f"openapi-{SCHEMA_VERSION}.{fmt}"
+
+
+def _write_atomic(path, data):
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def generate_schema_artifacts():
+    """Generate the schema and write every format, plain and gzipped. Returns the written paths."""
+    # Views introspect self.request (e.g. get_serializer_class), so generate for an anonymous GET
+    request = Request(RequestFactory().get(
+        "/api/swagger.json", HTTP_HOST=settings.DOMAIN, secure=settings.PROTOCOL == "https"
+    ))
+    generator = schema_view.generator_class(schema_info, SCHEMA_VERSION, url=settings.BASE_URL)
+    schema = generator.get_schema(request=request, public=True)
+
+    Path(settings.OPENAPI_SCHEMA_DIR).mkdir(parents=True, exist_ok=True)
+    written = []
+    for fmt, (codec_class, _) in ARTIFACT_FORMATS.items():
+        body = codec_class(validators=[]).encode(schema)
+        path = artifact_path(fmt)
+        gz_path = path.with_name(path.name + ".gz")
+        _write_atomic(path, body)
+        # mtime=0 keeps the compressed file byte-identical between builds
+        _write_atomic(gz_path, gzip.compress(body, compresslevel=9, mtime=0))
+        written += [path, gz_path]
+
+    _artifacts.clear()
+    return written
+
+
+def load_artifact(fmt):
+    """
+    The artifact for `fmt` from memory, re-read when the file changes on disk
+    (a redeploy that regenerates it without restarting workers). None if missing.
+    """
+    path = artifact_path(fmt)
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+    cached = _artifacts.get(fmt)
+    if cached and cached[0] == mtime:
+        return cached
+
+    body = path.read_bytes()
+    gz_path = path.with_name(path.name + ".gz")
+    gzipped = gz_path.read_bytes() if gz_path.exists() else gzip.compress(body, mtime=0)
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    _artifacts[fmt] = cached = (mtime, body, gzipped, etag)
+    return cached
+
+
+class SchemaArtifactView(View):
+    """
+    GET /api/swagger.json, /api/swagger.yaml – the pre-generated schema, with an
+    ETag (304 on If-None-Match) and gzip when the client accepts it.
+    In DEBUG the schema is generated on first use and `?refresh=1` regenerates it.
+    """
+    def get(self, request, format):
+        fmt = format.lstrip(".")
+        if settings.DEBUG and (request.GET.get("refresh") or not artifact_path(fmt).exists()):
+            generate_schema_artifacts()
+
+        artifact = load_artifact(fmt)
+        if artifact is None:
+            return JsonResponse(
+                {"error": "API schema has not been generated. Run `manage.py generate_openapi_schema`."},
+                status=503
+            )
+
+        _, body, gzipped, etag = artifact
+        use_gzip = bool(_accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
+        etag = f'"{etag}-gz"' if use_gzip else f'"{etag}"'
+
+        response = HttpResponse(gzipped if use_gzip else body, content_type=ARTIFACT_FORMATS[fmt][1])
+        if use_gzip:
+            response["Content-Encoding"] = "gzip"
+        response["ETag"] = etag
+        patch_vary_headers(response, ("Accept-Encoding",))
+        patch_cache_control(response, public=True, max_age=CACHE_SECONDS)
+
+        return get_conditional_response(request, etag=etag, response=response)
+
+
+class SchemaUIView(View):
+    """
+    GET /api/ (Swagger UI), /api/docs/ (ReDoc) – drf_yasg's UI page without
+    generating the schema; the page fetches the artifact from SchemaArtifactView
+    (SWAGGER_SETTINGS/REDOC_SETTINGS["SPEC_URL"]).
+    """
+    renderer_class = None
+
+    def get(self, request):
+        renderer = self.renderer_class()
+        context = {"request": request, "view": self}
+        renderer.set_context(context)
+        context.update(title=schema_info.title, version=SCHEMA_VERSION)
+        return HttpResponse(
+            render_to_string(renderer.template, context, request),
+            content_type=f"{renderer.media_type}; charset={renderer.charset}"
+        )
+
+
 schema_urls = [
-    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    path('', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('docs/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    re_path(r'^swagger(?P<format>\.json|\.yaml)$', SchemaArtifactView.as_view(), name='schema-json'),
+    path('', SchemaUIView.as_view(renderer_class=SwaggerUIRenderer), name='schema-swagger-ui'),
+    path('docs/', SchemaUIView.as_view(renderer_class=ReDocRenderer), name='schema-redoc'),
 ]
@@ -0,0 +1,399 @@
+"""
+Query budget and query plan regression suite.
+
+Every URL of src/api/v1/*/urls.py, src/api/auth/urls.py and core/urls.py is
+requested against a seeded dataset with empty caches, i.e. on the database
+path. Each endpoint has an exact query budget, and on SQLite every query is
+run through EXPLAIN QUERY PLAN: a pass over a table – also along one of its
+indexes – instead of an index lookup fails the test unless the table is listed
+in the endpoint's `scans`. New URLs must get a Case (or a
+SKIPPED reason) before the suite passes again.
+
+When a change legitimately alters an endpoint's queries, update its Case –
+the failure message lists the queries and their plans.
+"""
+import gzip
+import re
+import tempfile
+from dataclasses import dataclass, field
+from importlib import import_module
+from unittest import mock
+
+from django.contrib import admin
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLResolver, reverse
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from src.api import schema
+from src.commons.bench.dataset import BENCH_PASSWORD, seed
+from src.commons.cache import clear_local_caches
+from src.services.game import percentiles
+from src.services.game.models import GameHistory
+from src.services.user.models import User
+
+URLCONFS = ["src.api.v1.user.urls", "src.api.v1.game.urls", "src.api.auth.urls", "core.urls"]
+
+# Statements that only exist because the test runs inside a transaction
+_SAVEPOINT = re.compile(r"^\s*(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b", re.I)
+_ALIAS = re.compile(r'"(\w+)" (?:AS )?"?([A-Z]\d+)"?\b')
+# Every pass over a table, also along an index ("USING [COVERING] INDEX"); SEARCH is a lookup
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?")
+
+
+@dataclass
+class Case:
+    name: str                   # URL name ("namespace:name"), or the route of unnamed patterns
+    queries: int                # exact number of queries on a cold cache
+    method: str = "get"
+    kwargs: dict = field(default_factory=dict)   # URL kwargs; callables get the test case
+    data: object = None         # query string / body; a callable gets the test case
+    scans: tuple = ()           # tables this endpoint may read without an index
+    auth: bool = True
+    status: int = 200
+
+    def __str__(self):
+        return f"{self.method.upper()} {self.name}"
+
+
+# The compaction boundary (src/services/game/summaries.py): ORDER BY ... LIMIT 1 along its
+# index reads the last entry only, but SQLite reports the walk as a scan
+BOUNDARY = "game_gamehistorycompaction"
+# Period leaderboards aggregate every game of the period: a pass over the player-leading
+# covering index, not a lookup
+PERIOD_GAMES = "game_gamehistory"
+
+
+def _room_code(test):
+    return GameHistory.objects.exclude(room_code=None).values_list("room_code", flat=True).first()
+
+
+def _uid(test):
+    return urlsafe_base64_encode(force_str(test.user.pk).encode())
+
+
+CASES = [
+    # ------------------------------------------------------------------ /api/v1/user/
+    Case("user:user_retrieve_update", queries=1),
+    Case("user:user_profile_retrieve_update", queries=2),
+    Case("user:user_wallet_retrieve", queries=2),
+    Case("user:user_wallet_update", queries=4, method="post", data={"coins": 5, "type": "increment"}),
+    Case("user:user_wallet_redeem", queries=8, method="post", data={"coins": 1}),
+    Case("user:process_referral", queries=19, method="post", data={"referral_code": "B0000002"}),
+    Case("user:referral_network", queries=3),
+    Case("user:referral_leaderboard", queries=5),
+    # The handler500 page is rendered with status 200
+    Case("user:error_test", queries=1),
+
+    # ------------------------------------------------------------------ /api/v1/game/
+    # The game's season is looked up in the (few-row) season table at write time
+    Case("game:add-game", queries=7, method="post", status=201, scans=("game_season", BOUNDARY), data=lambda test: {
+        "match_id": "budget-1", "player_id": str(test.user.pk), "game_type": "solo",
+        "game_mode": "timed", "operation": "addition", "grid_size": 4,
+        "timestamp": "2025-01-01T00:00:00Z", "status": "completed",
+        "final_score": 42, "accuracy_percentage": 80.0, "completion_time": 60,
+    }),
+    Case("game:game-list", queries=3),
+    Case("game:stats", queries=3, scans=(BOUNDARY,)),
+    Case("game:stats", queries=2, data={"period": "this_week"}),
+    # all_time ranks every user: raw games since the boundary plus the daily summaries
+    Case("game:leaderboard", queries=4, scans=("user_user", BOUNDARY)),
+    Case("game:leaderboard", queries=3, scans=(PERIOD_GAMES,), data={"period": "today"}),
+    Case("game:leaderboard", queries=4, scans=(PERIOD_GAMES,),
+         data={"period": "this_month", "page": 2, "page_size": 10}),
+    # The open season is found among the (few-row) season table
+    Case("game:leaderboard", queries=3, scans=("game_season",), data={"period": "season"}),
+    Case("game:leaderboard", queries=2, status=404, data={"period": "season", "season": 1}),
+    Case("game:leaderboard", queries=2, status=404, data={"period": "this_month", "period_start": "2020-01-01"}),
+    Case("game:leaderboard-rank", queries=5, scans=("user_user", BOUNDARY)),
+    Case("game:leaderboard-rank", queries=5, scans=(PERIOD_GAMES,), data={"period": "this_month"}),
+    Case("game:percentile", queries=2, data={
+        "grid_size": 4, "operation": "addition", "game_mode": "timed", "score": 50,
+    }),
+    Case("game:room-results", queries=3, kwargs={"room_code": _room_code}),
+
+    # ------------------------------------------------------------------ /api/auth/
+    Case("rest_login", queries=9, method="post", auth=False,
+         data={"username": "bench1", "password": BENCH_PASSWORD}),
+    Case("rest_logout", queries=2, method="post"),
+    Case("rest_password_change", queries=5, method="post",
+         data={"new_password1": "an0ther-Passw0rd", "new_password2": "an0ther-Passw0rd"}),
+    Case("rest_password_reset", queries=5, method="post", auth=False, data={"email": "bench1@example.com"}),
+    Case("rest_password_reset_confirm", queries=1, method="post", auth=False, status=400,
+         kwargs={"uidb64": _uid, "token": "invalid-token"},
+         data=lambda test: {"uid": _uid(test), "token": "invalid-token",
+                            "new_password1": "an0ther-Passw0rd", "new_password2": "an0ther-Passw0rd"}),
+    Case("deactivate", queries=2, method="post", data={"password": BENCH_PASSWORD}),
+
+    # ------------------------------------------------------------------ core pages
+    Case("account_confirm_email", queries=1, auth=False, kwargs={"key": "invalid-key"}),
+    Case("download", queries=0, auth=False),
+    Case("download", queries=1, auth=False, data={"refcode": "B0000003"}),
+    Case("download", queries=3, method="post", auth=False, data={"refcode": "B0000003"}),
+    Case("password_reset_confirm", queries=1, auth=False, kwargs={"uidb64": _uid, "token": "invalid-token"}),
+    Case("delete_account", queries=0, auth=False),
+    Case("metrics", queries=3, auth=False),
+    Case("", queries=0, auth=False, status=302),
+    # Missing files get the handler404 page, rendered with status 200
+    Case("^media/(?P<path>.*)$", queries=0, auth=False, kwargs={"path": "missing.jpg"}),
+    Case("^static/(?P<path>.*)$", queries=0, auth=False, kwargs={"path": "missing.css"}),
+]
+
+# Admin changelists of the project's models (first page, superuser), by model label
+ADMIN_CHANGELISTS = {
+    "commons.outboundemail": 7,
+    "user.user": 7,
+    "user.userprofile": 7,
+    "user.userwallet": 9,
+    "user.pendingreferral": 7,
+    "user.accountdeletionrequest": 8,
+    "game.gamehistory": 7,
+    "game.playerdailysummary": 9,
+    "game.gamehistorycompaction": 7,
+    "game.scoredistribution": 7,
+    "game.season": 7,
+    "game.seasonpoints": 8,
+    "game.leaderboardsnapshot": 9,
+}
+
+SKIPPED = {
+    "google_login": "exchanges the access token with Google",
+    "google_connect": "exchanges the access token with Google",
+}
+
+
+def url_patterns():
+    """(key, pattern) of every view pattern in URLCONFS; includes are covered by their own module."""
+    for module_name in URLCONFS:
+        module = import_module(module_name)
+        app_name = getattr(module, "app_name", None)
+        for pattern in module.urlpatterns:
+            if isinstance(pattern, URLResolver):
+                continue
+            if pattern.name:
+                yield (f"{app_name}:{pattern.name}" if app_name else pattern.name), pattern
+            else:
+                yield str(pattern.pattern), pattern
+
+
+def _resolve(value, test):
+    return value(test) if callable(value) else value
+
+
+def _path(case, test):
+    kwargs = {key: _resolve(value, test) for key, value in case.kwargs.items()}
+    for key, pattern in url_patterns():
+        if key == case.name and not pattern.name:
+            # Unnamed pattern: fill the regex groups by hand
+            path = "/" + str(pattern.pattern).strip("^$")
+            for name, value in kwargs.items():
+                path = re.sub(rf"\(\?P<{name}>[^)]*\)", value, path)
+            return path
+    return reverse(case.name, kwargs=kwargs)
+
+
+def full_scans(sql):
+    """Tables `sql` scans rather than searches, per EXPLAIN QUERY PLAN (SQLite only)."""
+    aliases = {alias: table for table, alias in _ALIAS.findall(sql)}
+    tables = set(connection.introspection.table_names())
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        plan = [row[-1] for row in cursor.fetchall()]
+        # Subqueries reuse aliases (U0, V0, ...); the index scanned names the table
+        cursor.execute("SELECT name, tbl_name FROM sqlite_master WHERE type = 'index'")
+        indexes = dict(cursor.fetchall())
+    scans = []
+    for line in plan:
+        match = _SQLITE_SCAN.match(line)
+        if match:
+            name, index = match.groups()
+            table = indexes.get(index) or aliases.get(name, name)
+            # Derived tables ("SCAN subquery") are already-filtered rows, not table reads
+            if table in tables:
+                scans.append(table)
+    return scans, plan
+
+
+@override_settings(METRICS_TOKEN="budget-token")
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        dataset = seed(users=30, games=600, pending_referrals=20)
+        cls.user = User.objects.get(pk=dataset.user_ids[0])
+        cls.token = dataset.tokens[0]
+        percentiles.refresh()
+
+    def request(self, case):
+        client = APIClient(raise_request_exception=False)
+        headers = {}
+        if case.auth:
+            headers["HTTP_AUTHORIZATION"] = f"Token {self.token}"
+        if case.name == "metrics":
+            headers["HTTP_AUTHORIZATION"] = "Bearer budget-token"
+
+        path = _path(case, self)
+        data = _resolve(case.data, self)
+        caches["default"].clear()
+        clear_local_caches()
+        with CaptureQueriesContext(connection) as captured:
+            if case.method == "get":
+                response = client.get(path, data, secure=True, **headers)
+            else:
+                response = getattr(client, case.method)(path, data, format="json", secure=True, **headers)
+        queries = [q["sql"] for q in captured.captured_queries if not _SAVEPOINT.match(q["sql"])]
+        return response, queries
+
+    def report(self, queries):
+        lines = []
+        for index, sql in enumerate(queries, 1):
+            lines.append(f"{index}. {sql}")
+            if connection.vendor == "sqlite" and not sql.lstrip().upper().startswith("INSERT"):
+                lines += [f"     {step}" for step in full_scans(sql)[1]]
+        return "\n".join(lines)
+
+    def admin_models(self):
+        return [model for model in admin.site._registry if model.__module__.startswith("src.")]
+
+    def test_every_url_has_a_case(self):
+        covered = {case.name for case in CASES} | set(SKIPPED)
+        missing = [key for key, _ in url_patterns() if key not in covered]
+        self.assertEqual(missing, [], "Add a Case (or a SKIPPED reason) for these URLs")
+
+        missing = [model._meta.label_lower for model in self.admin_models()
+                   if model._meta.label_lower not in ADMIN_CHANGELISTS]
+        self.assertEqual(missing, [], "Add these admin changelists to ADMIN_CHANGELISTS")
+
+    def test_admin_changelists(self):
+        """A list_display FK without list_select_related costs a query per row."""
+        superuser = User.objects.create(username="budget-admin", email="budget-admin@example.com",
+                                        is_staff=True, is_superuser=True)
+        self.client.force_login(superuser)
+        for model in self.admin_models():
+            label = model._meta.label_lower
+            with self.subTest(label):
+                url = reverse(f"admin:{model._meta.app_label}_{model._meta.model_name}_changelist")
+                with CaptureQueriesContext(connection) as captured:
+                    response = self.client.get(url, secure=True)
+                queries = [q["sql"] for q in captured.captured_queries if not _SAVEPOINT.match(q["sql"])]
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(queries), ADMIN_CHANGELISTS[label], self.report(queries))
+
+    def test_query_budgets(self):
+        for case in CASES:
+            with self.subTest(str(case), data=case.data if not callable(case.data) else None):
+                with transaction.atomic():
+                    response, queries = self.request(case)
+                    self.assertEqual(response.status_code, case.status, self.report(queries))
+                    self.assertEqual(len(queries), case.queries, self.report(queries))
+
+                    if connection.vendor == "sqlite":
+                        unexpected, offending = [], []
+                        for sql in queries:
+                            if sql.lstrip().upper().startswith("INSERT"):
+                                continue
+                            scans = [table for table in full_scans(sql)[0] if table not in case.scans]
+                            if scans:
+                                unexpected += scans
+                                offending.append(sql)
+                        self.assertEqual(unexpected, [], f"Full scan in:\n{self.report(offending)}")
+                    transaction.set_rollback(True)
+
+
+@override_settings(ROOT_URLCONF="core.asgi_urls")
+class AsyncURLConfTests(TestCase):
+    """Writes to the paths core.asgi_urls serves with async views fall through to the DRF views."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="asgi-user", email="asgi-user@example.com")
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        caches["default"].clear()
+        clear_local_caches()
+        # Token clients send no CSRF token; the check must not apply to them
+        self.client = APIClient(enforce_csrf_checks=True)
+
+    def test_token_writes(self):
+        headers = {"HTTP_AUTHORIZATION": f"Token {self.token.key}"}
+        response = self.client.patch("/api/v1/user/profile/", {"bio": "patched"}, format="json", secure=True, **headers)
+        self.assertEqual(response.status_code, 200, response.content)
+        response = self.client.put("/api/v1/user/profile/", {"bio": "put", "location": "here"}, format="json",
+                                   secure=True, **headers)
+        self.assertEqual(response.status_code, 200, response.content)
+
+        profile = self.client.get("/api/v1/user/profile/", secure=True, **headers).json()
+        self.assertEqual((profile["bio"], profile["location"]), ("put", "here"))
+
+    def test_session_writes_still_need_csrf(self):
+        self.client.force_login(self.user)
+        response = self.client.patch("/api/v1/user/profile/", {"bio": "patched"}, format="json", secure=True)
+        self.assertEqual(response.status_code, 403)
+        self.assertIn("CSRF", response.json()["detail"])
+
+
+class SchemaTests(TestCase):
+    """The schema is generated once; neither the artifact nor the UI pages introspect the views."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        settings = override_settings(OPENAPI_SCHEMA_DIR=directory.name, DEBUG=False)
+        settings.enable()
+        cls.addClassCleanup(settings.disable)
+        schema.generate_schema_artifacts()
+
+    def setUp(self):
+        patcher = mock.patch.object(
+            schema.schema_view.generator_class, "get_schema", side_effect=AssertionError("schema generated")
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.url = reverse("schema-json", kwargs={"format": ".json"})
+
+    def test_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Content-Encoding", response)
+        self.assertIn(b'"swagger": "2.0"', response.content)
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertIn("max-age=300", response["Cache-Control"])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_gzip(self):
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="br, gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        # A distinct representation, so it gets its own ETag
+        self.assertNotEqual(response["ETag"], plain["ETag"])
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+        yaml = self.client.get(reverse("schema-json", kwargs={"format": ".yaml"}))
+        self.assertEqual(yaml["Content-Type"], "application/yaml")
+
+    def test_not_generated(self):
+        with override_settings(OPENAPI_SCHEMA_DIR=tempfile.mkdtemp()):
+            self.assertEqual(self.client.get(self.url).status_code, 503)
+
+    def test_ui_pages(self):
+        for name, marker in (("schema-swagger-ui", b"swagger-settings"), ("schema-redoc", b"redoc-settings")):
+            with self.subTest(name):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(marker, response.content)
+                self.assertIn(self.url.encode(), response.content)
+                self.assertIn(schema.schema_info.title.encode(), response.content)
@@ -1,8 +1,14 @@
+from django.apps import apps
 from django.urls import path, include
-from .schema import schema_urls
 
 urlpatterns = [
     path("auth/", include("src.api.auth.urls")),
     path("auth/registration/", include("dj_rest_auth.registration.urls")),
     path("v1/", include("src.api.v1.urls")),
-] + schema_urls
+]
+
+# drf_yasg is not installed in the API-only profile (core/settings_api.py)
+if apps.is_installed("drf_yasg"):
+    from .schema import schema_urls
+
+    urlpatterns += schema_urls
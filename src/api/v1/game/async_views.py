@@ -0,0 +1,136 @@
+from functools import partial
+
+from django.http import StreamingHttpResponse
+
+from src.api.views import AsyncAPIView
+from src.commons.db_router import replica_reads, use_replica
+from src.services.game import leaderboard, live, ranks, snapshots
+from src.services.game.models import GameHistory
+from src.services.game.standings import page_rows
+from src.services.user.cards import auser_cards
+from .serializers import game_history_plan
+from .views import GameHistoryListView, LeaderboardView, StandardResultsSetPagination
+
+
+class AsyncGameHistoryListView(AsyncAPIView):
+    """Async GET /api/v1/game/list/ – same payload as GameHistoryListView"""
+    fallback_view = GameHistoryListView.as_view()
+
+    @replica_reads
+    async def get(self, request):
+        queryset = (
+            GameHistory.objects.filter(player=request.user)
+            .order_by("-timestamp")
+            .values(*game_history_plan.columns)
+        )
+        page, error = await self.paginate(queryset, request, StandardResultsSetPagination)
+        if error:
+            return error
+
+        return self.render({
+            "count": page["count"],
+            "next": page["next"],
+            "previous": page["previous"],
+            "results": game_history_plan.many(page["items"]),
+        })
+
+
+async def leaderboard_page(period, page, page_size):
+    """The LeaderboardView payload for one page, through the page cache."""
+    offset = (page - 1) * page_size
+
+    async def build():
+        leaderboard_data = leaderboard.leaderboard_queryset(period)
+
+        total = await leaderboard_data.acount()
+        paginated = [item async for item in leaderboard_data[offset:offset + page_size]]
+
+        cards = await auser_cards([item["player"] for item in paginated])
+
+        return {
+            "period": period,
+            "count": total,
+            "page": page,
+            "page_size": page_size,
+            "results": leaderboard.build_results(paginated, cards, offset),
+        }
+
+    return await leaderboard.pages.aget_or_set((period, page, page_size), build)
+
+
+async def live_leaderboard_page(period, page, page_size):
+    """
+    leaderboard_page() for a live topic. It runs in the topic's task, after
+    the subscribing request returned and on behalf of every subscriber, so
+    it reads from a replica regardless of any one user's read-your-writes pin.
+    """
+    with use_replica():
+        return await leaderboard_page(period, page, page_size)
+
+
+class AsyncLeaderboardView(AsyncAPIView):
+    """Async GET /api/v1/game/leaderboard/ – same payload as LeaderboardView"""
+    fallback_view = LeaderboardView.as_view()
+
+    @replica_reads
+    async def get(self, request):
+        period = request.GET.get("period", "all_time")
+        if period not in leaderboard.PERIODS:
+            return self.render(
+                {"error": f"Invalid period. Use: {leaderboard.PERIODS}"},
+                status=400
+            )
+
+        page, page_size, offset = leaderboard.page_params(request.GET)
+
+        try:
+            key = snapshots.requested(period, request.GET)
+        except ValueError as e:
+            return self.render({"error": str(e)}, status=400)
+        if key is not None:
+            standings = await snapshots.afrozen_standings(*key)
+            if standings is None:
+                return self.render({"error": "No frozen standings for this period."}, status=404)
+            extra = snapshots.page_extra(*key)
+        else:
+            ranked = await ranks.acurrent(period)
+            standings, extra = (None, None) if ranked is None else (ranked.standings, {})
+        if standings is not None:
+            rows = page_rows(standings, offset, page_size)
+            return self.render({
+                "period": period,
+                **extra,
+                "count": len(standings),
+                "page": page,
+                "page_size": page_size,
+                "results": leaderboard.build_results(rows, await auser_cards([row["player"] for row in rows]), offset),
+            })
+
+        return self.render(await leaderboard_page(period, page, page_size))
+
+
+class AsyncLeaderboardStreamView(AsyncAPIView):
+    """
+    GET /api/v1/game/leaderboard/stream/?period=&page=&page_size= – Server-Sent Events.
+    A `snapshot` event with the LeaderboardView payload, then a `diff` event
+    ({"count", "changed": [rows], "removed_ranks": [...]}) whenever the page
+    changes, at most once per LEADERBOARD_STREAM_INTERVAL. Ids are sequence
+    numbers; a reconnecting client gets a fresh snapshot. ASGI only.
+    """
+
+    async def get(self, request):
+        period = request.GET.get("period", "all_time")
+        if period not in leaderboard.PERIODS:
+            return self.render(
+                {"error": f"Invalid period. Use: {leaderboard.PERIODS}"},
+                status=400
+            )
+
+        page, page_size, _ = leaderboard.page_params(request.GET)
+        events = live.broadcaster().stream(
+            (period, page, page_size), partial(live_leaderboard_page, period, page, page_size)
+        )
+        response = StreamingHttpResponse(events, content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # nginx: don't buffer the stream
+        return response
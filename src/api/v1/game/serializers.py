@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 
+from src.commons.serializers import ReadPlan
 from src.services.game.models import GameHistory
 
 User = get_user_model()
@@ -74,6 +75,32 @@ class GameHistorySerializer(serializers.ModelSerializer):
         ]
         read_only_fields = fields
 
+
+class RoomResultSerializer(serializers.ModelSerializer):
+    """One player's result in a room's standings; `player` is the user id."""
+
+    class Meta:
+        model = GameHistory
+        fields = [
+            "player", "match_id", "position", "total_players",
+            "status", "final_score", "points_earned",
+            "accuracy_percentage", "hints_used", "completion_time", "timestamp",
+        ]
+        read_only_fields = fields
+
+
+class PercentileQuerySerializer(serializers.Serializer):
+    """Query string of GET /api/v1/game/percentile/"""
+    grid_size = serializers.IntegerField(min_value=1)
+    operation = serializers.ChoiceField(choices=GameHistory.Operation.choices)
+    game_mode = serializers.ChoiceField(choices=GameHistory.GameMode.choices)
+    score = serializers.IntegerField(min_value=0)
+
+
+# Compiled read paths for the list endpoints: .values() rows -> serializer output
+game_history_plan = ReadPlan(GameHistorySerializer)
+room_result_plan = ReadPlan(RoomResultSerializer)
+
 class LeaderboardSerializer(serializers.Serializer):
     rank = serializers.IntegerField(read_only=True)
     user_id = serializers.CharField(source="user.id")
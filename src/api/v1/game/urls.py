@@ -1,11 +1,18 @@
 from django.urls import path
-from .views import AddGameHistoryView, GameHistoryListView, LeaderboardView
+from .views import (
+    AddGameHistoryView, GameHistoryListView, LeaderboardRankView, LeaderboardView, PercentileView,
+    PlayerStatsView, RoomResultsView,
+)
 
 app_name = "game"
 
 urlpatterns = [
     path("add-game/", AddGameHistoryView.as_view(), name="add-game"),
     path("list/", GameHistoryListView.as_view(), name="game-list"),
+    path("stats/", PlayerStatsView.as_view(), name="stats"),
 
     path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
+    path('leaderboard/me/', LeaderboardRankView.as_view(), name='leaderboard-rank'),
+    path('percentile/', PercentileView.as_view(), name='percentile'),
+    path('rooms/<str:room_code>/results/', RoomResultsView.as_view(), name='room-results'),
 ]
\ No newline at end of file
@@ -1,24 +1,33 @@
+from django.db import transaction
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
 
+from src.commons.db_router import replica_reads
+from src.services.game import leaderboard, percentiles, ranks, rooms, snapshots, summaries
 from src.services.game.models import GameHistory
-from .serializers import GameHistoryCreateSerializer, GameHistorySerializer
+from src.services.game.standings import page_rows
+from .serializers import (
+    GameHistoryCreateSerializer, GameHistorySerializer, PercentileQuerySerializer,
+    game_history_plan, room_result_plan,
+)
 
-from django.utils import timezone
-from django.db.models import Sum, When, Case, IntegerField, F
-from datetime import timedelta
-
-from src.services.user.models import UserProfile
-from django.db.models import Count
+from src.services.user.cards import user_cards
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = "page_size"
     max_page_size = 100
 
+def game_percentile(game):
+    """Share of players (in %) the game's score beats, None if not ranked."""
+    if game.status != GameHistory.Status.COMPLETED:
+        return None
+    ranking = percentiles.percentile(game.grid_size, game.operation, game.game_mode, game.final_score)
+    return ranking and ranking["percentile"]
+
 class AddGameHistoryView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -29,9 +38,12 @@ class AddGameHistoryView(APIView):
             context={"request": request}
         )
         if serializer.is_valid():
-            game = serializer.save()
-            out_ser = GameHistorySerializer(game)
-            return Response(out_ser.data, status=status.HTTP_201_CREATED)
+            # The game and its points together (src/services/game/reconcile.py)
+            with transaction.atomic():
+                game = serializer.save()
+            data = GameHistorySerializer(game).data
+            data["percentile"] = game_percentile(game)
+            return Response(data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class GameHistoryListView(APIView):
@@ -39,82 +51,175 @@ class GameHistoryListView(APIView):
     permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
 
+    @replica_reads
     def get(self, request):
-        queryset = GameHistory.objects.filter(player=request.user).order_by("-timestamp")
+        queryset = (
+            GameHistory.objects.filter(player=request.user)
+            .order_by("-timestamp")
+            .values(*game_history_plan.columns)
+        )
         paginator = self.pagination_class()
         page = paginator.paginate_queryset(queryset, request)
 
         if page is not None:
-            serializer = GameHistorySerializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
+            return paginator.get_paginated_response(game_history_plan.many(page))
 
-        serializer = GameHistorySerializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(game_history_plan.many(queryset))
 
 class LeaderboardView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @replica_reads
     def get(self, request):
         period = request.query_params.get("period", "all_time")
-        valid_periods = ["today", "this_week", "this_month", "all_time"]
-        if period not in valid_periods:
+        if period not in leaderboard.PERIODS:
             return Response(
-                {"error": f"Invalid period. Use: {valid_periods}"},
+                {"error": f"Invalid period. Use: {leaderboard.PERIODS}"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        page_size = min(int(request.query_params.get("page_size", 50)), 100)
-        page = max(int(request.query_params.get("page", 1)), 1)
-        offset = (page - 1) * page_size
-
-        now = timezone.now()
-        start_date = {
-            "today": now.replace(hour=0, minute=0, second=0, microsecond=0),
-            "this_week": now - timedelta(days=now.weekday()),
-            "this_month": now.replace(day=1, hour=0, minute=0, second=0, microsecond=0),
-            "all_time": None,
-        }.get(period)
-
-        qs = GameHistory.objects.all()
-
-        if start_date:
-            qs = qs.filter(timestamp__gte=start_date)
-
-        leaderboard_data = (
-            qs
-            .values("player")
-            .annotate(
-                period_points=Sum("points_earned"),  # ← NOW A REAL FIELD
-                games_played=Count("id")
+        page, page_size, offset = leaderboard.page_params(request.query_params)
+
+        try:
+            key = snapshots.requested(period, request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if key is not None:
+            # A closed period or season: a slice of its frozen standings
+            standings = snapshots.frozen_standings(*key)
+            if standings is None:
+                return Response({"error": "No frozen standings for this period."}, status=status.HTTP_404_NOT_FOUND)
+            extra = snapshots.page_extra(*key)
+        else:
+            # A slice of the in-memory snapshot, when LEADERBOARD_RANKS_MAX_AGE is set
+            ranked = ranks.current(period)
+            standings, extra = (None, None) if ranked is None else (ranked.standings, {})
+        if standings is not None:
+            rows = page_rows(standings, offset, page_size)
+            return Response({
+                "period": period,
+                **extra,
+                "count": len(standings),
+                "page": page,
+                "page_size": page_size,
+                "results": leaderboard.build_results(rows, user_cards([row["player"] for row in rows]), offset),
+            })
+
+        def build():
+            leaderboard_data = leaderboard.leaderboard_queryset(period)
+
+            total = leaderboard_data.count()
+            paginated = leaderboard_data[offset:offset + page_size]
+
+            cards = user_cards([item["player"] for item in paginated])
+
+            return {
+                "period": period,
+                "count": total,
+                "page": page,
+                "page_size": page_size,
+                "results": leaderboard.build_results(paginated, cards, offset)
+            }
+
+        return Response(leaderboard.pages.get_or_set((period, page, page_size), build))
+
+
+class LeaderboardRankView(APIView):
+    """
+    GET /api/v1/game/leaderboard/me/?period= - the user's rank, points and
+    percentile (share of players with fewer points) in the period's leaderboard.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @replica_reads
+    def get(self, request):
+        period = request.query_params.get("period", "all_time")
+        if period not in leaderboard.PERIODS:
+            return Response(
+                {"error": f"Invalid period. Use: {leaderboard.PERIODS}"},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            .order_by("-period_points")
-        )
 
-        total = leaderboard_data.count()
-        paginated = leaderboard_data[offset:offset + page_size]
-
-        user_ids = [item["player"] for item in paginated]
-        profiles = UserProfile.objects.filter(user_id__in=user_ids).select_related("user")
-        profile_map = {p.user_id: p for p in profiles}
-
-        results = []
-        for idx, item in enumerate(paginated):
-            profile = profile_map.get(item["player"])
-            if not profile:
-                continue
-            results.append({
-                "rank": offset + idx + 1,
-                "user_id": item["player"],
-                "username": profile.user.username,
-                "avatar": profile.avatar.url if profile.avatar else None,
-                "total_points": item["period_points"] or 0,
-                "games_played": item["games_played"],
-            })
+        rank = ranks.player_rank(period, request.user.pk)
+        if rank is None:
+            return Response({"error": "No games in this period."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"period": period, **rank})
+
+
+class RoomResultsView(APIView):
+    """GET /api/v1/game/rooms/<room_code>/results/ - standings of the room's latest match"""
+    permission_classes = [IsAuthenticated]
+
+    @replica_reads
+    def get(self, request, room_code):
+        def build():
+            match = rooms.latest_match(list(rooms.room_rows(room_code, room_result_plan.columns)))
+            if not match:
+                return None
+
+            cards = user_cards([row["player"] for row in match])
+
+            results = []
+            for result in room_result_plan.many(match):
+                card = cards.get(result["player"])
+                result["username"] = card and card.username
+                result["avatar"] = card and card.avatar
+                results.append(result)
+
+            total_players = match[0]["total_players"]
+            return {
+                "room_code": room_code,
+                "total_players": total_players,
+                "reported": len(results),
+                "complete": total_players is not None and len(results) >= total_players,
+                "results": results,
+            }
+
+        data = rooms.results.get_or_set(room_code, build)
+        if data is None:
+            return Response({"error": "No results for this room."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
+
+
+class PercentileView(APIView):
+    """
+    GET /api/v1/game/percentile/?grid_size=&operation=&game_mode=&score=
+    Share of players whose best score in that setting is below `score`, from
+    the periodically refreshed score histograms.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @replica_reads
+    def get(self, request):
+        query = PercentileQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        ranking = percentiles.percentile(**query.validated_data)
+        if ranking is None:
+            return Response(
+                {"error": "No score distribution for these settings yet."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(ranking)
+
+
+class PlayerStatsView(APIView):
+    """
+    GET /api/v1/game/stats/?period= - the user's totals and game counts per
+    grid size, operation, mode, type and status. Compacted games are counted
+    through their daily summaries.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @replica_reads
+    def get(self, request):
+        period = request.query_params.get("period", "all_time")
+        if period not in leaderboard.PERIODS:
+            return Response(
+                {"error": f"Invalid period. Use: {leaderboard.PERIODS}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        return Response({
-            "period": period,
-            "count": total,
-            "page": page,
-            "page_size": page_size,
-            "results": results
-        })
+        stats = summaries.player_stats(request.user, leaderboard.period_start(period))
+        return Response({"period": period, **stats})
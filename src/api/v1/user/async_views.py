@@ -0,0 +1,32 @@
+from src.api.views import AsyncAPIView
+from src.services.user.caches import profile_rows, wallets
+from src.services.user.models import UserProfile, UserWallet
+from .serializers import UserWalletSerializer, user_profile_plan
+from .views import UserProfileRetrieveUpdateAPIView, UserWalletAPIView
+
+
+class AsyncUserWalletAPIView(AsyncAPIView):
+    """Async GET /api/v1/user/wallet/ – same payload as UserWalletAPIView"""
+    fallback_view = UserWalletAPIView.as_view()
+
+    async def get(self, request):
+        async def fetch():
+            wallet, _ = await UserWallet.objects.aget_or_create(user=request.user)
+            return dict(UserWalletSerializer(wallet).data)
+
+        return self.render(await wallets.aget_or_set(request.user.pk, fetch))
+
+
+class AsyncUserProfileAPIView(AsyncAPIView):
+    """
+    Async GET /api/v1/user/profile/ – same payload as UserProfileRetrieveUpdateAPIView.
+    PATCH/PUT fall through to the DRF view.
+    """
+    fallback_view = UserProfileRetrieveUpdateAPIView.as_view()
+
+    async def get(self, request):
+        async def fetch():
+            return await UserProfile.objects.filter(user=request.user).values(*user_profile_plan.columns).aget()
+
+        row = await profile_rows.aget_or_set(request.user.pk, fetch)
+        return self.render(user_profile_plan.one(row, request))
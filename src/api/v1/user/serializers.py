@@ -1,4 +1,6 @@
 from rest_framework import serializers
+
+from src.commons.serializers import ReadPlan
 from src.services.user.models import User, UserWallet, UserProfile
 
 class CoinSerializer(serializers.Serializer):
@@ -48,6 +50,14 @@ class UserProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ['referral_code', 'referral_link', 'total_referrals', 'available_game_points']
 
 
+# GET /v1/profile/ reads a .values() row through this instead of the serializer
+user_profile_plan = ReadPlan(UserProfileSerializer, property_columns={
+    'referral_link': ('referral_code',),
+    # user_id: unfolded counter shards (src/services/user/counters.py)
+    'available_game_points': ('total_game_points', 'used_game_points', 'user_id'),
+})
+
+
 class UserProfileUpdateSerializer(serializers.ModelSerializer):
     """
     Serializer for updating user profile fields.
@@ -70,3 +80,12 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['pk', 'email', 'username', 'first_name', 'last_name']
         read_only_fields = ['pk', 'email']
+
+    def validate_username(self, value):
+        # Usernames are unique regardless of case (user_username_ci_unique)
+        taken = User.objects.filter(username__iexact=value)
+        if self.instance is not None:
+            taken = taken.exclude(pk=self.instance.pk)
+        if taken.exists():
+            raise serializers.ValidationError("A user with that username already exists.")
+        return value
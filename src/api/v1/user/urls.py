@@ -5,7 +5,7 @@ from .views import (
     UserWalletAPIView,
     UserWalletUpdateAPIView,
     ProcessReferralAPIView, ErrorTestAPIView,
-    RedeemPointsAPIView,
+    RedeemPointsAPIView, ReferralLeaderboardAPIView, ReferralNetworkAPIView,
 )
 
 app_name = 'user'
@@ -17,6 +17,8 @@ urlpatterns = [
     path( 'wallet/adjust/', UserWalletUpdateAPIView.as_view(), name='user_wallet_update'),
     path( 'wallet/redeem/', RedeemPointsAPIView.as_view(), name='user_wallet_redeem'),
     path( 'process-referral/',  ProcessReferralAPIView.as_view(), name='process_referral'),
+    path( 'referrals/', ReferralNetworkAPIView.as_view(), name='referral_network'),
+    path( 'referrals/leaderboard/', ReferralLeaderboardAPIView.as_view(), name='referral_leaderboard'),
 
     path( 'error/test/',  ErrorTestAPIView.as_view(), name='error_test'),
 ]
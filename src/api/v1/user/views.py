@@ -1,3 +1,5 @@
+import logging
+
 from rest_framework import permissions, status
 from rest_framework.generics import RetrieveUpdateAPIView
 from rest_framework.views import APIView
@@ -6,12 +8,18 @@ from rest_framework.response import Response
 from django.db import transaction
 from django.db.models import F
 
+from src.services.game.leaderboard import page_params
+from src.services.user import referrals
+from src.services.user.caches import invalidate_user, profile_rows, referral_code_owner, wallets
 from src.services.user.models import UserProfile
 from src.api.v1.user.serializers import (
-    CoinSerializer, UserSerializer, UserProfileSerializer, UserProfileUpdateSerializer, UserWalletSerializer
+    CoinSerializer, UserSerializer, UserProfileSerializer, UserProfileUpdateSerializer, UserWalletSerializer,
+    user_profile_plan
 )
 from src.api.v1.user.serializers import RedeemSerializer
 
+logger = logging.getLogger(__name__)
+
 # TODO: [heshhm] move this to commons model for easier access post launch
 CODE_OWNER_BONUS = 100   # CODE OWNER
 NEW_USER_BONUS = 50  # NEW USER
@@ -29,9 +37,10 @@ class UserWalletAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        wallet = request.user.get_wallet()
-        serializer = UserWalletSerializer(wallet)
-        return Response(serializer.data)
+        data = wallets.get_or_set(
+            request.user.pk, lambda: dict(UserWalletSerializer(request.user.get_wallet()).data)
+        )
+        return Response(data)
 
 
 class UserWalletUpdateAPIView(APIView):
@@ -80,6 +89,13 @@ class UserProfileRetrieveUpdateAPIView(RetrieveUpdateAPIView):
     def get_object(self):
         return self.request.user.profile
 
+    def retrieve(self, request, *args, **kwargs):
+        row = profile_rows.get_or_set(
+            request.user.pk,
+            lambda: UserProfile.objects.filter(user=request.user).values(*user_profile_plan.columns).get()
+        )
+        return Response(user_profile_plan.one(row, request))
+
 
 class UserRetrieveUpdateAPIView(RetrieveUpdateAPIView):
     """
@@ -118,103 +134,141 @@ class ProcessReferralAPIView(APIView):
         from django.utils import timezone
 
         user_id = request.user.id
-        print(f"\n>>> [REF] Starting referral process for User ID: {user_id}")
+        logger.debug(f"[REF] Starting referral process for User ID: {user_id}")
 
         new_user_profile = request.user.profile
 
         # If already referred, nothing to do
         if new_user_profile.referred_by:
-            print(f">>> [REF] User {user_id} already has referrer: {new_user_profile.referred_by.id}. Aborting.")
+            logger.debug(f"[REF] User {user_id} already has referrer: {new_user_profile.referred_by_id}. Aborting.")
             return Response({"message": "Referral processed successfully"})
 
         # Try IP-based lookup first
         client_ip = get_client_ip(request)
-        print(f">>> [REF] Client IP detected: {client_ip}")
+        logger.debug(f"[REF] Client IP detected: {client_ip}")
 
         pending = None
-        code_owner = None
+        code_owner_id = None
         attributed_via = None
 
         if client_ip:
-            pending = PendingReferral.objects.select_related('referrer_profile').filter(
+            pending = PendingReferral.objects.filter(
                 ip_address=client_ip,
                 redeemed_at__isnull=True
             ).order_by('-clicked_at').first()
 
         if pending:
             # Use the FK directly — no lookup needed
-            code_owner = pending.referrer_profile
+            code_owner_id = pending.referrer_profile_id
             attributed_via = 'ip'
-            print(f">>> [REF] Found PendingReferral via IP. ID: {pending.id}, Referrer: {code_owner.user_id}")
+            logger.debug(f"[REF] Found PendingReferral via IP. ID: {pending.id}, Referrer profile: {code_owner_id}")
         else:
             # Fallback: explicit referral_code in body
             raw_code = request.data.get('referral_code', '').strip().upper()
-            print(f">>> [REF] No IP match. Attempting manual code: '{raw_code}'")
+            logger.debug(f"[REF] No IP match. Attempting manual code: '{raw_code}'")
 
             if raw_code:
-                try:
-                    code_owner = UserProfile.objects.get(referral_code=raw_code)
+                owner = referral_code_owner(raw_code)
+                if owner:
+                    code_owner_id = owner["profile_id"]
                     attributed_via = 'code'
-                    print(f">>> [REF] Manual code owner found. Owner User ID: {code_owner.user_id}")
-                except UserProfile.DoesNotExist:
-                    print(f">>> [REF] Manual code '{raw_code}' does not exist in DB.")
+                    logger.debug(f"[REF] Manual code owner found. Owner User ID: {owner['user_id']}")
+                else:
+                    logger.debug(f"[REF] Manual code '{raw_code}' does not exist in DB.")
 
-        if not code_owner:
-            print(">>> [REF] No referral code present (neither IP nor manual). Exiting.")
+        if not code_owner_id:
+            logger.debug("[REF] No referral code present (neither IP nor manual). Exiting.")
             return Response({"message": "Referral processed successfully"})
 
-        # Prevent self-referral
-        if code_owner.id == new_user_profile.id:
-            print(f">>> [REF] Self-referral detected for user {user_id}. Aborting.")
+        # Prevent self-referral, and referrals by someone the user referred (directly or not)
+        if referrals.would_cycle(new_user_profile.id, code_owner_id):
+            logger.debug(f"[REF] Self-referral or referral cycle detected for user {user_id}. Aborting.")
             return Response({"message": "Referral processed successfully"})
 
         # Atomic update: credit referrer (if under limit) and mark pending as redeemed
         code_owner_rewarded = False
-        print(">>> [REF] Entering atomic transaction block...")
+        logger.debug("[REF] Entering atomic transaction block...")
 
         try:
             with transaction.atomic():
-                code_owner_locked = UserProfile.objects.select_for_update().get(id=code_owner.id)
-                print(f">>> [REF] Locked owner profile. Current referrals: {code_owner_locked.total_referrals}")
+                # Re-checked under the lock: a concurrent submit (other device, other referrer)
+                # may have linked the user since the check above
+                new_profile_locked = UserProfile.objects.select_for_update().get(id=new_user_profile.id)
+                if new_profile_locked.referred_by_id:
+                    logger.debug(f"[REF] User {user_id} was referred meanwhile by {new_profile_locked.referred_by_id}. Aborting.")
+                    return Response({"message": "Referral processed successfully"})
+
+                code_owner_locked = UserProfile.objects.select_for_update().get(id=code_owner_id)
+                logger.debug(f"[REF] Locked owner profile. Current referrals: {code_owner_locked.total_referrals}")
 
                 # Give referrer bonus if still under limit
                 if code_owner_locked.total_referrals < REFERRALS_LIMIT:
                     updated = UserProfile.objects.filter(
-                        id=code_owner.id, total_referrals__lt=REFERRALS_LIMIT
+                        id=code_owner_id, total_referrals__lt=REFERRALS_LIMIT
                     ).update(total_referrals=F('total_referrals') + 1)
+                    invalidate_user(code_owner_locked.user_id)
 
                     if updated and CODE_OWNER_BONUS > 0:
                         code_owner_locked.user.get_wallet().increment_coins(CODE_OWNER_BONUS)
                         code_owner_rewarded = True
-                        print(f">>> [REF] Owner credited with bonus: {CODE_OWNER_BONUS}")
+                        logger.debug(f"[REF] Owner credited with bonus: {CODE_OWNER_BONUS}")
                 else:
-                    print(f">>> [REF] Owner hit referral limit ({REFERRALS_LIMIT}). No bonus given.")
+                    logger.debug(f"[REF] Owner hit referral limit ({REFERRALS_LIMIT}). No bonus given.")
 
                 # Set referred_by on new user's profile
-                new_profile_locked = UserProfile.objects.select_for_update().get(id=new_user_profile.id)
                 new_profile_locked.referred_by = code_owner_locked
                 new_profile_locked.save()
-                print(f">>> [REF] Linked new user {user_id} to referrer {code_owner_locked.id}")
+                referrals.link(new_profile_locked.id, code_owner_locked.id)
+                logger.debug(f"[REF] Linked new user {user_id} to referrer {code_owner_locked.id}")
 
                 # If we matched via pending referral, mark it redeemed
                 if pending:
                     pending.redeemed_at = timezone.now()
                     pending.redeemed_by = request.user
                     pending.save()
-                    print(f">>> [REF] PendingReferral {pending.id} marked as redeemed.")
+                    logger.debug(f"[REF] PendingReferral {pending.id} marked as redeemed.")
 
             # Give bonus to new user only if referrer was rewarded
             if code_owner_rewarded and NEW_USER_BONUS > 0:
                 request.user.get_wallet().increment_coins(NEW_USER_BONUS)
-                print(f">>> [REF] New user {user_id} credited with join bonus: {NEW_USER_BONUS}")
+                logger.debug(f"[REF] New user {user_id} credited with join bonus: {NEW_USER_BONUS}")
 
-            print(">>> [REF] Referral process completed successfully.")
+            logger.debug("[REF] Referral process completed successfully.")
             return Response({"message": "Referral processed successfully", "attributed_via": attributed_via})
 
         except Exception as e:
-            print(f">>> [REF] ERROR: Referral process failed for user {user_id}: {e}")
+            logger.exception(f"[REF] Referral process failed for user {user_id}: {e}")
             return Response({"error": "Referral processing failed"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class ReferralNetworkAPIView(APIView):
+    """
+    Referral screen counts for the current user.
+    GET /v1/referrals/
+    Returns the number of people the user referred per level (1 = directly)
+    and in total.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        levels = referrals.level_counts(request.user.profile.pk)
+        return Response({"total": sum(level["referrals"] for level in levels), "levels": levels})
+
+
+class ReferralLeaderboardAPIView(APIView):
+    """
+    Leaderboard of the current user's referral network: the user, the people
+    who referred them and the people they referred, up to
+    referrals.NETWORK_DEPTH levels each way, ranked by total game points.
+    GET /v1/referrals/leaderboard/?page=&page_size=
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        page, page_size, offset = page_params(request.query_params)
+        count, results = referrals.network_leaderboard(request.user.profile.pk, page_size, offset)
+        return Response({"count": count, "page": page, "page_size": page_size, "results": results})
+
+
 class ErrorTestAPIView(APIView):
     """
     An endpoint to deliberately raise an exception for testing error logging.
@@ -257,7 +311,7 @@ class RedeemPointsAPIView(APIView):
             profile = UserProfile.objects.select_for_update().get(user=request.user)
             wallet = UserWallet.objects.select_for_update().get(user=request.user)
 
-            available = profile.total_game_points - profile.used_game_points
+            available = profile.available_game_points
             if available < points_required:
                 return Response({"error": "Insufficient game points"}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -268,6 +322,7 @@ class RedeemPointsAPIView(APIView):
             UserWallet.objects.filter(user=request.user).update(
                 total_coins=F('total_coins') + coins
             )
+            invalidate_user(request.user.pk)
 
             # Refresh instances for response
             profile.refresh_from_db()
@@ -275,6 +330,6 @@ class RedeemPointsAPIView(APIView):
 
         return Response({
             "coins_awarded": coins,
-            "available_game_points": profile.total_game_points - profile.used_game_points,
-            "available_coins": wallet.total_coins - wallet.used_coins,
+            "available_game_points": profile.available_game_points,
+            "available_coins": wallet.available_coins,
         })
\ No newline at end of file
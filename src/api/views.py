@@ -0,0 +1,124 @@
+"""
+Base class for the native async API views served under ASGI (core.asgi_urls).
+
+DRF's APIView is sync-only, so under an ASGI server every request to it
+occupies a thread. AsyncAPIView keeps the pieces of APIView the hot read
+endpoints need – token authentication, IsAuthenticated, JSON rendering and
+page-number pagination – and implements them with the async ORM.
+"""
+import math
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.pagination import _positive_int
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from src.api.auth.authentication import AsyncTokenAuthentication
+
+
+class AsyncAPIView(View):
+    """
+    Serves the async handlers defined on the subclass (`async def get`).
+    Any other method is handed to `fallback_view` – the regular DRF view for
+    the same URL – in a worker thread, so writes keep their DRF behaviour.
+    """
+    authentication = AsyncTokenAuthentication()
+    fallback_view = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # As DRF's APIView.as_view: token requests carry no CSRF token, and the
+        # fallback view's SessionAuthentication enforces CSRF for session ones.
+        # The async handlers are all GETs, which CSRF never applies to.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = getattr(self, request.method.lower(), None)
+        if not iscoroutinefunction(handler):
+            # From the class: a view function read from the instance would be bound to it
+            fallback_view = type(self).fallback_view
+            if fallback_view is not None:
+                return await sync_to_async(fallback_view)(request, *args, **kwargs)
+            return self.render({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+
+        try:
+            user = await self.authenticate(request)
+        except exceptions.AuthenticationFailed as e:
+            # Same status DRF returns: SessionAuthentication is listed first,
+            # so no WWW-Authenticate challenge and the error is a 403.
+            return self.render({"detail": e.detail}, status=403)
+
+        if user is None or not user.is_authenticated:
+            return self.render({"detail": "Authentication credentials were not provided."}, status=403)
+
+        request.user = user
+        return await handler(request, *args, **kwargs)
+
+    async def authenticate(self, request):
+        result = await self.authentication.aauthenticate(request)
+        if result is not None:
+            return result[0]
+
+        # No token header – fall back to the session user (browsable API, admin)
+        if hasattr(request, "auser"):
+            return await request.auser()
+        return None
+
+    def render(self, data, status=200):
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        content = renderer.render(data, renderer.media_type)
+        return HttpResponse(content, status=status, content_type=renderer.media_type)
+
+    async def paginate(self, queryset, request, pagination_class):
+        """
+        Async equivalent of PageNumberPagination.paginate_queryset +
+        get_paginated_response. Returns (response_data, None) on success and
+        (None, error_response) for an invalid page.
+        """
+        paginator = pagination_class()
+        try:
+            page_size = _positive_int(
+                request.GET[paginator.page_size_query_param],
+                strict=True,
+                cutoff=paginator.max_page_size
+            )
+        except (KeyError, ValueError):
+            page_size = paginator.page_size
+
+        count = await queryset.acount()
+        num_pages = max(1, math.ceil(count / page_size))
+
+        page_number = request.GET.get(paginator.page_query_param) or 1
+        if page_number in paginator.last_page_strings:
+            page_number = num_pages
+        try:
+            page_number = int(page_number)
+        except (TypeError, ValueError):
+            page_number = 0
+        if page_number < 1 or page_number > num_pages:
+            return None, self.render({"detail": "Invalid page."}, status=404)
+
+        bottom = (page_number - 1) * page_size
+        items = [obj async for obj in queryset[bottom:bottom + page_size]]
+
+        url = request.build_absolute_uri()
+        next_link = None
+        if page_number < num_pages:
+            next_link = replace_query_param(url, paginator.page_query_param, page_number + 1)
+        previous_link = None
+        if page_number > 1:
+            previous_link = (
+                remove_query_param(url, paginator.page_query_param) if page_number == 2
+                else replace_query_param(url, paginator.page_query_param, page_number - 1)
+            )
+
+        return {
+            "count": count,
+            "next": next_link,
+            "previous": previous_link,
+            "items": items,
+        }, None
@@ -1,3 +1,21 @@
 from django.contrib import admin
+from django.utils import timezone
 
-# Register your models here.
+from .models import OutboundEmail
+
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('id', 'subject', 'to', 'status', 'attempts', 'created_at', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'to')
+    ordering = ('-created_at',)
+    readonly_fields = ('attempts', 'last_error', 'created_at', 'sent_at')
+    actions = ['retry_now']
+
+    @admin.action(description="Retry selected emails now")
+    def retry_now(self, request, queryset):
+        queryset.exclude(status=OutboundEmail.Status.SENT).update(
+            status=OutboundEmail.Status.PENDING, attempts=0, next_attempt_at=timezone.now()
+        )
+
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
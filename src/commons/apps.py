@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CommonsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'src.commons'
+
+    def ready(self):
+        import src.commons.metrics  # noqa
+        import src.commons.mail  # noqa – registers the email queue metrics
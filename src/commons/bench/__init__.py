@@ -0,0 +1,4 @@
+"""
+In-process benchmarks. They run against a throwaway test database, never the
+configured one – see `isolated_database`.
+"""
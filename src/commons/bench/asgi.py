@@ -0,0 +1,207 @@
+"""
+ASGI vs WSGI comparison for the hot read endpoints.
+
+Both handlers are driven in-process with the same number of requests in
+flight: the WSGI handler from a thread pool (one thread per in-flight
+request, like a threaded WSGI server), the ASGI handler from asyncio tasks
+on a single event loop. For each endpoint and concurrency level we record
+throughput, latency percentiles, the peak thread count and the Python heap
+growth per in-flight request (tracemalloc, measured in a separate pass so
+it does not skew the timings).
+"""
+import asyncio
+import io
+import statistics
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.test.utils import override_settings
+
+from src.commons.bench.report import percentile
+
+ENDPOINTS = [
+    "/api/v1/game/leaderboard/",
+    "/api/v1/game/list/",
+    "/api/v1/user/wallet/",
+    "/api/v1/user/profile/",
+]
+
+
+class _ThreadPeak:
+    """Samples threading.active_count() in the background."""
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, threading.active_count())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        # The sampler itself is not part of the measurement
+        self.peak -= 1
+
+
+def _host():
+    hosts = [h for h in settings.ALLOWED_HOSTS if h and not h.startswith(".") and h != "*"]
+    return hosts[0] if hosts else "localhost"
+
+
+def _wsgi_environ(path, token):
+    return {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "SCRIPT_NAME": "",
+        "QUERY_STRING": "",
+        "SERVER_NAME": _host(),
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": _host(),
+        "HTTP_AUTHORIZATION": f"Token {token}",
+        "REMOTE_ADDR": "127.0.0.1",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(b""),
+        "wsgi.errors": io.StringIO(),
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+
+
+def _asgi_scope(path, token):
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", _host().encode()),
+            (b"authorization", f"Token {token}".encode()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": (_host(), 80),
+    }
+
+
+def call_wsgi(app, path, token):
+    status = []
+    started = time.perf_counter()
+    body = app(_wsgi_environ(path, token), lambda s, headers, exc_info=None: status.append(s))
+    b"".join(body)
+    if hasattr(body, "close"):
+        body.close()
+    return time.perf_counter() - started, int(status[0].split()[0])
+
+
+async def call_asgi(app, path, token):
+    sent = []
+    disconnected = asyncio.Event()
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Django listens for a disconnect until the response is done
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    started = time.perf_counter()
+    await app(_asgi_scope(path, token), receive, send)
+    elapsed = time.perf_counter() - started
+    disconnected.set()
+    return elapsed, sent[0]["status"]
+
+
+def run_wsgi(app, path, tokens, requests, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(call_wsgi, app, path, tokens[i % len(tokens)])
+            for i in range(requests)
+        ]
+        return [f.result() for f in futures]
+
+
+def run_asgi(app, path, tokens, requests, concurrency):
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            async with semaphore:
+                return await call_asgi(app, path, tokens[i % len(tokens)])
+
+        return await asyncio.gather(*(one(i) for i in range(requests)))
+
+    return asyncio.run(main())
+
+
+def _measure(runner, app, path, tokens, requests, concurrency):
+    with _ThreadPeak() as threads:
+        started = time.perf_counter()
+        samples = runner(app, path, tokens, requests, concurrency)
+        wall = time.perf_counter() - started
+
+    latencies = [s[0] for s in samples]
+    errors = sum(1 for s in samples if s[1] >= 400)
+
+    # Memory pass: heap growth while `concurrency` requests are in flight
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    runner(app, path, tokens, concurrency, concurrency)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(requests / wall, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "peak_threads": threads.peak,
+        "heap_per_inflight_kb": round((peak - baseline) / concurrency / 1024, 1),
+    }
+
+
+def compare(tokens, requests=200, concurrency_levels=(1, 16, 64), endpoints=ENDPOINTS):
+    """Returns one result dict per (endpoint, concurrency, server)."""
+    results = []
+    with override_settings(SECURE_SSL_REDIRECT=False):
+        wsgi_app = WSGIHandler()
+        with override_settings(ROOT_URLCONF="core.asgi_urls"):
+            asgi_app = ASGIHandler()
+
+            for path in endpoints:
+                for concurrency in concurrency_levels:
+                    with override_settings(ROOT_URLCONF="core.urls"):
+                        wsgi = _measure(run_wsgi, wsgi_app, path, tokens, requests, concurrency)
+                    asgi = _measure(run_asgi, asgi_app, path, tokens, requests, concurrency)
+                    results.append({"endpoint": path, "server": "wsgi", **wsgi})
+                    results.append({"endpoint": path, "server": "asgi", **asgi})
+    return results
@@ -0,0 +1,89 @@
+"""
+Contention benchmark for the hot per-user counters (src/services/user/counters.py).
+
+Worker threads, each with its own database connection, increment the same
+user's counter – the referral code owner during a campaign. Every increment
+runs in a transaction that stays open for `hold` seconds afterwards, standing
+in for the rest of the request (the signup that credits the code owner), so
+the row lock is held as long as it is in production. The same load is run
+once per COUNTER_SHARDS value; shards are folded at the end and the counter
+is checked against the number of increments made.
+
+SQLite locks the whole database for every write transaction, so shards
+cannot help there and the runs only check correctness; run against
+PostgreSQL to measure the row-lock contention they remove.
+"""
+import threading
+import time
+
+from django.db import OperationalError, connections, transaction
+from django.test.utils import override_settings
+
+from src.commons.bench.report import summarize
+from src.services.user import counters
+
+
+def _read(counter, user_id):
+    model, field = counters.COUNTERS[counter]
+    return model.objects.filter(user_id=user_id).values_list(field, flat=True).get()
+
+
+def run_once(counter, user_id, shards, threads=16, increments=100, hold=0.002):
+    """Run `threads` x `increments` increments of 1 with COUNTER_SHARDS = `shards`."""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    start = threading.Barrier(threads + 1)
+
+    def worker():
+        own = []
+        failed = 0
+        try:
+            start.wait()
+            for _ in range(increments):
+                began = time.perf_counter()
+                try:
+                    with transaction.atomic():
+                        counters.increment(counter, user_id, 1)
+                        time.sleep(hold)
+                except OperationalError:
+                    failed += 1  # SQLite: "database is locked" after its busy timeout
+                    continue
+                own.append(time.perf_counter() - began)
+        finally:
+            connections.close_all()
+        with lock:
+            latencies.extend(own)
+            errors.append(failed)
+
+    with override_settings(COUNTER_SHARDS=shards):
+        before = _read(counter, user_id)
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in pool:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        counters.fold()
+        after = _read(counter, user_id)
+
+    done = len(latencies)
+    return {
+        "shards": shards,
+        "threads": threads,
+        "increments": done,
+        "errors": sum(errors),
+        "seconds": round(elapsed, 3),
+        "increments_per_sec": round(done / elapsed, 1) if elapsed else 0.0,
+        "consistent": after - before == done,
+        **summarize(latencies),
+    }
+
+
+def run(user_id, shard_counts=(0, 8), counter=counters.COINS, threads=16, increments=100, hold=0.002):
+    return [
+        run_once(counter, user_id, shards, threads=threads, increments=increments, hold=hold)
+        for shards in shard_counts
+    ]
@@ -0,0 +1,168 @@
+"""
+Synthetic dataset used by the benchmarks.
+
+Everything is inserted with bulk_create in fixed-size batches, and the
+insert rate of each table is reported so ingestion throughput can be
+tracked between commits. The same seed value always produces the same data.
+"""
+import os
+import random
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import setup_databases, teardown_databases
+from django.utils import timezone
+
+BENCH_PASSWORD = "bench-password-1"
+BATCH_SIZE = 5000
+
+
+@contextmanager
+def isolated_database(verbosity=0):
+    """
+    Create a fresh test database for the duration of the block.
+    SQLite gets a temporary file instead of the shared in-memory database,
+    so concurrent benchmark threads see real file locking.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    tmp_path = None
+    if connection.vendor == "sqlite" and not connection.settings_dict["TEST"].get("NAME"):
+        fd, tmp_path = tempfile.mkstemp(prefix="jol-bench-", suffix=".sqlite3")
+        os.close(fd)
+        connection.settings_dict["TEST"]["NAME"] = tmp_path
+
+    old_config = setup_databases(verbosity=verbosity, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=verbosity)
+        connections.close_all()
+        if tmp_path:
+            connection.settings_dict["TEST"]["NAME"] = None
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(tmp_path + suffix):
+                    os.remove(tmp_path + suffix)
+
+
+@dataclass
+class Dataset:
+    tokens: list = field(default_factory=list)
+    user_ids: list = field(default_factory=list)
+    emails: list = field(default_factory=list)
+    referral_codes: list = field(default_factory=list)
+    ingestion: dict = field(default_factory=dict)  # table -> {"rows", "seconds", "rows_per_sec"}
+
+
+def _timed_insert(dataset, table, model, objects, batch_size=BATCH_SIZE, keep=True):
+    """
+    bulk_create `objects` (any iterable) in batches and record the insert rate.
+    With keep=False the created rows are not collected, so millions of rows
+    can stream through without being held in memory.
+    """
+    started = time.perf_counter()
+    rows = 0
+    created = []
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            inserted = model.objects.bulk_create(batch)
+            if keep:
+                created.extend(inserted)
+            rows += len(batch)
+            batch = []
+    if batch:
+        inserted = model.objects.bulk_create(batch)
+        if keep:
+            created.extend(inserted)
+        rows += len(batch)
+
+    seconds = time.perf_counter() - started
+    dataset.ingestion[table] = {
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+    }
+    return created
+
+
+def seed(users=50, games=1000, pending_referrals=100, seed_value=42):
+    """
+    Insert `users` verified accounts (profile, wallet, token), `games`
+    GameHistory rows spread over the last 60 days and `pending_referrals`
+    unredeemed download clicks. Every account uses BENCH_PASSWORD.
+    """
+    from allauth.account.models import EmailAddress
+    from rest_framework.authtoken.models import Token
+    from src.services.game.models import GameHistory
+    from src.services.user.models import PendingReferral, User, UserProfile, UserWallet
+
+    rnd = random.Random(seed_value)
+    now = timezone.now()
+    dataset = Dataset()
+    password = make_password(BENCH_PASSWORD)
+
+    created = _timed_insert(dataset, "user", User, (
+        User(username=f"bench{i}", email=f"bench{i}@example.com", password=password)
+        for i in range(users)
+    ))
+    dataset.user_ids = [u.id for u in created]
+    dataset.emails = [u.email for u in created]
+    dataset.referral_codes = [f"B{i:07d}" for i in range(users)]
+
+    profiles = _timed_insert(dataset, "profile", UserProfile, (
+        UserProfile(user=u, referral_code=code, total_game_points=1_000_000)
+        for u, code in zip(created, dataset.referral_codes)
+    ))
+    _timed_insert(dataset, "wallet", UserWallet, (UserWallet(user=u) for u in created))
+    _timed_insert(dataset, "email_address", EmailAddress, (
+        EmailAddress(user=u, email=u.email, verified=True, primary=True) for u in created
+    ))
+    tokens = _timed_insert(dataset, "token", Token, (
+        Token(user=u, key=uuid.UUID(int=rnd.getrandbits(128)).hex + f"{i:08x}")
+        for i, u in enumerate(created)
+    ))
+    dataset.tokens = [t.key for t in tokens]
+
+    def game_rows():
+        for i in range(games):
+            status = GameHistory.Status.COMPLETED if rnd.random() < 0.9 else GameHistory.Status.ABANDONED
+            score = rnd.randint(0, 100)
+            multiplayer = rnd.random() < 0.2
+            yield GameHistory(
+                match_id=str(uuid.UUID(int=rnd.getrandbits(128))),
+                player_id=dataset.user_ids[i % users],
+                game_type=GameHistory.GameType.MULTIPLAYER if multiplayer else GameHistory.GameType.SOLO,
+                game_mode=rnd.choice(GameHistory.GameMode.values),
+                operation=rnd.choice(GameHistory.Operation.values),
+                grid_size=rnd.choice([3, 4, 5, 6]),
+                timestamp=now - timedelta(seconds=rnd.randint(0, 60 * 24 * 3600)),
+                status=status,
+                final_score=score,
+                points_earned=score if status == GameHistory.Status.COMPLETED else 0,
+                accuracy_percentage=round(rnd.uniform(40, 100), 2),
+                hints_used=rnd.randint(0, 3),
+                completion_time=rnd.randint(30, 600),
+                room_code=f"R{rnd.randint(0, 99999):05d}" if multiplayer else None,
+                position=rnd.randint(1, 4) if multiplayer else None,
+                total_players=4 if multiplayer else None,
+            )
+
+    _timed_insert(dataset, "game_history", GameHistory, game_rows(), keep=False)
+
+    _timed_insert(dataset, "pending_referral", PendingReferral, (
+        PendingReferral(
+            referral_code=profile.referral_code,
+            referrer_profile=profile,
+            ip_address=f"10.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}",
+        )
+        for profile in (rnd.choice(profiles) for _ in range(pending_referrals))
+    ))
+
+    return dataset
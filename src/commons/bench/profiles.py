@@ -0,0 +1,131 @@
+"""
+Compares settings profiles (core.settings vs core.settings_api): cold-start
+time to a ready WSGI application, worker RSS, and request latency for the
+same token-authenticated endpoints. Middleware overhead is also measured on
+its own, with a token request to a view that does nothing. Every measurement
+runs in a fresh interpreter so the profiles don't share imported modules.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+
+PROFILES = ["core.settings", "core.settings_api"]
+
+# Process start to a WSGI application with the URLconf loaded – what a worker
+# does before it can answer its first request.
+_COLD_START = """
+import json, sys, time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+get_wsgi_application()
+get_resolver().url_patterns
+elapsed = time.perf_counter() - started
+from src.commons.bench.profiles import rss_kb
+print(json.dumps({"seconds": elapsed, "rss_kb": rss_kb(), "modules": len(sys.modules)}))
+"""
+
+_REQUESTS = """
+import json, sys
+import django
+django.setup()
+from src.commons.bench.profiles import serve_requests
+print(json.dumps(serve_requests(int(sys.argv[1]))))
+"""
+
+REQUEST_SCENARIOS = ["user.detail", "user.wallet", "game.list", "page.download"]
+
+
+def _run(code, settings_module, *args):
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings_module}
+    result = subprocess.run(
+        [sys.executable, "-c", code, *args],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    # Logging may write to stdout too; the payload is the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def rss_kb():
+    """
+    Current resident set size. ru_maxrss is not used: on Linux it survives
+    exec, so a child would report the parent's peak.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def middleware_overhead(requests):
+    """Median seconds for a token request to a view that returns immediately."""
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test.utils import override_settings
+
+    from src.commons.bench.asgi import call_wsgi
+
+    with override_settings(ROOT_URLCONF="src.commons.bench.urls"):
+        app = WSGIHandler()
+        for _ in range(200):
+            call_wsgi(app, "/api/v1/bench/noop/", "bench")
+        return statistics.median(
+            call_wsgi(app, "/api/v1/bench/noop/", "bench")[0] for _ in range(requests)
+        )
+
+
+def serve_requests(requests):
+    """
+    Runs inside the child process: seeds a small throwaway database and times
+    `requests` calls per scenario after a warm-up. Returns the latency summaries,
+    the middleware overhead and the worker RSS after serving them.
+    """
+    from django.test.utils import override_settings
+
+    from src.commons.bench.dataset import isolated_database, seed
+    from src.commons.bench.runner import SCENARIOS, Runner
+
+    scenarios = [s for s in SCENARIOS if s.name in REQUEST_SCENARIOS]
+    with isolated_database(), override_settings(
+        SECURE_SSL_REDIRECT=False,
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+    ):
+        dataset = seed(users=10, games=500, pending_referrals=10)
+        Runner(dataset, requests=50, concurrency=1).run(scenarios)  # warm-up
+        results = Runner(dataset, requests=requests, concurrency=1).run(scenarios)
+        overhead = middleware_overhead(requests * 10)
+
+    return {
+        "endpoints": {name: result["sequential"] for name, result in results.items()},
+        "middleware_us": round(overhead * 1_000_000, 1),
+        "rss_kb": rss_kb(),
+    }
+
+
+def cold_start(settings_module, runs=5):
+    samples = [_run(_COLD_START, settings_module) for _ in range(runs)]
+    return {
+        "seconds_median": round(statistics.median(s["seconds"] for s in samples), 4),
+        "seconds_min": round(min(s["seconds"] for s in samples), 4),
+        "rss_kb": int(statistics.median(s["rss_kb"] for s in samples)),
+        "modules": samples[0]["modules"],
+    }
+
+
+def compare(profiles=PROFILES, runs=5, requests=500):
+    """Returns {settings_module: {"cold_start": ..., "requests": ...}}."""
+    return {
+        module: {
+            "cold_start": cold_start(module, runs),
+            "requests": _run(_REQUESTS, module, str(requests)),
+        }
+        for module in profiles
+    }
@@ -0,0 +1,50 @@
+"""
+Microbenchmark for the in-process rank snapshots (src/services/game/ranks.py):
+build time, memory per million players, and the cost of rank, percentile,
+top-K and page lookups. No database needed – the standings are synthetic,
+with points drawn from a long-tailed distribution like real ones.
+"""
+import time
+import timeit
+
+import numpy as np
+
+from src.services.game.ranks import Ranks
+from src.services.game.standings import STANDINGS_DTYPE
+
+
+def synthetic_standings(players, seed=0):
+    """`players` rows in rank order, as leaderboard_queryset() returns them."""
+    rng = np.random.default_rng(seed)
+    ranked = np.empty(players, dtype=STANDINGS_DTYPE)
+    ranked["player"] = rng.permutation(players) + 1
+    ranked["points"] = np.sort(rng.pareto(1.5, players) * 100)[::-1].astype(np.int64)
+    ranked["games"] = rng.integers(1, 500, players)
+    # Ties by player id, like the ORDER BY
+    return ranked[np.lexsort((ranked["player"], -ranked["points"]))]
+
+
+def _per_call_us(func, number):
+    # Best of 5 repeats – the least disturbed run
+    return round(min(timeit.repeat(func, number=number, repeat=5)) / number * 1_000_000, 2)
+
+
+def run(players=1_000_000, number=10000, seed=0):
+    ranked = synthetic_standings(players, seed)
+    began = time.perf_counter()
+    ranks = Ranks(ranked)
+    build = time.perf_counter() - began
+
+    rng = np.random.default_rng(seed + 1)
+    lookups = iter(rng.integers(1, players + 1, 5 * number * 2).tolist())
+    points = iter(rng.integers(0, int(ranked["points"][0]) + 1, 5 * number * 2).tolist())
+    return {
+        "players": players,
+        "bytes": ranks.nbytes,
+        "bytes_per_million_players": round(ranks.nbytes / players * 1_000_000),
+        "build_ms": round(build * 1000, 2),
+        "rank_us": _per_call_us(lambda: ranks.rank(next(lookups)), number),
+        "percentile_us": _per_call_us(lambda: ranks.percentile(next(points)), number),
+        "top_100_us": _per_call_us(lambda: ranks.top(100), number // 10),
+        "page_us": _per_call_us(lambda: ranks.page(players // 2, 50), number // 10),
+    }
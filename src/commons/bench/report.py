@@ -0,0 +1,84 @@
+"""
+Summaries and the JSON report format shared by the benchmark commands.
+Reports are written with sorted keys so two runs can be diffed directly,
+and `compare` prints the per-endpoint deltas against a baseline report.
+"""
+import json
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+import django
+from django.db import connection
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values` (pct in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies):
+    """Latency percentiles in milliseconds."""
+    if not latencies:
+        return {"mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    return {
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(**extra):
+    return {
+        "git_commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        **extra,
+    }
+
+
+def write(path, report):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(baseline, current, threshold=0.2):
+    """
+    Yields (endpoint, metric, before, after, regressed) for the latency and
+    query-count metrics of every endpoint present in both reports.
+    Latency regresses when it grows by more than `threshold`; the query count
+    regresses on any increase.
+    """
+    for name, now in sorted(current.get("endpoints", {}).items()):
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        for mode, metric in (("sequential", "p95_ms"), ("sequential", "queries_per_request"), ("concurrent", "p95_ms")):
+            old = (before.get(mode) or {}).get(metric)
+            new = (now.get(mode) or {}).get(metric)
+            if old is None or new is None:
+                continue
+            if metric == "queries_per_request":
+                regressed = new > old
+            else:
+                regressed = old > 0 and (new - old) / old > threshold
+            yield name, f"{mode}.{metric}", old, new, regressed
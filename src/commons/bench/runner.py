@@ -0,0 +1,164 @@
+"""
+Endpoint scenarios and the in-process load runner.
+
+Each scenario is run twice: sequentially (latency percentiles and queries
+per request, captured on the default connection) and from a thread pool
+with `concurrency` requests in flight (throughput and latency under load).
+"""
+import itertools
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from src.commons.bench.dataset import BENCH_PASSWORD
+from src.commons.bench.report import summarize
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: object  # str, or callable(dataset, i) -> str
+    data: object = None  # callable(dataset, i) -> dict
+    auth: bool = True
+    # Reassigns tokens, so it runs after every other scenario
+    rotates_tokens: bool = False
+
+
+def _game_payload(dataset, i):
+    return {
+        "match_id": str(uuid.uuid4()),
+        "player_id": str(dataset.user_ids[i % len(dataset.user_ids)]),
+        "game_type": "solo",
+        "game_mode": "timed",
+        "operation": "addition",
+        "grid_size": 4,
+        "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "status": "completed",
+        "final_score": 92,
+        "accuracy_percentage": 96.5,
+        "hints_used": 1,
+        "completion_time": 238,
+    }
+
+
+def _username(dataset, i):
+    return dataset.emails[i % len(dataset.emails)].split("@")[0]
+
+
+def _refcode(dataset, i):
+    return dataset.referral_codes[(i * 7) % len(dataset.referral_codes)]
+
+
+SCENARIOS = [
+    Scenario("user.detail", "get", "/api/v1/user/detail/"),
+    Scenario("user.profile", "get", "/api/v1/user/profile/"),
+    Scenario("user.wallet", "get", "/api/v1/user/wallet/"),
+    Scenario("user.wallet_adjust", "post", "/api/v1/user/wallet/adjust/",
+             lambda d, i: {"coins": 1, "type": "increment"}),
+    Scenario("user.wallet_redeem", "post", "/api/v1/user/wallet/redeem/", lambda d, i: {"coins": 1}),
+    Scenario("user.process_referral", "post", "/api/v1/user/process-referral/",
+             lambda d, i: {"referral_code": _refcode(d, i + 1)}),
+    Scenario("game.add", "post", "/api/v1/game/add-game/", _game_payload),
+    Scenario("game.list", "get", "/api/v1/game/list/"),
+    Scenario("game.leaderboard.today", "get", "/api/v1/game/leaderboard/?period=today"),
+    Scenario("game.leaderboard.this_week", "get", "/api/v1/game/leaderboard/?period=this_week"),
+    Scenario("game.leaderboard.this_month", "get", "/api/v1/game/leaderboard/?period=this_month"),
+    Scenario("game.leaderboard.all_time", "get", "/api/v1/game/leaderboard/?period=all_time"),
+    Scenario("page.download", "get", lambda d, i: f"/download/?refcode={_refcode(d, i)}", auth=False),
+    Scenario("page.download_click", "post", "/download/", lambda d, i: {"refcode": _refcode(d, i)}, auth=False),
+    Scenario("auth.login", "post", "/api/auth/login/",
+             lambda d, i: {"email": d.emails[i % len(d.emails)], "password": BENCH_PASSWORD},
+             auth=False, rotates_tokens=True),
+    # Exact lookup misses, so allauth falls back to its case-insensitive username lookup
+    Scenario("auth.login_username_case", "post", "/api/auth/login/",
+             lambda d, i: {"username": _username(d, i).upper(), "password": BENCH_PASSWORD},
+             auth=False, rotates_tokens=True),
+    # Every lookup misses (400)
+    Scenario("auth.login_unknown", "post", "/api/auth/login/",
+             lambda d, i: {"username": f"nobody{i}", "password": BENCH_PASSWORD}, auth=False),
+]
+
+
+class Runner:
+    def __init__(self, dataset, requests=200, concurrency=8):
+        self.dataset = dataset
+        self.requests = requests
+        self.concurrency = concurrency
+        self._counter = itertools.count()
+        self._local = threading.local()
+
+    def _client(self):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = Client(raise_request_exception=False)
+        return client
+
+    def call(self, scenario, i):
+        """One request; returns (seconds, status_code)."""
+        path = scenario.path(self.dataset, i) if callable(scenario.path) else scenario.path
+        extra = {
+            # Distinct client IPs, so IP-based referral attribution and click dedup behave like real traffic
+            "REMOTE_ADDR": f"172.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}",
+        }
+        if scenario.auth:
+            extra["HTTP_AUTHORIZATION"] = f"Token {self.dataset.tokens[i % len(self.dataset.tokens)]}"
+
+        kwargs = {}
+        if scenario.data:
+            kwargs = {"data": scenario.data(self.dataset, i), "content_type": "application/json"}
+
+        started = time.perf_counter()
+        response = getattr(self._client(), scenario.method)(path, **kwargs, **extra)
+        return time.perf_counter() - started, response.status_code
+
+    def sequential(self, scenario):
+        latencies, queries, statuses = [], [], {}
+        connection = connections[DEFAULT_DB_ALIAS]
+        for _ in range(self.requests):
+            i = next(self._counter)
+            with CaptureQueriesContext(connection) as ctx:
+                seconds, status = self.call(scenario, i)
+            latencies.append(seconds)
+            queries.append(len(ctx.captured_queries))
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+        return {
+            **summarize(latencies),
+            "queries_per_request": round(sum(queries) / len(queries), 2),
+            "max_queries": max(queries),
+            "status_codes": statuses,
+        }
+
+    def concurrent(self, scenario):
+        indexes = [next(self._counter) for _ in range(self.requests)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            samples = list(pool.map(lambda i: self.call(scenario, i), indexes))
+        wall = time.perf_counter() - started
+
+        return {
+            **summarize([s[0] for s in samples]),
+            "concurrency": self.concurrency,
+            "throughput_rps": round(len(samples) / wall, 1),
+            "errors": sum(1 for s in samples if s[1] >= 500),
+        }
+
+    def run(self, scenarios, progress=None):
+        results = {}
+        ordered = sorted(scenarios, key=lambda s: s.rotates_tokens)
+        for scenario in ordered:
+            results[scenario.name] = {
+                "sequential": self.sequential(scenario),
+                "concurrent": self.concurrent(scenario) if self.concurrency > 1 else None,
+            }
+            if progress:
+                progress(scenario.name, results[scenario.name])
+        return results
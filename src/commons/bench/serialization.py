@@ -0,0 +1,112 @@
+"""
+Microbenchmark for response encoding: DRF's JSONRenderer/JSONParser against
+the orjson-backed FastJSONRenderer/FastJSONParser, on the game history and
+leaderboard payloads, plus the cost of building the game history page that
+precedes rendering (GameHistorySerializer vs. its compiled ReadPlan). No database needed – the payloads are built from unsaved objects.
+"""
+import datetime
+import io
+import timeit
+import uuid
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from src.commons.renderers import FastJSONParser, FastJSONRenderer
+
+
+def game_history_payload(rows=100):
+    """A full page of GameHistorySerializer output, as the history endpoint returns it."""
+    from src.api.v1.game.serializers import GameHistorySerializer
+
+    return {"count": rows, "next": None, "previous": None, "results": GameHistorySerializer(_games(rows), many=True).data}
+
+
+def _games(rows):
+    from src.services.game.models import GameHistory
+
+    base = datetime.datetime(2025, 3, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc)
+    return [
+        GameHistory(
+            match_id=str(uuid.UUID(int=i)),
+            game_type="multiplayer" if i % 3 == 0 else "solo",
+            game_mode="timed",
+            operation="addition",
+            grid_size=4,
+            timestamp=base - datetime.timedelta(minutes=i, microseconds=i),
+            status="completed",
+            final_score=i,
+            points_earned=i,
+            accuracy_percentage=[0.0, 12.5, 99.99, 100.0, 33.333333333333336, 0.1][i % 6],
+            hints_used=i % 4,
+            completion_time=30 + i,
+            room_code="ROOM1" if i % 3 == 0 else None,
+            position=1 if i % 3 == 0 else None,
+            total_players=4 if i % 3 == 0 else None,
+        )
+        for i in range(rows)
+    ]
+
+
+def leaderboard_payload(rows=100):
+    return {
+        "period": "all_time",
+        "count": rows,
+        "page": 1,
+        "page_size": rows,
+        "results": [
+            {
+                "rank": i + 1,
+                "user_id": i,
+                "username": f"player_{i}",
+                "avatar": f"/media/avatars/{i}.jpg" if i % 2 else None,
+                "total_points": 10_000 - i,
+                "games_played": i * 3,
+            }
+            for i in range(rows)
+        ],
+    }
+
+
+ADD_GAME_REQUEST = (
+    b'{"match_id": "3f2b9c1e-8d4a-4e5b-9c7d-2a1b0e9f8c6d", "player_id": "42", "game_type": "multiplayer",'
+    b' "game_mode": "timed", "operation": "addition", "grid_size": 4, "timestamp": "2025-03-01T12:30:15Z",'
+    b' "status": "completed", "final_score": 92, "accuracy_percentage": 96.5, "hints_used": 1,'
+    b' "completion_time": 238, "room_code": "ROOM1", "position": 1, "total_players": 4}'
+)
+
+
+def _per_call_us(func, number):
+    # Best of 5 repeats – the least disturbed run
+    return round(min(timeit.repeat(func, number=number, repeat=5)) / number * 1_000_000, 2)
+
+
+def run(rows=100, number=500):
+    from src.api.v1.game.serializers import GameHistorySerializer, game_history_plan
+
+    games = _games(rows)
+    value_rows = [{column: getattr(game, column) for column in game_history_plan.columns} for game in games]
+    history = game_history_payload(rows)
+    board = leaderboard_payload(rows)
+    body = JSONRenderer().render(history)
+
+    results = {
+        "rows": rows,
+        "serialize_game_history_us": {
+            "drf": _per_call_us(lambda: GameHistorySerializer(games, many=True).data, number),
+            "plan": _per_call_us(lambda: game_history_plan.many(value_rows), number),
+        },
+        "response_bytes": {"game_history": len(body), "leaderboard": len(JSONRenderer().render(board))},
+    }
+    for name, payload in (("game_history", history), ("leaderboard", board)):
+        results[f"render_{name}_us"] = {
+            "drf": _per_call_us(lambda: JSONRenderer().render(payload), number),
+            "fast": _per_call_us(lambda: FastJSONRenderer().render(payload), number),
+        }
+
+    for name, data in (("add_game_request", ADD_GAME_REQUEST), ("game_history", body)):
+        results[f"parse_{name}_us"] = {
+            "drf": _per_call_us(lambda: JSONParser().parse(io.BytesIO(data)), number),
+            "fast": _per_call_us(lambda: FastJSONParser().parse(io.BytesIO(data)), number),
+        }
+    return results
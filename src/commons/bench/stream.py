@@ -0,0 +1,171 @@
+"""
+Load test for the live leaderboard stream (SSE, ASGI only).
+
+Thousands of subscribers are opened in-process against Django's ASGIHandler,
+spread over the leaderboard periods. Bursts of completed games are then
+inserted through the ORM (so the usual signals fire) and we record, per
+burst, how many page recomputes it caused and how long it took until every
+subscriber had received the resulting diff. Connection time and heap per
+open stream (tracemalloc) are measured while subscribing.
+"""
+import asyncio
+import random
+import time
+import tracemalloc
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from src.commons.bench.asgi import _asgi_scope
+from src.commons.bench.report import percentile
+from src.services.game import leaderboard, live
+from src.services.game.models import GameHistory
+
+STREAM_PATH = "/api/v1/game/leaderboard/stream/"
+
+
+class SimulatedSubscriber:
+    """One open SSE connection; records when each event id arrives."""
+
+    def __init__(self, app, token, period):
+        self.app = app
+        self.token = token
+        self.key = (period, 1, leaderboard.DEFAULT_PAGE_SIZE)
+        self.status = None
+        self.requested = False
+        self.snapshot = asyncio.Event()
+        self.last_id = -1
+        self.arrivals = {}  # event id -> perf_counter
+        self.disconnect = asyncio.Event()
+        self.task = None
+
+    async def receive(self):
+        if not self.requested:
+            self.requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self.disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+            return
+        chunk = message.get("body", b"")
+        if not chunk.startswith(b"id: "):
+            return  # keepalive or empty final chunk
+        event_id = int(chunk[4:chunk.index(b"\n")])
+        self.arrivals.setdefault(event_id, time.perf_counter())
+        self.last_id = max(self.last_id, event_id)
+        self.snapshot.set()
+
+    def start(self):
+        scope = _asgi_scope(STREAM_PATH, self.token)
+        scope["query_string"] = f"period={self.key[0]}".encode()
+        self.task = asyncio.create_task(self.app(scope, self.receive, self.send))
+
+
+def _insert_games(player_ids, count, rnd):
+    now = timezone.now()
+    for _ in range(count):
+        score = rnd.randint(10, 500)
+        GameHistory.objects.create(
+            match_id=str(uuid.uuid4()),
+            player_id=rnd.choice(player_ids),
+            game_type="solo",
+            game_mode="timed",
+            operation="addition",
+            grid_size=4,
+            timestamp=now,
+            status="completed",
+            final_score=score,
+            points_earned=score,
+            accuracy_percentage=90.0,
+            hints_used=0,
+            completion_time=60,
+        )
+
+
+async def _wait_for(condition, timeout):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        await asyncio.sleep(0.005)
+    return True
+
+
+async def _main(app, tokens, player_ids, subscribers, bursts, burst_size, interval, seed_value):
+    rnd = random.Random(seed_value)
+    periods = leaderboard.PERIODS
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    clients = [
+        SimulatedSubscriber(app, tokens[i % len(tokens)], periods[i % len(periods)])
+        for i in range(subscribers)
+    ]
+    for client in clients:
+        client.start()
+    connected = await _wait_for(lambda: all(c.snapshot.is_set() or c.status not in (None, 200) for c in clients), 120)
+    connect_seconds = time.perf_counter() - started
+    heap_per_subscriber = (tracemalloc.get_traced_memory()[0] - baseline) / subscribers
+    tracemalloc.stop()
+
+    errors = sum(1 for c in clients if c.status != 200)
+    broadcaster = live.broadcaster()
+    results = []
+    for _ in range(bursts):
+        before = live.RECOMPUTES.value()
+        burst_started = time.perf_counter()
+        await sync_to_async(_insert_games)(player_ids, burst_size, rnd)
+        inserted = time.perf_counter()
+
+        # The next tick picks the burst up; every subscriber then gets that diff
+        await asyncio.sleep(interval)
+        targets = {key: topic.seq for key, topic in broadcaster.topics.items()}
+        delivered = await _wait_for(
+            lambda: all(c.last_id >= targets.get(c.key, -1) for c in clients if c.status == 200), 10 * interval + 5
+        )
+        latencies = [
+            c.arrivals[targets[c.key]] - inserted
+            for c in clients if c.status == 200 and targets.get(c.key) in c.arrivals
+        ]
+        results.append({
+            "insert_ms": round((inserted - burst_started) * 1000, 1),
+            "recomputes": live.RECOMPUTES.value() - before,
+            "delivered": len(latencies),
+            "complete": delivered,
+            "fanout_p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+            "fanout_p99_ms": round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+            "fanout_max_ms": round(max(latencies) * 1000, 1) if latencies else None,
+        })
+        # Let the bursts land in separate ticks
+        await asyncio.sleep(interval)
+
+    for client in clients:
+        client.disconnect.set()
+    await asyncio.gather(*(c.task for c in clients), return_exceptions=True)
+
+    return {
+        "subscribers": subscribers,
+        "topics": len(periods),
+        "interval_s": interval,
+        "burst_size": burst_size,
+        "connected": connected,
+        "errors": errors,
+        "connect_s": round(connect_seconds, 2),
+        "heap_per_subscriber_kb": round(heap_per_subscriber / 1024, 2),
+        "bursts": results,
+    }
+
+
+def run(tokens, player_ids, subscribers=2000, bursts=5, burst_size=50, interval=1.0, seed_value=42):
+    with override_settings(
+        SECURE_SSL_REDIRECT=False, ROOT_URLCONF="core.asgi_urls", LEADERBOARD_STREAM_INTERVAL=interval
+    ):
+        app = ASGIHandler()
+        return asyncio.run(_main(app, tokens, player_ids, subscribers, bursts, burst_size, interval, seed_value))
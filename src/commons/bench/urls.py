@@ -0,0 +1,12 @@
+"""URLconf for measuring the middleware stack on its own (see profiles.py)."""
+from django.http import HttpResponse
+from django.urls import path
+
+
+def noop(request):
+    return HttpResponse(b"ok")
+
+
+urlpatterns = [
+    path("api/v1/bench/noop/", noop),
+]
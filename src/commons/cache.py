@@ -0,0 +1,338 @@
+"""
+Two-tier cache for computed API data.
+
+    leaderboard_pages = TieredCache("leaderboard", timeout=30, l1_timeout=5)
+    data = leaderboard_pages.get_or_set(("all_time", 1, 50), compute)
+    leaderboard_pages.invalidate_all()
+
+L1 is a small per-process LRU (`l1_timeout` > 0 enables it), L2 the shared
+Django cache (CACHES[alias]: Redis in production, locmem or a file cache
+locally). Keys are namespaced and carry the namespace's code `version` –
+bump it when the cached shape changes.
+
+Invalidation is stamp based: every entry is stored with the namespace
+generation and the key generation read before it was computed, and
+`invalidate()` / `invalidate_all()` bump those generations. A value computed
+from data that changed while it was being computed therefore never
+validates, and a single get_many reads entry and generations together.
+Bumps happen immediately and again when the surrounding transaction commits.
+Other processes' L1 copies expire on their own, so L1 is only for data that
+may be `l1_timeout` seconds stale.
+
+A miss is recomputed once (single-flight): the first caller takes a lock key
+in L2 with add(), the others wait for its value – across processes too.
+
+`get_many_or_set()` is the bulk form for per-object entries (user cards):
+one L2 round trip for all keys, one `compute(missing)` call for the misses.
+It skips the lock – bulk loads are cheap, and a lock per key would cost more
+round trips than the occasional duplicate load.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from src.commons.metrics import REGISTRY, Counter
+
+MISSING = object()
+
+# How long a recomputation may hold the lock before others compute themselves
+LOCK_SECONDS = 10
+LOCK_POLL_SECONDS = 0.02
+
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "cache_requests_total", "Tiered cache lookups by namespace and result (l1_hit, l2_hit, miss).",
+    ("namespace", "result"),
+))
+CACHE_COALESCED = REGISTRY.register(Counter(
+    "cache_coalesced_total", "Misses served by waiting for another caller's recomputation.",
+    ("namespace",),
+))
+
+_namespaces = {}
+
+
+class LocalLRU:
+    """Thread-safe LRU of (expires_at, value) with a fixed number of entries."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            if entry[0] < time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TieredCache:
+
+    def __init__(self, namespace, timeout, l1_timeout=0, l1_size=None, version=1, alias="default"):
+        if namespace in _namespaces:
+            raise ValueError(f"Cache namespace {namespace!r} is already registered")
+        self.namespace = namespace
+        self.timeout = timeout
+        self.l1_timeout = l1_timeout
+        self.version = version
+        self.alias = alias
+        self.l1 = LocalLRU(l1_size or settings.TIERED_CACHE_L1_SIZE) if l1_timeout else None
+        self._prefix = f"{namespace}:v{version}"
+        _namespaces[namespace] = self
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def _keys(self, key):
+        if isinstance(key, (tuple, list)):
+            key = ":".join(str(part) for part in key)
+        data_key = f"{self._prefix}:{key}"
+        return data_key, f"{data_key}:gen", f"{self._prefix}:gen"
+
+    def _read(self, keys, found):
+        """(stamp, value or MISSING) from a get_many result."""
+        data_key, key_gen, ns_gen = keys
+        stamp = (found.get(ns_gen, 0), found.get(key_gen, 0))
+        entry = found.get(data_key)
+        if entry is not None and entry[0] == stamp:
+            return stamp, entry[1]
+        return stamp, MISSING
+
+    def _l1_get(self, data_key):
+        if self.l1 is None:
+            return MISSING
+        return self.l1.get(data_key)
+
+    def _hit(self, data_key, value, result):
+        if self.l1 is not None:
+            self.l1.set(data_key, value, self.l1_timeout)
+        CACHE_REQUESTS.inc(self.namespace, result)
+        return value
+
+    # ---------------------------------------------------------------------------- sync
+
+    def get_or_set(self, key, compute):
+        """The cached value for `key`, calling `compute()` once on a miss."""
+        keys = self._keys(key)
+        data_key = keys[0]
+        value = self._l1_get(data_key)
+        if value is not MISSING:
+            CACHE_REQUESTS.inc(self.namespace, "l1_hit")
+            return value
+
+        backend = self.backend
+        stamp, value = self._read(keys, backend.get_many(keys))
+        if value is not MISSING:
+            return self._hit(data_key, value, "l2_hit")
+
+        lock_key = f"{data_key}:lock"
+        deadline = time.monotonic() + LOCK_SECONDS
+        locked = backend.add(lock_key, 1, LOCK_SECONDS)
+        while not locked and time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_SECONDS)
+            stamp, value = self._read(keys, backend.get_many(keys))
+            if value is not MISSING:
+                CACHE_COALESCED.inc(self.namespace)
+                return self._hit(data_key, value, "l2_hit")
+            locked = backend.add(lock_key, 1, LOCK_SECONDS)
+
+        try:
+            value = compute()
+            backend.set(data_key, (stamp, value), self.timeout)
+        finally:
+            if locked:
+                backend.delete(lock_key)
+        return self._hit(data_key, value, "miss")
+
+    def get_many_or_set(self, keys, compute):
+        """
+        {key: value} for every key of `keys`. `compute(missing)` is called once
+        with the uncached keys and returns {key: value}; keys it leaves out are
+        cached as None.
+        """
+        found, pending = self._many_from_l1(keys)
+        if not pending:
+            return found
+        stamps = self._many_from_l2(pending, self.backend.get_many(self._many_l2_keys(pending)), found)
+        if stamps:
+            computed = compute(list(stamps))
+            self.backend.set_many(self._many_entries(stamps, computed), self.timeout)
+            self._many_computed(pending, stamps, computed, found)
+        return found
+
+    def _many_from_l1(self, keys):
+        """({key: value} served by L1, {key: (data_key, key_gen, ns_gen)} for the rest)."""
+        found, pending = {}, {}
+        for key in keys:
+            if key in found or key in pending:
+                continue
+            cache_keys = self._keys(key)
+            value = self._l1_get(cache_keys[0])
+            if value is MISSING:
+                pending[key] = cache_keys
+            else:
+                CACHE_REQUESTS.inc(self.namespace, "l1_hit")
+                found[key] = value
+        return found, pending
+
+    @staticmethod
+    def _many_l2_keys(pending):
+        return list({cache_key for cache_keys in pending.values() for cache_key in cache_keys})
+
+    def _many_from_l2(self, pending, result, found):
+        """Adds L2 hits to `found`; returns {key: stamp} of the misses."""
+        stamps = {}
+        for key, cache_keys in pending.items():
+            stamp, value = self._read(cache_keys, result)
+            if value is MISSING:
+                stamps[key] = stamp
+            else:
+                found[key] = self._hit(cache_keys[0], value, "l2_hit")
+        return stamps
+
+    def _many_entries(self, stamps, computed):
+        return {self._keys(key)[0]: (stamp, computed.get(key)) for key, stamp in stamps.items()}
+
+    def _many_computed(self, pending, stamps, computed, found):
+        for key in stamps:
+            found[key] = self._hit(pending[key][0], computed.get(key), "miss")
+
+    def invalidate(self, *keys, using=DEFAULT_DB_ALIAS):
+        """Drop `keys` – now and again when the current transaction commits."""
+        def bump():
+            for key in keys:
+                data_key, key_gen, _ = self._keys(key)
+                self._incr(key_gen)
+                if self.l1 is not None:
+                    self.l1.delete(data_key)
+        self._now_and_on_commit(bump, using)
+
+    def invalidate_all(self, using=DEFAULT_DB_ALIAS):
+        """Drop every key of the namespace – now and again on commit."""
+        def bump():
+            self._incr(f"{self._prefix}:gen")
+            if self.l1 is not None:
+                self.l1.clear()
+        self._now_and_on_commit(bump, using)
+
+    def _incr(self, gen_key):
+        # Generations only need to change, but never back to a value an entry
+        # still carries: one that expired reads as 0 (no entry stamped after
+        # the first bump has that) and is recreated at the current time in
+        # ns, past anything it was bumped to before
+        backend = self.backend
+        if not backend.add(gen_key, time.time_ns(), self.timeout):
+            try:
+                backend.incr(gen_key)
+            except ValueError:
+                backend.add(gen_key, time.time_ns(), self.timeout)
+
+    def generation(self):
+        """Namespace generation – changes on every invalidate_all()."""
+        return self.backend.get(f"{self._prefix}:gen", 0)
+
+    async def ageneration(self):
+        return await self.backend.aget(f"{self._prefix}:gen", 0)
+
+    @staticmethod
+    def _now_and_on_commit(bump, using):
+        bump()
+        # A reader between now and the commit still sees the old rows and may
+        # cache them under the new generation – bump again once they're visible
+        if connections[using].in_atomic_block:
+            transaction.on_commit(bump, using=using)
+
+    # ---------------------------------------------------------------------------- async
+
+    async def aget_or_set(self, key, compute):
+        """get_or_set for async callers; `compute` is a coroutine function."""
+        keys = self._keys(key)
+        data_key = keys[0]
+        value = self._l1_get(data_key)
+        if value is not MISSING:
+            CACHE_REQUESTS.inc(self.namespace, "l1_hit")
+            return value
+
+        backend = self.backend
+        stamp, value = self._read(keys, await backend.aget_many(keys))
+        if value is not MISSING:
+            return self._hit(data_key, value, "l2_hit")
+
+        lock_key = f"{data_key}:lock"
+        deadline = time.monotonic() + LOCK_SECONDS
+        locked = await backend.aadd(lock_key, 1, LOCK_SECONDS)
+        while not locked and time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+            stamp, value = self._read(keys, await backend.aget_many(keys))
+            if value is not MISSING:
+                CACHE_COALESCED.inc(self.namespace)
+                return self._hit(data_key, value, "l2_hit")
+            locked = await backend.aadd(lock_key, 1, LOCK_SECONDS)
+
+        try:
+            value = await compute()
+            await backend.aset(data_key, (stamp, value), self.timeout)
+        finally:
+            if locked:
+                await backend.adelete(lock_key)
+        return self._hit(data_key, value, "miss")
+
+    async def aget_many_or_set(self, keys, compute):
+        """get_many_or_set for async callers; `compute` is a coroutine function."""
+        found, pending = self._many_from_l1(keys)
+        if not pending:
+            return found
+        result = await self.backend.aget_many(self._many_l2_keys(pending))
+        stamps = self._many_from_l2(pending, result, found)
+        if stamps:
+            computed = await compute(list(stamps))
+            await self.backend.aset_many(self._many_entries(stamps, computed), self.timeout)
+            self._many_computed(pending, stamps, computed, found)
+        return found
+
+
+def clear_local_caches():
+    """Empty every namespace's L1 (tests, or after changing data outside the ORM)."""
+    for cache in _namespaces.values():
+        if cache.l1 is not None:
+            cache.l1.clear()
+
+
+@REGISTRY.add_collector
+def cache_hit_ratio():
+    lines = [
+        "# HELP cache_hit_ratio Share of tiered cache lookups served from L1 or L2 since start.",
+        "# TYPE cache_hit_ratio gauge",
+    ]
+    for namespace in sorted(_namespaces):
+        hits = CACHE_REQUESTS.value(namespace, "l1_hit") + CACHE_REQUESTS.value(namespace, "l2_hit")
+        total = hits + CACHE_REQUESTS.value(namespace, "miss")
+        if total:
+            lines.append(f'cache_hit_ratio{{namespace="{namespace}"}} {hits / total:.4f}')
+    return lines
@@ -0,0 +1,138 @@
+"""
+Read-replica routing.
+
+Reads go to the primary unless a view opts in with `@replica_reads`. Inside
+such a view the router picks a healthy replica – one whose replication lag
+is below REPLICA_MAX_LAG_SECONDS – and falls back to the primary when none
+is available. A user who just wrote something is pinned to the primary for
+REPLICA_PIN_SECONDS (see ReplicaPinningMiddleware) so they always read their
+own writes. All writes go to the primary.
+"""
+import contextvars
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PIN_KEY = "replica-pin:{}"
+LAG_CHECK_INTERVAL = 5  # seconds between lag probes per replica
+
+_replica_allowed = contextvars.ContextVar("replica_allowed", default=False)
+_lag_cache = {}  # alias -> (checked_at, lag_seconds)
+
+
+def pin_to_primary(user):
+    """Send `user`'s reads to the primary for the next REPLICA_PIN_SECONDS."""
+    if user is not None and user.is_authenticated:
+        cache.set(PIN_KEY.format(user.pk), 1, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    return user is not None and user.is_authenticated and bool(cache.get(PIN_KEY.format(user.pk)))
+
+
+@contextmanager
+def use_replica(allowed=True):
+    """Allow (or forbid) replica reads for the duration of the block."""
+    token = _replica_allowed.set(allowed)
+    try:
+        yield
+    finally:
+        _replica_allowed.reset(token)
+
+
+def replica_reads(view_method):
+    """
+    Decorator for read-only view methods (sync or async) whose queries may be
+    served by a replica. The request's user is checked for a read-your-writes pin.
+    """
+    if iscoroutinefunction(view_method):
+        @wraps(view_method)
+        async def async_wrapper(self, request, *args, **kwargs):
+            user = getattr(request, "user", None)
+            pinned = user is not None and user.is_authenticated and bool(
+                await cache.aget(PIN_KEY.format(user.pk))
+            )
+            with use_replica(not pinned):
+                return await view_method(self, request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        with use_replica(not is_pinned(getattr(request, "user", None))):
+            return view_method(self, request, *args, **kwargs)
+    return wrapper
+
+
+def _measure_lag(alias):
+    connection = connections[alias]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+            )
+            return float(cursor.fetchone()[0] or 0)
+
+    if connection.vendor == "sqlite":
+        # Local setup: the replica is a copy of the primary file (see sync_local_replica),
+        # so lag is how far the copy is behind the primary's last write.
+        primary, replica = str(settings.DATABASES[DEFAULT_DB_ALIAS]["NAME"]), str(connection.settings_dict["NAME"])
+        if primary == replica or not os.path.exists(primary) or not os.path.exists(replica):
+            return 0.0
+        return max(0.0, os.path.getmtime(primary) - os.path.getmtime(replica))
+
+    return 0.0
+
+
+def replica_lag(alias):
+    """Replication lag of `alias` in seconds, probed at most every LAG_CHECK_INTERVAL."""
+    now = time.monotonic()
+    cached = _lag_cache.get(alias)
+    if cached and now - cached[0] < LAG_CHECK_INTERVAL:
+        return cached[1]
+
+    try:
+        lag = _measure_lag(alias)
+    except DatabaseError as e:
+        logger.warning("Replica %s unavailable: %s", alias, e)
+        lag = float("inf")
+
+    _lag_cache[alias] = (now, lag)
+    return lag
+
+
+def choose_replica():
+    healthy = [
+        alias for alias in settings.DATABASE_REPLICAS
+        if replica_lag(alias) <= settings.REPLICA_MAX_LAG_SECONDS
+    ]
+    return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+
+class ReadReplicaRouter:
+    """Primary for writes and by default for reads; replicas only inside `replica_reads`."""
+
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICAS and _replica_allowed.get():
+            return choose_replica()
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,129 @@
+"""
+Index audit of the live schema (`manage.py audit_indexes`).
+
+Indexes are read back through Django's introspection, so the report shows
+what the database actually has – including the implicit indexes of unique
+columns and foreign keys – rather than what the models declare. An index is
+redundant when another index of the same table makes it unnecessary:
+
+- same leading columns: a non-unique index whose columns are a prefix of
+  another index's (a b-tree serves lookups and ordering on any prefix);
+- duplicate: a unique index with exactly the columns of another unique one.
+
+A unique index is never redundant to a wider one, since it enforces the
+constraint. Expression indexes (Lower("email")) have no columns to compare
+and are left out. Scan counts come from pg_stat_user_indexes on PostgreSQL; other
+backends keep no such statistics and report None.
+"""
+from dataclasses import dataclass, field
+
+from django.apps import apps
+from django.db import connection as default_connection
+
+
+@dataclass
+class IndexInfo:
+    table: str
+    name: str
+    columns: tuple
+    orders: tuple = ()
+    unique: bool = False
+    primary_key: bool = False
+    scans: int = None
+    redundant_to: list = field(default_factory=list)
+
+    @property
+    def key(self):
+        """
+        (column, descending) pairs as a b-tree sees them: reading an index
+        backwards gives the reverse order, so the first column is normalized to
+        ascending, and a single column's order does not matter at all.
+        """
+        descending = [order == "DESC" for order in self.orders] or [False] * len(self.columns)
+        if descending[0]:
+            descending = [not flag for flag in descending]
+        return tuple(zip(self.columns, descending))
+
+    def serves(self, other):
+        """True if every lookup and ordering `other` supports is supported by this index too."""
+        if len(other.columns) == 1:
+            return self.columns[0] == other.columns[0]
+        return self.key[:len(other.key)] == other.key
+
+
+def project_tables(connection=default_connection):
+    """Tables of the project's own models (src.*) that exist in the database."""
+    existing = set(connection.introspection.table_names())
+    return sorted(
+        model._meta.db_table
+        for model in apps.get_models()
+        if model.__module__.startswith("src.") and model._meta.managed and model._meta.db_table in existing
+    )
+
+
+def table_indexes(table, connection=default_connection):
+    """IndexInfo of every index on `table`, as the database reports them."""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+
+    indexes = []
+    for name, info in constraints.items():
+        if not (info["index"] or info["unique"] or info["primary_key"]) or not info["columns"]:
+            continue
+        if info.get("check") or info.get("foreign_key"):
+            continue
+        if None in info["columns"]:
+            # Expression index (e.g. Lower("email")): no columns to compare
+            continue
+        if connection.vendor == "postgresql" and name.endswith("_like"):
+            # Django's varchar_pattern_ops companion index, used by LIKE only
+            continue
+        indexes.append(IndexInfo(
+            table=table,
+            name=name,
+            columns=tuple(info["columns"]),
+            orders=tuple(info.get("orders") or ()),
+            unique=bool(info["unique"] or info["primary_key"]),
+            primary_key=bool(info["primary_key"]),
+        ))
+    return sorted(indexes, key=lambda index: (not index.primary_key, index.name))
+
+
+def _usage(connection):
+    if connection.vendor != "postgresql":
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relname, indexrelname, idx_scan FROM pg_stat_user_indexes")
+        return {(table, name): scans for table, name, scans in cursor.fetchall()}
+
+
+def find_redundant(indexes):
+    """Fill `redundant_to` of each index of one table from the others; returns the redundant ones."""
+    for index in indexes:
+        if index.primary_key:
+            continue
+        for other in indexes:
+            if other is index:
+                continue
+            if index.unique:
+                # Only an identical unique index (the first one by name) makes it unnecessary
+                if other.unique and other.key == index.key and (other.primary_key or other.name < index.name):
+                    index.redundant_to.append(other.name)
+            elif other.serves(index) and (
+                len(other.columns) > len(index.columns) or other.unique or other.name < index.name
+            ):
+                index.redundant_to.append(other.name)
+    return [index for index in indexes if index.redundant_to]
+
+
+def audit(tables=None, connection=default_connection):
+    """{table: [IndexInfo]} with scan counts and redundancy filled in."""
+    usage = _usage(connection)
+    report = {}
+    for table in tables or project_tables(connection):
+        indexes = table_indexes(table, connection)
+        for index in indexes:
+            index.scans = usage.get((table, index.name))
+        find_redundant(indexes)
+        report[table] = indexes
+    return report
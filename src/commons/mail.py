@@ -0,0 +1,301 @@
+"""
+Queued outgoing email.
+
+With EMAIL_BACKEND = "src.commons.mail.QueuedEmailBackend", send_mail() and
+everything built on it (allauth confirmation mails, dj-rest-auth password
+resets) only inserts OutboundEmail rows – the request never waits for the
+mail server. Messages queued inside a transaction are only delivered if it
+commits.
+
+`manage.py send_queued_mail` delivers the queue through EMAIL_DELIVERY_BACKEND
+(SMTP in production, the file or locmem backend locally): due rows are
+claimed in batches, sent over one connection that stays open while there is
+work, and failures are retried with exponential backoff until
+EMAIL_QUEUE_MAX_ATTEMPTS. Delivery is at-least-once: a worker that dies
+mid-batch leaves its rows to be retried when their claim lease expires.
+Message-ID and Date are fixed at enqueue time, so a repeated delivery is the
+same message to the receiving server.
+"""
+import base64
+import logging
+from dataclasses import dataclass, field
+from datetime import timedelta
+from email.mime.base import MIMEBase
+from email.utils import formatdate, make_msgid
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.utils import DNS_NAME
+from django.db import DatabaseError, transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Max, Min
+from django.utils import timezone
+
+from src.commons.metrics import REGISTRY
+from src.commons.models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# Longest wait between two attempts of one message
+MAX_RETRY_SECONDS = 3600
+# A claimed batch is invisible to other workers for this long
+CLAIM_LEASE_SECONDS = 300
+# Window of sent messages behind the delivery latency metrics
+LATENCY_WINDOW = timedelta(minutes=15)
+
+
+# ====================================================================================== ENQUEUE
+
+def _attachment_row(attachment):
+    if isinstance(attachment, MIMEBase):
+        raise TypeError("MIMEBase attachments can't be queued")
+    filename, content, mimetype = attachment
+    if isinstance(content, bytes):
+        return {"filename": filename, "content_b64": base64.b64encode(content).decode(), "mimetype": mimetype}
+    return {"filename": filename, "content": content, "mimetype": mimetype}
+
+
+def message_to_row(message, now=None):
+    """An unsaved OutboundEmail for `message`. TypeError if it can't be stored."""
+    headers = {str(name): str(value) for name, value in message.extra_headers.items()}
+    if not any(name.lower() == "message-id" for name in headers):
+        headers["Message-ID"] = make_msgid(domain=DNS_NAME)
+    if not any(name.lower() == "date" for name in headers):
+        headers["Date"] = formatdate(localtime=settings.EMAIL_USE_LOCALTIME)
+
+    return OutboundEmail(
+        subject=str(message.subject),
+        body=str(message.body),
+        from_email=str(message.from_email),
+        to=[str(address) for address in message.to],
+        cc=[str(address) for address in message.cc],
+        bcc=[str(address) for address in message.bcc],
+        reply_to=[str(address) for address in message.reply_to],
+        headers=headers,
+        alternatives=[[str(content), mimetype] for content, mimetype in getattr(message, "alternatives", [])],
+        attachments=[_attachment_row(attachment) for attachment in message.attachments],
+        content_subtype=message.content_subtype,
+        next_attempt_at=now or timezone.now(),
+    )
+
+
+def row_to_message(row, connection=None):
+    message = EmailMultiAlternatives(
+        subject=row.subject,
+        body=row.body,
+        from_email=row.from_email,
+        to=row.to,
+        cc=row.cc,
+        bcc=row.bcc,
+        reply_to=row.reply_to,
+        headers=row.headers,
+        alternatives=[tuple(alternative) for alternative in row.alternatives],
+        connection=connection,
+    )
+    message.content_subtype = row.content_subtype
+    for attachment in row.attachments:
+        content = (
+            base64.b64decode(attachment["content_b64"]) if "content_b64" in attachment
+            else attachment["content"]
+        )
+        message.attach(attachment["filename"], content, attachment["mimetype"])
+    return message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """
+    Stores messages in the OutboundEmail queue and returns immediately.
+    Messages that can't be stored (MIMEBase attachments) are sent right away
+    through EMAIL_DELIVERY_BACKEND.
+    """
+
+    def send_messages(self, email_messages):
+        now = timezone.now()
+        rows, direct = [], []
+        for message in email_messages:
+            if not message.recipients():
+                continue
+            try:
+                rows.append(message_to_row(message, now))
+            except TypeError:
+                direct.append(message)
+
+        try:
+            OutboundEmail.objects.bulk_create(rows)
+        except DatabaseError:
+            if not self.fail_silently:
+                raise
+            logger.exception("Failed to queue %s email(s)", len(rows))
+            rows = []
+
+        sent = len(rows)
+        if direct:
+            connection = get_connection(settings.EMAIL_DELIVERY_BACKEND, fail_silently=self.fail_silently)
+            sent += connection.send_messages(direct) or 0
+        return sent
+
+
+# ====================================================================================== DELIVERY
+
+@dataclass
+class DeliveryStats:
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+    latencies: list = field(default_factory=list)  # seconds from enqueue to delivery
+
+    def merge(self, other):
+        self.sent += other.sent
+        self.retried += other.retried
+        self.failed += other.failed
+        self.latencies += other.latencies
+
+
+def retry_delay(attempts):
+    """Seconds to wait after the `attempts`-th failed attempt."""
+    return min(settings.EMAIL_QUEUE_RETRY_SECONDS * 2 ** (attempts - 1), MAX_RETRY_SECONDS)
+
+
+def claim_batch(batch_size):
+    """
+    Due pending rows, at most `batch_size`, leased to this worker. Other workers
+    skip them (SKIP LOCKED while claiming, the pushed-back next_attempt_at after).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.Status.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=ids).update(
+            next_attempt_at=now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+        )
+    return list(OutboundEmail.objects.filter(pk__in=ids).order_by("created_at"))
+
+
+def _record_failure(row, error, stats):
+    attempts = row.attempts + 1
+    if attempts >= settings.EMAIL_QUEUE_MAX_ATTEMPTS:
+        status, next_attempt_at = OutboundEmail.Status.FAILED, timezone.now()
+        stats.failed += 1
+        logger.error("Email %s to %s failed permanently: %s", row.pk, row.to, error)
+    else:
+        status = OutboundEmail.Status.PENDING
+        next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(attempts))
+        stats.retried += 1
+        logger.warning("Email %s to %s failed (attempt %s): %s", row.pk, row.to, attempts, error)
+
+    OutboundEmail.objects.filter(pk=row.pk).update(
+        status=status, attempts=attempts, next_attempt_at=next_attempt_at, last_error=str(error)[:2000]
+    )
+
+
+def deliver_batch(rows, connection):
+    """
+    Send `rows` over `connection`, one message at a time so a refused
+    recipient only fails its own message. The connection is kept open between
+    messages and reopened after a send error; if it can't be opened, the rest
+    of the batch is retried later.
+    """
+    stats = DeliveryStats()
+    sent_ids = []
+    for index, row in enumerate(rows):
+        try:
+            # A no-op while the connection is up
+            connection.open()
+        except Exception as e:
+            for pending in rows[index:]:
+                _record_failure(pending, e, stats)
+            break
+
+        try:
+            delivered = connection.send_messages([row_to_message(row, connection)])
+        except Exception as e:
+            _record_failure(row, e, stats)
+            connection.close()
+            continue
+        if not delivered:
+            _record_failure(row, "backend reported the message as not sent", stats)
+            continue
+        sent_ids.append(row.pk)
+        stats.latencies.append((timezone.now() - row.created_at).total_seconds())
+
+    if sent_ids:
+        OutboundEmail.objects.filter(pk__in=sent_ids).update(
+            status=OutboundEmail.Status.SENT, sent_at=timezone.now(), last_error=""
+        )
+        stats.sent = len(sent_ids)
+    return stats
+
+
+def deliver_queued(batch_size=None, max_batches=None, connection=None):
+    """
+    Deliver due messages batch by batch until the queue has nothing due (or
+    `max_batches` is reached), reusing one delivery connection throughout.
+    """
+    batch_size = batch_size or settings.EMAIL_QUEUE_BATCH_SIZE
+    connection = connection or get_connection(settings.EMAIL_DELIVERY_BACKEND)
+    stats = DeliveryStats()
+    batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            rows = claim_batch(batch_size)
+            if not rows:
+                break
+            stats.merge(deliver_batch(rows, connection))
+            batches += 1
+    finally:
+        # Not kept across idle polls – mail servers drop idle connections anyway
+        connection.close()
+    return stats
+
+
+def purge_sent(older_than_days):
+    """Delete sent messages older than `older_than_days`. Returns the row count."""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = OutboundEmail.objects.filter(status=OutboundEmail.Status.SENT, sent_at__lt=cutoff).delete()
+    return deleted
+
+
+# ====================================================================================== METRICS
+
+@REGISTRY.add_collector
+def email_queue_metrics():
+    now = timezone.now()
+    depth = dict(
+        OutboundEmail.objects
+        # Not exclude(SENT): that walks every sent row kept for purge_sent()
+        .filter(status__in=[OutboundEmail.Status.PENDING, OutboundEmail.Status.FAILED])
+        .values_list("status")
+        .annotate(n=Count("id"))
+    )
+    oldest = OutboundEmail.objects.filter(status=OutboundEmail.Status.PENDING).aggregate(oldest=Min("created_at"))["oldest"]
+    latency = (
+        OutboundEmail.objects
+        .filter(status=OutboundEmail.Status.SENT, sent_at__gte=now - LATENCY_WINDOW)
+        .annotate(latency=ExpressionWrapper(F("sent_at") - F("created_at"), output_field=DurationField()))
+        .aggregate(n=Count("id"), avg=Avg("latency"), max=Max("latency"))
+    )
+
+    window = int(LATENCY_WINDOW.total_seconds())
+    return [
+        "# HELP email_queue_depth Queued emails not yet sent, by status.",
+        "# TYPE email_queue_depth gauge",
+        *(
+            f'email_queue_depth{{status="{status}"}} {depth.get(status, 0)}'
+            for status in (OutboundEmail.Status.PENDING, OutboundEmail.Status.FAILED)
+        ),
+        "# HELP email_queue_oldest_pending_seconds Age of the oldest pending email.",
+        "# TYPE email_queue_oldest_pending_seconds gauge",
+        f"email_queue_oldest_pending_seconds {(now - oldest).total_seconds() if oldest else 0}",
+        f"# HELP email_sent_recent Emails delivered in the last {window}s.",
+        "# TYPE email_sent_recent gauge",
+        f"email_sent_recent {latency['n']}",
+        f"# HELP email_delivery_latency_seconds Enqueue-to-delivery time of emails sent in the last {window}s.",
+        "# TYPE email_delivery_latency_seconds gauge",
+        f'email_delivery_latency_seconds{{stat="avg"}} {latency["avg"].total_seconds() if latency["avg"] else 0}',
+        f'email_delivery_latency_seconds{{stat="max"}} {latency["max"].total_seconds() if latency["max"] else 0}',
+    ]
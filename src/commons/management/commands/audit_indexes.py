@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from src.commons.indexes import audit
+
+
+class Command(BaseCommand):
+    help = (
+        "Report the indexes of the project's tables as the database has them: columns, "
+        "scan counts (PostgreSQL) and indexes made redundant by another one. Exits with "
+        "an error when --fail-on-redundant is given and any index is redundant."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("tables", nargs="*", help="Only these tables (default: every project table)")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument("--fail-on-redundant", action="store_true")
+
+    def handle(self, *args, **options):
+        report = audit(options["tables"], connections[options["database"]])
+
+        redundant = 0
+        for table, indexes in report.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(table))
+            for index in indexes:
+                columns = ", ".join(
+                    f"{column} DESC" if order == "DESC" else column
+                    for column, order in zip(index.columns, index.orders or [None] * len(index.columns))
+                )
+                kind = "primary key" if index.primary_key else "unique" if index.unique else "index"
+                scans = "n/a" if index.scans is None else index.scans
+                line = f"  {index.name:40} {kind:11} scans={scans!s:>8}  ({columns})"
+                if index.redundant_to:
+                    redundant += 1
+                    line = self.style.WARNING(f"{line}  redundant: {', '.join(index.redundant_to)}")
+                self.stdout.write(line)
+
+        summary = f"{sum(len(indexes) for indexes in report.values())} indexes, {redundant} redundant"
+        if redundant and options["fail_on_redundant"]:
+            raise CommandError(summary)
+        self.stdout.write(summary)
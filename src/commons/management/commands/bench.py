@@ -0,0 +1,117 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from src.commons.bench import report
+from src.commons.bench.dataset import isolated_database, seed
+from src.commons.bench.runner import SCENARIOS, Runner
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset into a throwaway test database and benchmark every API endpoint "
+        "in-process: p50/p95/p99 latency, queries per request, throughput under concurrent load "
+        "and ingestion rows/sec. Results are written as JSON for diffing between commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--games", type=int, default=100_000, help="GameHistory rows to seed")
+        parser.add_argument("--pending-referrals", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=42, help="Random seed for the dataset")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and pass")
+        parser.add_argument("--concurrency", type=int, default=8, help="In-flight requests for the load pass (1 skips it)")
+        parser.add_argument("--endpoint", action="append", dest="endpoints",
+                            help="Only run scenarios whose name starts with this (repeatable)")
+        parser.add_argument("--output", default="bench-results.json")
+        parser.add_argument("--compare", metavar="BASELINE", help="Report the deltas against an earlier results file")
+        parser.add_argument("--threshold", type=float, default=0.2,
+                            help="Relative p95 growth counted as a regression with --compare")
+        parser.add_argument("--fast-password-hasher", action="store_true",
+                            help="Hash passwords with MD5 so auth scenarios measure everything but the hasher")
+
+    def handle(self, *args, **options):
+        scenarios = SCENARIOS
+        if options["endpoints"]:
+            scenarios = [s for s in SCENARIOS if s.name.startswith(tuple(options["endpoints"]))]
+            if not scenarios:
+                raise CommandError(f"No scenario matches {options['endpoints']}")
+
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+
+        overrides = {}
+        if options["fast_password_hasher"]:
+            overrides["PASSWORD_HASHERS"] = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+        with isolated_database(), override_settings(
+            SECURE_SSL_REDIRECT=False,
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            **overrides,
+        ):
+            self.stdout.write(f"Seeding {options['users']} users, {options['games']} games...")
+            started = time.perf_counter()
+            dataset = seed(
+                users=options["users"],
+                games=options["games"],
+                pending_referrals=options["pending_referrals"],
+                seed_value=options["seed"],
+            )
+            self.stdout.write(f"Seeded in {time.perf_counter() - started:.1f}s")
+            for table, stats in dataset.ingestion.items():
+                self.stdout.write(f"  {table:18} {stats['rows']:>10} rows {stats['rows_per_sec']:>12} rows/sec")
+
+            runner = Runner(dataset, requests=options["requests"], concurrency=options["concurrency"])
+            header = f"{'endpoint':32} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'rps':>8} {'status':>10}"
+            self.stdout.write(header)
+            self.stdout.write("-" * len(header))
+            endpoints = runner.run(scenarios, progress=self._print_row)
+
+            results = {
+                "meta": report.metadata(
+                    dataset={
+                        "users": options["users"],
+                        "games": options["games"],
+                        "pending_referrals": options["pending_referrals"],
+                        "seed": options["seed"],
+                    },
+                    requests=options["requests"],
+                    concurrency=options["concurrency"],
+                    fast_password_hasher=options["fast_password_hasher"],
+                ),
+                "ingestion": dataset.ingestion,
+                "endpoints": endpoints,
+            }
+
+        report.write(options["output"], results)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if baseline:
+            self._print_comparison(baseline, results, options["threshold"])
+
+    def _print_row(self, name, result):
+        seq = result["sequential"]
+        rps = result["concurrent"]["throughput_rps"] if result["concurrent"] else "-"
+        statuses = ",".join(sorted(seq["status_codes"]))
+        self.stdout.write(
+            f"{name:32} {seq['p50_ms']:>8} {seq['p95_ms']:>8} {seq['p99_ms']:>8} "
+            f"{seq['queries_per_request']:>8} {rps:>8} {statuses:>10}"
+        )
+
+    def _print_comparison(self, baseline, results, threshold):
+        self.stdout.write(f"\nCompared with {baseline['meta'].get('git_commit')}:")
+        regressions = 0
+        for name, metric, old, new, regressed in report.compare(baseline, results, threshold):
+            line = f"  {name:32} {metric:34} {old:>10} -> {new:<10}"
+            if regressed:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(line + " REGRESSION"))
+            else:
+                self.stdout.write(line)
+        if regressions:
+            self.stdout.write(self.style.WARNING(f"{regressions} regression(s)"))
@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from src.commons.bench.asgi import ENDPOINTS, compare
+from src.commons.bench.dataset import isolated_database, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the async (ASGI) and sync (WSGI) paths of the hot read endpoints: "
+        "throughput, latency, threads and heap per in-flight request. "
+        "Runs against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--games-per-user", type=int, default=20)
+        parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and concurrency level")
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+        parser.add_argument("--endpoint", action="append", dest="endpoints", help="Limit to these paths")
+        parser.add_argument("--output", help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            dataset = seed(users=options["users"], games=options["users"] * options["games_per_user"])
+            results = compare(
+                dataset.tokens,
+                requests=options["requests"],
+                concurrency_levels=options["concurrency"],
+                endpoints=options["endpoints"] or ENDPOINTS,
+            )
+
+        header = f"{'endpoint':32} {'server':6} {'conc':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'threads':>8} {'KB/req':>8} {'err':>4}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for r in results:
+            self.stdout.write(
+                f"{r['endpoint']:32} {r['server']:6} {r['concurrency']:>5} {r['throughput_rps']:>8} "
+                f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['peak_threads']:>8} {r['heap_per_inflight_kb']:>8} {r['errors']:>4}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
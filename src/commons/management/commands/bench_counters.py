@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from src.commons.bench.contention import run
+from src.commons.bench.dataset import isolated_database, seed
+from src.services.user import counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Contention benchmark for sharded counters: many threads increment one user's "
+        "wallet coins (or game points) with each COUNTER_SHARDS value and report "
+        "throughput and latency. Runs against a throwaway test database; only "
+        "PostgreSQL shows the effect of the shards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shards", default="0,8", help="Comma-separated COUNTER_SHARDS values to compare")
+        parser.add_argument("--counter", choices=[counters.COINS, counters.GAME_POINTS], default=counters.COINS)
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--increments", type=int, default=100, help="Increments per thread")
+        parser.add_argument("--hold-ms", type=float, default=2.0,
+                            help="Time the transaction stays open after each increment")
+        parser.add_argument("--output", help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            dataset = seed(users=1, games=0, pending_referrals=0)
+            results = run(
+                dataset.user_ids[0],
+                shard_counts=[int(value) for value in options["shards"].split(",")],
+                counter=options["counter"],
+                threads=options["threads"],
+                increments=options["increments"],
+                hold=options["hold_ms"] / 1000,
+            )
+
+        header = f"{'shards':>6} {'threads':>7} {'increments':>10} {'errors':>6} {'incr/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'consistent':>10}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for result in results:
+            self.stdout.write(
+                f"{result['shards']:>6} {result['threads']:>7} {result['increments']:>10} {result['errors']:>6} "
+                f"{result['increments_per_sec']:>9} {result['p50_ms']:>8} {result['p99_ms']:>8} {result['consistent']!s:>10}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from src.commons.bench import report
+from src.commons.bench.serialization import run
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmark DRF's JSON renderer/parser against the orjson-backed ones "
+        "on game history and leaderboard payloads, plus GameHistorySerializer against "
+        "its compiled read plan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100, help="Rows per payload")
+        parser.add_argument("--number", type=int, default=500, help="Calls per timing run")
+        parser.add_argument("--output", help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        results = run(rows=options["rows"], number=options["number"])
+
+        serialize = results["serialize_game_history_us"]
+        self.stdout.write(
+            f"game history page, {results['rows']} rows: GameHistorySerializer {serialize['drf']} us, "
+            f"read plan {serialize['plan']} us ({serialize['drf'] / serialize['plan']:.1f}x)"
+        )
+        self.stdout.write(f"{'operation':26} {'drf us':>10} {'fast us':>10} {'speedup':>8}")
+        for key in ("render_game_history_us", "render_leaderboard_us", "parse_add_game_request_us", "parse_game_history_us"):
+            drf, fast = results[key]["drf"], results[key]["fast"]
+            self.stdout.write(f"{key[:-3]:26} {drf:>10} {fast:>10} {drf / fast:>7.1f}x")
+
+        if options["output"]:
+            report.write(options["output"], {"meta": report.metadata(), "json": results})
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
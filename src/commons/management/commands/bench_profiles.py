@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from src.commons.bench import report
+from src.commons.bench.profiles import PROFILES, compare
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare settings profiles (full vs API-only): cold-start time, worker RSS "
+        "and per-request latency of token-authenticated endpoints. Each profile runs "
+        "in its own interpreter against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profile", action="append", dest="profiles", help="Settings modules to compare")
+        parser.add_argument("--runs", type=int, default=5, help="Cold starts per profile")
+        parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint")
+        parser.add_argument("--output", help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        profiles = options["profiles"] or PROFILES
+        results = compare(profiles, runs=options["runs"], requests=options["requests"])
+
+        self.stdout.write(
+            f"{'profile':22} {'startup ms':>11} {'modules':>8} {'RSS MB':>8} {'worker RSS MB':>14} {'middleware us':>14}"
+        )
+        for module, result in results.items():
+            cold = result["cold_start"]
+            self.stdout.write(
+                f"{module:22} {cold['seconds_median'] * 1000:>11.1f} {cold['modules']:>8} "
+                f"{cold['rss_kb'] / 1024:>8.1f} {result['requests']['rss_kb'] / 1024:>14.1f} "
+                f"{result['requests']['middleware_us']:>14}"
+            )
+
+        self.stdout.write(f"\n{'endpoint':16} " + " ".join(f"{m + ' p50 ms':>26}" for m in profiles))
+        baseline = results[profiles[0]]["requests"]["endpoints"]
+        for name in baseline:
+            cells = []
+            for module in profiles:
+                p50 = results[module]["requests"]["endpoints"][name]["p50_ms"]
+                delta = p50 - baseline[name]["p50_ms"]
+                cells.append(f"{p50:>17.3f} ({delta:+.3f})")
+            self.stdout.write(f"{name:16} " + " ".join(f"{c:>26}" for c in cells))
+
+        if options["output"]:
+            report.write(options["output"], {"meta": report.metadata(), "profiles": results})
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from src.commons.bench import report
+from src.commons.bench.ranks import run
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmark the in-memory leaderboard rank snapshots: memory per million "
+        "players, build time, and rank/percentile/top-K/page lookup times on synthetic "
+        "standings. No database needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--players", default="100000,1000000", help="Comma-separated player counts")
+        parser.add_argument("--number", type=int, default=10000, help="Lookups per timing run")
+        parser.add_argument("--output", help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        results = [run(int(players), options["number"]) for players in options["players"].split(",")]
+
+        header = f"{'players':>9} {'MiB':>7} {'MiB/1M':>7} {'build ms':>9} {'rank us':>8} {'pct us':>7} {'top100 us':>9} {'page us':>8}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for result in results:
+            self.stdout.write(
+                f"{result['players']:>9} {result['bytes'] / 2**20:>7.1f} "
+                f"{result['bytes_per_million_players'] / 2**20:>7.1f} {result['build_ms']:>9} "
+                f"{result['rank_us']:>8} {result['percentile_us']:>7} {result['top_100_us']:>9} {result['page_us']:>8}"
+            )
+
+        if options["output"]:
+            report.write(options["output"], {"meta": report.metadata(), "ranks": results})
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,54 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from src.commons.bench.dataset import isolated_database, seed
+from src.commons.bench.stream import run
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the live leaderboard stream: open many SSE subscribers, insert bursts "
+        "of games and report recomputes per burst, fan-out latency and heap per subscriber. "
+        "Runs against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--games-per-user", type=int, default=20)
+        parser.add_argument("--subscribers", type=int, default=2000)
+        parser.add_argument("--bursts", type=int, default=5)
+        parser.add_argument("--burst-size", type=int, default=50, help="Games inserted per burst")
+        parser.add_argument("--interval", type=float, default=1.0, help="LEADERBOARD_STREAM_INTERVAL for the run")
+        parser.add_argument("--output", help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            dataset = seed(users=options["users"], games=options["users"] * options["games_per_user"])
+            result = run(
+                dataset.tokens,
+                dataset.user_ids,
+                subscribers=options["subscribers"],
+                bursts=options["bursts"],
+                burst_size=options["burst_size"],
+                interval=options["interval"],
+            )
+
+        self.stdout.write(
+            f"{result['subscribers']} subscribers on {result['topics']} pages, "
+            f"connected in {result['connect_s']}s ({result['errors']} errors), "
+            f"{result['heap_per_subscriber_kb']} KB heap per subscriber"
+        )
+        header = f"{'burst':>5} {'games':>6} {'insert ms':>10} {'recomputes':>11} {'delivered':>10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for index, burst in enumerate(result["bursts"], 1):
+            self.stdout.write(
+                f"{index:>5} {result['burst_size']:>6} {burst['insert_ms']:>10} {burst['recomputes']:>11} "
+                f"{burst['delivered']:>10} {burst['fanout_p50_ms']!s:>8} {burst['fanout_p99_ms']!s:>8} {burst['fanout_max_ms']!s:>8}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(result, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from src.api.schema import generate_schema_artifacts
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI schema into OPENAPI_SCHEMA_DIR (JSON and YAML, plain and gzipped). "
+        "Run at build/deploy time; /api/swagger.json serves these files."
+    )
+
+    def handle(self, *args, **options):
+        for path in generate_schema_artifacts():
+            self.stdout.write(f"{path} ({path.stat().st_size} bytes)")
+        self.stdout.write(self.style.SUCCESS("OpenAPI schema generated"))
@@ -0,0 +1,45 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from src.commons.mail import deliver_queued, purge_sent
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued emails (OutboundEmail) through EMAIL_DELIVERY_BACKEND in batches "
+        "over one reused connection. Failed messages are retried with backoff. "
+        "Several workers may run at once – each claims its own batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.EMAIL_QUEUE_BATCH_SIZE, help="Messages claimed per batch")
+        parser.add_argument("--max-batches", type=int, default=None, help="Stop a run after this many batches")
+        parser.add_argument("--loop", action="store_true", help="Keep polling for new messages")
+        parser.add_argument("--interval", type=float, default=5, help="Polling interval with --loop")
+        parser.add_argument("--purge-days", type=int, default=None, help="Also delete sent messages older than this")
+
+    def handle(self, *args, **options):
+        while True:
+            self._run_once(options)
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+    def _run_once(self, options):
+        stats = deliver_queued(batch_size=options["batch_size"], max_batches=options["max_batches"])
+        if stats.sent or stats.retried or stats.failed:
+            latency = ""
+            if stats.latencies:
+                latency = (
+                    f", latency median {statistics.median(stats.latencies):.2f}s "
+                    f"max {max(stats.latencies):.2f}s"
+                )
+            self.stdout.write(f"Sent {stats.sent}, retrying {stats.retried}, failed {stats.failed}{latency}")
+
+        if options["purge_days"] is not None:
+            deleted = purge_sent(options["purge_days"])
+            if deleted:
+                self.stdout.write(f"Purged {deleted} sent message(s)")
@@ -0,0 +1,31 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the local SQLite primary into the SQLite replica file(s) "
+        "(LOCAL_REPLICA=True). Run it again to simulate the replica catching up."
+    )
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if primary["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError("Only available for the local SQLite setup.")
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No replicas configured – set LOCAL_REPLICA=True.")
+
+        source = sqlite3.connect(primary["NAME"])
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                target = sqlite3.connect(settings.DATABASES[alias]["NAME"])
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(self.style.SUCCESS(f"{alias} synced from {primary['NAME']}"))
+        finally:
+            source.close()
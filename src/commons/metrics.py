@@ -0,0 +1,196 @@
+"""
+In-process request and database metrics, exported in the Prometheus text
+format on /metrics (see MetricsView).
+
+Every request records its latency. A sampled subset (METRICS_SAMPLE_RATE)
+also records how many queries it ran, how long they took and whether the
+same SQL shape repeated often enough to look like an N+1. Query timing uses
+a connection execute wrapper that is installed once per connection and is
+a no-op unless the current request is being sampled.
+
+Metrics live in process memory: with several server workers each worker
+exports its own numbers.
+"""
+import contextvars
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _ShapeCounter
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(n, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for n, v in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_label_str(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                names = self.labelnames + ("le",)
+                lines.append(f"{self.name}_bucket{_label_str(names, labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_count{_label_str(self.labelnames, labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """
+    Holds the metrics plus `collectors`: callables returning extra exposition
+    lines computed at scrape time (queue depths, cache ratios, ...).
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+        return collector
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.expose())
+        for collector in self.collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector {collector.__name__} failed: {e}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route.",
+    ("route", "method", "status"),
+))
+SAMPLED_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_sampled_total", "Requests whose database queries were recorded.",
+    ("route",),
+))
+QUERY_COUNT = REGISTRY.register(Histogram(
+    "db_queries_per_request", "Database queries per sampled request.",
+    ("route",), buckets=QUERY_COUNT_BUCKETS,
+))
+QUERY_TIME = REGISTRY.register(Histogram(
+    "db_query_seconds_per_request", "Total database time per sampled request.",
+    ("route",),
+))
+N_PLUS_ONE = REGISTRY.register(Counter(
+    "db_n_plus_one_total", "Sampled requests that repeated one SQL shape at least the N+1 threshold.",
+    ("route",),
+))
+
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def sql_shape(sql):
+    """SQL with parameter lists collapsed, so `IN (%s, %s)` and `IN (%s)` match."""
+    return _WHITESPACE.sub(" ", _IN_LIST.sub("IN (...)", sql)).strip()
+
+
+class QueryRecorder:
+    """Per-request query statistics, filled by `record_query`."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = _ShapeCounter()
+
+    def repeated_shapes(self, threshold):
+        return [(shape, n) for shape, n in self.shapes.items() if n >= threshold]
+
+
+current_recorder = contextvars.ContextVar("metrics_query_recorder", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.count += 1
+        recorder.duration += time.perf_counter() - started
+        recorder.shapes[sql_shape(sql)] += 1
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    # Connections are per thread, so the wrapper is attached when each one is
+    # opened rather than per request. Inserted first: execute_wrapper() blocks
+    # pop() the last entry on exit, which must stay theirs.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
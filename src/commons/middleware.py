@@ -0,0 +1,175 @@
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
+
+from src.commons import metrics
+from src.commons.db_router import pin_to_primary
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class RequestMetricsMiddleware:
+    """
+    Records request latency for every request and, for a METRICS_SAMPLE_RATE
+    share of them, query count, query time and N+1 suspects (one SQL shape
+    repeated METRICS_N_PLUS_ONE_THRESHOLD times or more). Works under WSGI
+    and ASGI – the recorder is carried in a context variable, so queries run
+    by the async ORM in worker threads are attributed to the right request.
+    Should be the first middleware so the latency covers the whole stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        started, recorder, token = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                metrics.current_recorder.reset(token)
+        self._finish(request, response, started, recorder)
+        return response
+
+    async def __acall__(self, request):
+        started, recorder, token = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                metrics.current_recorder.reset(token)
+        self._finish(request, response, started, recorder)
+        return response
+
+    def _start(self):
+        recorder = token = None
+        if random.random() < settings.METRICS_SAMPLE_RATE:
+            recorder = metrics.QueryRecorder()
+            token = metrics.current_recorder.set(recorder)
+        return time.perf_counter(), recorder, token
+
+    def _finish(self, request, response, started, recorder):
+        match = getattr(request, "resolver_match", None)
+        route = match.route if match else "unmatched"
+
+        metrics.REQUEST_LATENCY.observe(
+            time.perf_counter() - started, route, request.method, response.status_code
+        )
+        if recorder is None:
+            return
+
+        metrics.SAMPLED_REQUESTS.inc(route)
+        metrics.QUERY_COUNT.observe(recorder.count, route)
+        metrics.QUERY_TIME.observe(recorder.duration, route)
+
+        repeated = recorder.repeated_shapes(settings.METRICS_N_PLUS_ONE_THRESHOLD)
+        if repeated:
+            metrics.N_PLUS_ONE.inc(route)
+            for shape, count in repeated:
+                logger.warning(f"Possible N+1 on {route}: {count}x {shape[:200]}")
+
+
+class ReplicaPinningMiddleware(MiddlewareMixin):
+    """
+    Pins a user to the primary database for a short window after any
+    successful write request, so their next reads see what they just wrote
+    even if the replicas are a little behind.
+    DRF copies the token-authenticated user onto the Django request, so
+    `request.user` is the real user here by the time the response comes back.
+    """
+
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(getattr(request, "user", None))
+        return response
+
+
+def is_token_api_request(request):
+    return (
+        request.path.startswith(tuple(settings.TOKEN_API_PATH_PREFIXES))
+        and request.META.get("HTTP_AUTHORIZATION", "").startswith("Token ")
+    )
+
+
+class TokenAPIMiddleware:
+    """
+    Runs the middleware listed in SESSION_STACK_MIDDLEWARE (sessions, CSRF,
+    auth, messages) for every request except token-authenticated
+    calls under TOKEN_API_PATH_PREFIXES, which go straight to the view.
+    Those requests are authenticated by DRF's TokenAuthentication and never
+    read the session, so loading it, setting CSRF cookies and flushing
+    messages is wasted work.
+
+    Takes the place of the wrapped entries in MIDDLEWARE and forwards their
+    process_view / process_exception / process_template_response hooks, so
+    the stack behaves exactly as before for everything else. WSGI only.
+    """
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._view_hooks = []
+        self._template_response_hooks = []
+        self._exception_hooks = []
+
+        # Same assembly as BaseHandler.load_middleware
+        handler = convert_exception_to_response(get_response)
+        for middleware_path in reversed(settings.SESSION_STACK_MIDDLEWARE):
+            try:
+                mw_instance = import_string(middleware_path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(mw_instance, "process_view"):
+                self._view_hooks.insert(0, mw_instance.process_view)
+            if hasattr(mw_instance, "process_template_response"):
+                self._template_response_hooks.append(mw_instance.process_template_response)
+            if hasattr(mw_instance, "process_exception"):
+                self._exception_hooks.append(mw_instance.process_exception)
+            handler = convert_exception_to_response(mw_instance)
+        self.session_stack = handler
+
+    def __call__(self, request):
+        if is_token_api_request(request):
+            return self.get_response(request)
+        return self.session_stack(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if is_token_api_request(request):
+            return None
+        for hook in self._view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        if not is_token_api_request(request):
+            for hook in self._template_response_hooks:
+                response = hook(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        if is_token_api_request(request):
+            return None
+        for hook in self._exception_hooks:
+            response = hook(request, exception)
+            if response:
+                return response
+        return None
@@ -1,3 +1,48 @@
 from django.db import models
 
-# Create your models here.
+
+class OutboundEmail(models.Model):
+    """
+    Queued outgoing email. QueuedEmailBackend stores messages here instead of
+    talking to the mail server inside the request; the `send_queued_mail`
+    worker delivers them in batches (see src/commons/mail.py).
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        SENT = "sent", "Sent"
+        FAILED = "failed", "Failed"
+
+    subject = models.TextField(blank=True, default="")
+    body = models.TextField(blank=True, default="")
+    from_email = models.CharField(max_length=320)
+    # Address lists, extra headers, HTML/text alternatives and base64 attachments
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list, blank=True)
+    bcc = models.JSONField(default=list, blank=True)
+    reply_to = models.JSONField(default=list, blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+    alternatives = models.JSONField(default=list, blank=True)
+    attachments = models.JSONField(default=list, blank=True)
+    content_subtype = models.CharField(max_length=20, default="plain")
+
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Due time for pending rows: now on enqueue, pushed back by retries and
+    # while a worker holds the row (claim lease)
+    next_attempt_at = models.DateTimeField()
+    sent_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Outbound Email"
+        verbose_name_plural = "Outbound Emails"
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.subject!r} to {', '.join(self.to)} ({self.status})"
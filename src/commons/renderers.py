@@ -0,0 +1,78 @@
+"""
+orjson-backed drop-ins for DRF's JSONRenderer and JSONParser.
+
+Both produce what the DRF classes produce. Values orjson formats differently
+are handed to DRF's own encoder (datetimes, times, Decimals, lazy strings,
+...), and anything orjson can't do identically falls back to the stdlib
+path: indented or non-compact output, ensure_ascii, integers over 64 bits
+and non-string keys. Without orjson installed they behave exactly like the
+DRF classes.
+
+Known differences, both for values this API never returns:
+- floats below 1e-4 or from 1e16 in magnitude keep their value but are
+  spelled the orjson way (0.00001, 1e16 instead of 1e-05, 1e+16) –
+  detecting them costs more than the whole orjson encode;
+- NaN and infinity render as null, where the stdlib raises (STRICT_JSON).
+"""
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+# orjson reads integers beyond 64 bits as floats, silently losing precision, so a
+# body with a run of 19+ digits goes to the stdlib. Mapping every byte to "0" (digit)
+# or " " and searching for the run is several times faster than a regex.
+_DIGITS = bytes(ord("0") if chr(i) in "0123456789" else ord(" ") for i in range(256))
+_LONG_NUMBER = b"0" * 19
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same escaping as JSONRenderer: U+2028/U+2029 are valid JSON but not valid JavaScript
+        if b"\xe2\x80" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class FastJSONParser(JSONParser):
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        if _LONG_NUMBER not in body.translate(_DIGITS):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                # The stdlib accepts a few inputs orjson rejects (lone surrogate
+                # escapes) and otherwise raises the same ParseError as before
+                pass
+        return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,197 @@
+"""
+Compiled read-only serialization.
+
+`ReadPlan(SerializerClass)` inspects a ModelSerializer once and turns
+`.values()` rows straight into the dicts the serializer would produce,
+skipping model instantiation and DRF's per-field get_attribute /
+to_representation calls. Output is identical to `Serializer(obj).data`;
+fields without a compiled converter use the field's own to_representation.
+
+Model properties exposed by the serializer (ReadOnlyField on a property)
+are evaluated with the property's own getter against the row, so the
+columns each one reads must be declared in `property_columns`.
+"""
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models.fields.files import FileField as ModelFileField
+from django.utils import timezone
+from rest_framework import fields as drf_fields
+from rest_framework import relations
+from rest_framework.settings import ISO_8601, api_settings
+
+
+class _RowView:
+    """Attribute access to a values() row, for running model property getters."""
+    __slots__ = ("_row",)
+
+    def __init__(self, row):
+        self._row = row
+
+    def __getattr__(self, name):
+        try:
+            return self._row[name]
+        except KeyError:
+            raise AttributeError(
+                f"Column {name!r} is not selected; add it to the plan's property_columns"
+            ) from None
+
+
+def _inherits_to_representation(field, base):
+    return type(field).to_representation is base.to_representation
+
+
+def _date_converter(field):
+    output_format = getattr(field, "format", api_settings.DATE_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    return lambda value: value if isinstance(value, str) else value.isoformat()
+
+
+def _file_converter(field, model_field):
+    if not getattr(field, "use_url", api_settings.UPLOADED_FILES_USE_URL):
+        return lambda value, context: value or None
+    storage = model_field.storage
+
+    def convert(value, context):
+        if not value:
+            return None
+        url = storage.url(value)
+        return context.request.build_absolute_uri(url) if context.request is not None else url
+    return convert
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601 or hasattr(field, "timezone"):
+        return None
+
+    # DateTimeField.to_representation with the current timezone looked up once per call
+    def convert(value, context):
+        if context.timezone is None or isinstance(value, str) or value.utcoffset() is None:
+            return field.to_representation(value)
+        try:
+            value = value.astimezone(context.timezone).isoformat()
+        except OverflowError:
+            return field.to_representation(value)
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+    return convert
+
+
+class _CallContext:
+    __slots__ = ("request", "timezone")
+
+    def __init__(self, request):
+        self.request = request
+        self.timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+
+
+class ReadPlan:
+    """
+    Field plan for a read-only ModelSerializer.
+
+        plan = ReadPlan(GameHistorySerializer)
+        rows = queryset.values(*plan.columns)
+        data = plan.many(rows)           # == GameHistorySerializer(queryset, many=True).data
+        item = plan.one(row, request)    # request only needed for absolute file URLs
+    """
+
+    def __init__(self, serializer_class, property_columns=None):
+        self.serializer_class = serializer_class
+        self.property_columns = property_columns or {}
+        self._compiled = None
+
+    # Compiled on first use: building serializer fields needs the app registry
+    @property
+    def compiled(self):
+        if self._compiled is None:
+            self._compiled = self._compile()
+        return self._compiled
+
+    @property
+    def columns(self):
+        return self.compiled[0]
+
+    def _compile(self):
+        model = self.serializer_class.Meta.model
+        serializer = self.serializer_class()
+        columns = []
+        plan = []  # (output name, row key or property getter, converter, converter takes the call context)
+
+        for field in serializer._readable_fields:
+            name = field.field_name
+            source = "__".join(field.source_attrs)
+            prop = getattr(model, field.source, None) if len(field.source_attrs) == 1 else None
+
+            if isinstance(prop, property):
+                if name not in self.property_columns:
+                    raise ImproperlyConfigured(
+                        f"{self.serializer_class.__name__}.{name} reads model property "
+                        f"{field.source!r}; list the columns it uses in property_columns"
+                    )
+                columns.extend(c for c in self.property_columns[name] if c not in columns)
+                inherited = _inherits_to_representation(field, drf_fields.ReadOnlyField)
+                convert = None if inherited else field.to_representation
+                plan.append((name, prop.fget, convert, False))
+                continue
+
+            if isinstance(field, (drf_fields.SerializerMethodField, relations.ManyRelatedField)) \
+                    or hasattr(field, "child") or hasattr(field, "fields"):
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{name}: method, list and nested fields are not supported"
+                )
+
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                model_field = None  # a related model's column (user__username)
+            contextual = False
+            if isinstance(field, relations.PrimaryKeyRelatedField):
+                # values() yields the pk of the related row
+                convert = field.pk_field.to_representation if field.pk_field is not None else None
+            elif isinstance(model_field, ModelFileField) and _inherits_to_representation(field, drf_fields.FileField):
+                convert, contextual = _file_converter(field, model_field), True
+            elif _inherits_to_representation(field, drf_fields.DateTimeField) and _datetime_converter(field):
+                convert, contextual = _datetime_converter(field), True
+            elif _inherits_to_representation(field, drf_fields.CharField):
+                convert = str
+            elif _inherits_to_representation(field, drf_fields.IntegerField):
+                convert = int
+            elif _inherits_to_representation(field, drf_fields.FloatField):
+                convert = float
+            elif _inherits_to_representation(field, drf_fields.ChoiceField):
+                choices = field.choice_strings_to_values
+                convert = lambda value, choices=choices: value if value == "" else choices.get(str(value), value)  # noqa: E731
+            elif _inherits_to_representation(field, drf_fields.DateField):
+                convert = _date_converter(field)
+            elif _inherits_to_representation(field, drf_fields.ReadOnlyField):
+                convert = None
+            else:
+                # DecimalField, DurationField, ...: exact, just not inlined
+                convert = field.to_representation
+
+            if source not in columns:
+                columns.append(source)
+            plan.append((name, source, convert, contextual))
+
+        return columns, plan
+
+    def one(self, row, request=None):
+        return self._one(row, _CallContext(request))
+
+    def many(self, rows, request=None):
+        context = _CallContext(request)
+        return [self._one(row, context) for row in rows]
+
+    def _one(self, row, context):
+        out = {}
+        for name, source, convert, contextual in self.compiled[1]:
+            value = source(_RowView(row)) if callable(source) else row[source]
+            if value is None:
+                out[name] = None
+            elif convert is None:
+                out[name] = value
+            elif contextual:
+                out[name] = convert(value, context)
+            else:
+                out[name] = convert(value)
+        return out
@@ -1,3 +1,749 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import decimal
+import io
+import json
+import math
+import os
+import random
+import smtplib
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from types import SimpleNamespace
+from unittest import mock, skipIf
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from core import settings_api
+from django.conf import settings
+from django.contrib.admin import site
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.cache import caches
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from src.commons import db_router, metrics, renderers
+from src.commons.admin import OutboundEmailAdmin
+from src.commons.bench.serialization import game_history_payload, leaderboard_payload
+from src.commons.cache import CACHE_COALESCED, CACHE_REQUESTS, TieredCache, cache_hit_ratio
+from src.commons.db_router import ReadReplicaRouter, replica_reads
+from src.commons.indexes import IndexInfo, audit, find_redundant
+from src.commons.mail import (
+    CLAIM_LEASE_SECONDS, MAX_RETRY_SECONDS, claim_batch, deliver_batch, deliver_queued, retry_delay,
+)
+from src.commons.middleware import ReplicaPinningMiddleware, RequestMetricsMiddleware, TokenAPIMiddleware
+from src.commons.models import OutboundEmail
+from src.commons.renderers import FastJSONParser, FastJSONRenderer
+
+
+# TieredCache namespaces and metric labels are process-wide: every test gets its own
+_cache_namespaces = count()
+_routes = count()
+
+
+@skipIf(renderers.orjson is None, "orjson is not installed")
+class FastJSONRendererTests(SimpleTestCase):
+    """FastJSONRenderer must produce the same bytes as DRF's JSONRenderer, bar the documented differences."""
+
+    def assertSameOutput(self, data, accepted_media_type=None, renderer_context=None):
+        expected = JSONRenderer().render(data, accepted_media_type, renderer_context)
+        actual = FastJSONRenderer().render(data, accepted_media_type, renderer_context)
+        self.assertEqual(actual, expected)
+
+    def test_api_payloads(self):
+        self.assertSameOutput(game_history_payload())
+        self.assertSameOutput(leaderboard_payload())
+
+    def test_scalars_and_containers(self):
+        self.assertSameOutput({
+            "none": None, "true": True, "false": False, "zero": 0, "negative": -17,
+            "int64": 2 ** 63 - 1, "empty_list": [], "empty_dict": {}, "tuple": (1, 2),
+            "nested": {"a": [{"b": [None, 1.5]}]}, "set": {3}, "frozenset": frozenset(),
+        })
+        self.assertSameOutput([1, "two", 3.0])
+        self.assertSameOutput("plain string")
+        self.assertSameOutput(42)
+        self.assertSameOutput(ReturnDict({"a": 1}, serializer=None))
+        self.assertSameOutput(ReturnList([{"a": 1}], serializer=None))
+
+    def test_floats(self):
+        values = [
+            0.0, -0.0, 0.1, 0.5, 1.0, 100.0, 99.99, 1 / 3, 2 / 3, 33.333333333333336,
+            123456.789, 1e-4, 1.234e-4, 0.001, 1e15, 9999999999999998.0, float(2 ** 53), -1e15,
+        ]
+        for value in values:
+            with self.subTest(value=value):
+                self.assertSameOutput({"v": value})
+        self.assertSameOutput(values)
+
+    def test_random_floats(self):
+        rnd = random.Random(7)
+        values = [rnd.uniform(-1, 1) * 10 ** rnd.randint(-3, 15) for _ in range(5000)]
+        values += [round(rnd.uniform(0, 100), 2) for _ in range(1000)]
+        values = [v for v in values if abs(v) >= 1e-4 and abs(v) < 1e16]
+        for value in values:
+            self.assertEqual(FastJSONRenderer().render(value), JSONRenderer().render(value), value)
+
+    def test_extreme_floats_keep_their_value(self):
+        # Documented difference: spelled the orjson way, parsed back to the same float
+        for value in (1e-5, 2.5e-7, 5e-324, 1e16, 1.5e17, -1e22, 1.7976931348623157e308):
+            with self.subTest(value=value):
+                actual = FastJSONRenderer().render({"v": value})
+                self.assertEqual(json.loads(actual), json.loads(JSONRenderer().render({"v": value})))
+
+    def test_large_integers_fall_back(self):
+        self.assertSameOutput({"big": 2 ** 64, "negative": -(2 ** 70)})
+
+    def test_strings(self):
+        self.assertSameOutput({
+            "unicode": "Ünïcödé – 日本語 – emoji 🎲",
+            "escapes": 'quote " backslash \\ slash /',
+            "control": "".join(chr(c) for c in range(32)) + "\x7f",
+            "separators": "line\u2028paragraph\u2029end",
+            "looks_numeric": "1e5,2e-3:4E7",
+        })
+        self.assertSameOutput({" key": "value"})
+
+    def test_types_from_drf_encoder(self):
+        aware = datetime.datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc)
+        self.assertSameOutput({
+            "aware": aware,
+            "aware_no_micro": aware.replace(microsecond=0),
+            "naive": aware.replace(tzinfo=None),
+            "offset": aware.astimezone(datetime.timezone(datetime.timedelta(hours=5))),
+            "now": timezone.now(),
+            "date": datetime.date(2025, 1, 2),
+            "time": datetime.time(3, 4, 5, 678901),
+            "time_no_micro": datetime.time(3, 4, 5),
+            "timedelta": datetime.timedelta(days=1, seconds=5, microseconds=7),
+            "decimal": decimal.Decimal("12.50"),
+            "decimal_int": decimal.Decimal("3"),
+            "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "lazy": gettext_lazy("Invalid period"),
+            "error": ErrorDetail("This field is required.", code="required"),
+            "bytes": b"raw",
+        })
+
+    def test_unserializable_raises_like_drf(self):
+        with self.assertRaises(TypeError):
+            JSONRenderer().render({"obj": object()})
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render({"obj": object()})
+
+    def test_non_string_keys_fall_back(self):
+        self.assertSameOutput({1: "int key", 2.5: "float key", None: "none key", True: "bool key"})
+
+    def test_indent_falls_back(self):
+        data = leaderboard_payload()
+        self.assertSameOutput(data, "application/json; indent=4")
+        self.assertSameOutput(data, None, {"indent": 2})
+
+    def test_none_renders_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_non_finite_floats_render_as_null(self):
+        # Documented difference: the stdlib renderer raises under STRICT_JSON
+        self.assertEqual(FastJSONRenderer().render({"v": math.nan}), b'{"v":null}')
+
+    def test_without_orjson(self):
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertSameOutput(game_history_payload())
+            self.assertEqual(
+                FastJSONParser().parse(io.BytesIO(b'{"a": [1, 2.5]}')),
+                JSONParser().parse(io.BytesIO(b'{"a": [1, 2.5]}')),
+            )
+
+
+@skipIf(renderers.orjson is None, "orjson is not installed")
+class FastJSONParserTests(SimpleTestCase):
+
+    def parse_both(self, body):
+        expected = JSONParser().parse(io.BytesIO(body))
+        actual = FastJSONParser().parse(io.BytesIO(body))
+        self.assertEqual(actual, expected)
+        self.assertEqual(json.dumps(actual), json.dumps(expected))
+        return actual
+
+    def test_same_result(self):
+        bodies = [
+            b'{"match_id": "abc", "player_id": "1", "grid_size": 4, "accuracy_percentage": 96.5,'
+            b' "room_code": null, "nested": {"a": [true, false, 1e3, -0.0]}}',
+            b'[1, 2, 3]',
+            b'"string"',
+            '{"unicode": "日本語 \\u00e9 \\ud83c\\udfb2"}'.encode(),
+            b'{"big": 123456789012345678901234567890, "int64": 9223372036854775807}',
+            b'{"long_float": 0.12345678901234567890123}',
+            b'{"lone_surrogate": "\\ud800"}',
+            b'{"dup": 1, "dup": 2}',
+            b'  {"whitespace" :  1 }  ',
+        ]
+        for body in bodies:
+            with self.subTest(body=body):
+                self.parse_both(body)
+
+    def test_errors_match(self):
+        for body in [b'{"a": ', b'{"a": NaN}', b'{"a": Infinity}', b'{a: 1}', b'\xef\xbb\xbf{"a": 1}', b'']:
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError) as expected:
+                    JSONParser().parse(io.BytesIO(body))
+                with self.assertRaises(ParseError) as actual:
+                    FastJSONParser().parse(io.BytesIO(body))
+                self.assertEqual(str(actual.exception.detail), str(expected.exception.detail))
+
+    def test_other_encodings_use_stdlib(self):
+        body = '{"name": "é"}'.encode("latin-1")
+        context = {"encoding": "latin-1"}
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body), parser_context=context),
+            JSONParser().parse(io.BytesIO(body), parser_context=context),
+        )
+
+
+class IndexAuditTests(TestCase):
+
+    def index(self, name, *columns, orders=(), unique=False):
+        return IndexInfo(table="t", name=name, columns=columns, orders=orders, unique=unique)
+
+    def test_redundancy_rules(self):
+        indexes = [
+            IndexInfo(table="t", name="pk", columns=("id",), unique=True, primary_key=True),
+            self.index("a", "player"),
+            self.index("a_ts", "player", "ts", orders=("ASC", "DESC")),
+            self.index("a_ts_asc", "player", "ts", orders=("ASC", "ASC")),
+            self.index("b_desc", "ts", orders=("DESC",)),
+            self.index("b", "ts", "player", orders=("ASC", "ASC")),
+            self.index("match", "match_id", unique=True),
+            self.index("match_dup", "match_id", unique=True),
+            self.index("match_idx", "match_id"),
+            self.index("code_day", "code", "day", unique=True),
+            self.index("code", "code", unique=True),
+            self.index("ts_desc_player", "ts", "player", orders=("DESC", "DESC")),
+        ]
+        find_redundant(indexes)
+        redundant = {index.name: index.redundant_to for index in indexes if index.redundant_to}
+        self.assertEqual(redundant, {
+            "a": ["a_ts", "a_ts_asc"],
+            "b_desc": ["b", "ts_desc_player"],
+            "match_dup": ["match"],
+            "match_idx": ["match", "match_dup"],
+            # Backwards it is the same b-tree order
+            "ts_desc_player": ["b"],
+        })
+
+    def test_schema_has_no_redundant_indexes(self):
+        redundant = [
+            f"{table}.{index.name} -> {index.redundant_to}"
+            for table, indexes in audit().items() for index in indexes if index.redundant_to
+        ]
+        self.assertEqual(redundant, [])
+
+
+class TieredCacheTests(TestCase):
+
+    def setUp(self):
+        caches["default"].clear()
+        self.computed = []
+
+    def cache(self, **kwargs):
+        return TieredCache(f"test-{next(_cache_namespaces)}", **{"timeout": 300, **kwargs})
+
+    def compute(self, value):
+        def compute():
+            self.computed.append(value)
+            return value
+        return compute
+
+    def test_l1_and_l2(self):
+        cache = self.cache(l1_timeout=60)
+        self.assertEqual(cache.get_or_set("k", self.compute("a")), "a")
+        self.assertEqual(cache.get_or_set("k", self.compute("b")), "a")
+        cache.l1.clear()
+        self.assertEqual(cache.get_or_set(("k",), self.compute("c")), "a")
+        self.assertEqual(self.computed, ["a"])
+        self.assertEqual(
+            [CACHE_REQUESTS.value(cache.namespace, result) for result in ("miss", "l1_hit", "l2_hit")], [1, 1, 1]
+        )
+
+        # Without L1 every lookup reads L2; None is a value too
+        cache = self.cache()
+        self.assertIsNone(cache.get_or_set("none", self.compute(None)))
+        self.assertIsNone(cache.get_or_set("none", self.compute("x")))
+        self.assertEqual(CACHE_REQUESTS.value(cache.namespace, "l2_hit"), 1)
+
+    def test_invalidate(self):
+        cache = self.cache(l1_timeout=60)
+        cache.get_or_set("a", self.compute(1))
+        cache.get_or_set("b", self.compute(1))
+        cache.invalidate("a")
+        self.assertEqual(cache.get_or_set("a", self.compute(2)), 2)
+        self.assertEqual(cache.get_or_set("b", self.compute(2)), 1)
+        cache.invalidate_all()
+        self.assertEqual([cache.get_or_set(key, self.compute(3)) for key in "ab"], [3, 3])
+
+    def test_invalidate_again_on_commit(self):
+        cache = self.cache()
+        cache.get_or_set("k", self.compute("old"))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            cache.invalidate("k")
+            # A reader that does not see the write yet caches the old value again
+            self.assertEqual(cache.get_or_set("k", self.compute("old")), "old")
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(cache.get_or_set("k", self.compute("new")), "new")
+
+    def test_expired_generation_never_repeats(self):
+        cache = self.cache()
+        cache.invalidate("k")
+        cache.get_or_set("k", self.compute({"v": 1}))
+        # The generation key expires before the entry it stamped
+        caches["default"].delete(cache._keys("k")[1])
+        cache.invalidate("k")
+        self.assertEqual(cache.get_or_set("k", self.compute({"v": 2})), {"v": 2})
+
+    def test_single_flight(self):
+        cache = self.cache()
+        start = threading.Barrier(8)
+
+        def slow():
+            self.computed.append(1)
+            time.sleep(0.1)
+            return "value"
+
+        def read():
+            start.wait()
+            return cache.get_or_set("k", slow)
+
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda _: read(), range(8)))
+        self.assertEqual(results, ["value"] * 8)
+        self.assertEqual(len(self.computed), 1)
+        self.assertEqual(CACHE_COALESCED.value(cache.namespace), 7)
+
+    def test_async_single_flight(self):
+        cache = self.cache()
+
+        async def slow():
+            self.computed.append(1)
+            await asyncio.sleep(0.1)
+            return "value"
+
+        async def read_all():
+            return await asyncio.gather(*(cache.aget_or_set("k", slow) for _ in range(8)))
+
+        self.assertEqual(async_to_sync(read_all)(), ["value"] * 8)
+        self.assertEqual(len(self.computed), 1)
+
+    def test_get_many_partial_misses(self):
+        cache = self.cache(l1_timeout=60)
+        cache.get_many_or_set([1, 2], lambda missing: {key: f"v{key}" for key in missing})
+        cache.l1.delete(cache._keys(2)[0])
+        calls = []
+
+        def compute(missing):
+            calls.append(missing)
+            return {3: "v3"}
+
+        self.assertEqual(cache.get_many_or_set([1, 2, 3, 4, 3], compute), {1: "v1", 2: "v2", 3: "v3", 4: None})
+        self.assertEqual(calls, [[3, 4]])
+        # Keys left out by compute() are cached as None
+        self.assertEqual(cache.get_many_or_set([3, 4], compute), {3: "v3", 4: None})
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(async_to_sync(cache.aget_many_or_set)([1, 4], compute), {1: "v1", 4: None})
+
+    def test_hit_ratio_metric(self):
+        cache = self.cache(l1_timeout=60)
+        cache.get_or_set("k", self.compute(1))
+        cache.get_or_set("k", self.compute(1))
+        cache.get_or_set("other", self.compute(1))
+        cache.l1.clear()
+        cache.get_or_set("k", self.compute(1))
+        self.assertIn(f'cache_hit_ratio{{namespace="{cache.namespace}"}} 0.5000', cache_hit_ratio())
+
+
+@override_settings(
+    EMAIL_BACKEND="src.commons.mail.QueuedEmailBackend",
+    EMAIL_DELIVERY_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    EMAIL_QUEUE_MAX_ATTEMPTS=3,
+    EMAIL_QUEUE_RETRY_SECONDS=60,
+)
+class EmailQueueTests(TestCase):
+
+    def queue(self, count=1):
+        for i in range(count):
+            mail.send_mail(f"Subject {i}", "Body", "from@example.com", [f"to{i}@example.com"])
+
+    def test_round_trip(self):
+        message = EmailMultiAlternatives(
+            "Welcome", "Plain body", "from@example.com", ["to@example.com"],
+            cc=["cc@example.com"], bcc=["bcc@example.com"], reply_to=["reply@example.com"],
+            headers={"X-Campaign": "signup"},
+        )
+        message.attach_alternative("<p>HTML body</p>", "text/html")
+        message.attach("report.csv", "a,b\n1,2\n", "text/csv")
+        message.attach("logo.png", b"\x89PNG\x00\xff", "image/png")
+        self.assertEqual(message.send(), 1)
+        self.assertEqual(mail.outbox, [])
+
+        row = OutboundEmail.objects.get()
+        self.assertEqual(row.status, OutboundEmail.Status.PENDING)
+        self.assertEqual(deliver_queued().sent, 1)
+        row.refresh_from_db()
+        self.assertEqual(row.status, OutboundEmail.Status.SENT)
+        self.assertIsNotNone(row.sent_at)
+
+        [sent] = mail.outbox
+        self.assertEqual(
+            (sent.subject, sent.body, sent.from_email, sent.to, sent.cc, sent.bcc, sent.reply_to),
+            ("Welcome", "Plain body", "from@example.com", ["to@example.com"], ["cc@example.com"],
+             ["bcc@example.com"], ["reply@example.com"]),
+        )
+        self.assertEqual(sent.alternatives[0][:2], ("<p>HTML body</p>", "text/html"))
+        self.assertEqual(
+            [tuple(attachment) for attachment in sent.attachments],
+            [("report.csv", "a,b\n1,2\n", "text/csv"), ("logo.png", b"\x89PNG\x00\xff", "image/png")],
+        )
+        # Fixed when queued, so a repeated delivery is the same message
+        headers = sent.message()
+        self.assertEqual(headers["X-Campaign"], "signup")
+        self.assertEqual(headers["Message-ID"], row.headers["Message-ID"])
+        self.assertEqual(headers["Date"], row.headers["Date"])
+
+    def test_only_committed_mail_is_queued(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.queue()
+            raise RuntimeError
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_claim_lease(self):
+        self.queue(3)
+        claimed = claim_batch(2)
+        self.assertEqual([row.subject for row in claimed], ["Subject 0", "Subject 1"])
+        self.assertEqual([row.subject for row in claim_batch(10)], ["Subject 2"])
+        self.assertEqual(claim_batch(10), [])
+
+        # A worker that died leaves its rows to whoever claims after the lease
+        later = timezone.now() + datetime.timedelta(seconds=CLAIM_LEASE_SECONDS + 1)
+        with mock.patch("src.commons.mail.timezone.now", return_value=later):
+            reclaimed = claim_batch(10)
+        self.assertEqual(len(reclaimed), 3)
+        self.assertTrue(all(row.status == OutboundEmail.Status.PENDING for row in reclaimed))
+
+    def test_retries_with_backoff_then_gives_up(self):
+        self.queue()
+        connection = get_connection("django.core.mail.backends.locmem.EmailBackend")
+        refused = smtplib.SMTPRecipientsRefused({"to0@example.com": (550, b"No such user")})
+
+        with mock.patch.object(connection, "send_messages", side_effect=refused), \
+                self.assertLogs("src.commons.mail", "WARNING") as logs:
+            for attempt, delay in ((1, 60), (2, 120)):
+                before = timezone.now()
+                stats = deliver_batch(claim_batch(10), connection)
+                self.assertEqual((stats.sent, stats.retried, stats.failed), (0, 1, 0))
+                row = OutboundEmail.objects.get()
+                self.assertEqual((row.status, row.attempts), (OutboundEmail.Status.PENDING, attempt))
+                self.assertIn("No such user", row.last_error)
+                self.assertGreaterEqual(row.next_attempt_at, before + datetime.timedelta(seconds=delay))
+                self.assertLess(row.next_attempt_at, timezone.now() + datetime.timedelta(seconds=delay))
+                # Not due before its backoff is over
+                self.assertEqual(claim_batch(10), [])
+                OutboundEmail.objects.update(next_attempt_at=timezone.now())
+
+            stats = deliver_batch(claim_batch(10), connection)
+        self.assertEqual((stats.retried, stats.failed), (0, 1))
+        self.assertIn("failed permanently", logs.output[-1])
+        row = OutboundEmail.objects.get()
+        self.assertEqual((row.status, row.attempts), (OutboundEmail.Status.FAILED, 3))
+        self.assertEqual(claim_batch(10), [])
+        self.assertEqual(retry_delay(20), MAX_RETRY_SECONDS)
+
+    def test_admin_retry_action(self):
+        self.queue(2)
+        OutboundEmail.objects.filter(subject="Subject 0").update(
+            status=OutboundEmail.Status.FAILED, attempts=3, next_attempt_at=timezone.now() + datetime.timedelta(days=1)
+        )
+        OutboundEmail.objects.filter(subject="Subject 1").update(status=OutboundEmail.Status.SENT, attempts=1)
+
+        OutboundEmailAdmin(OutboundEmail, site).retry_now(None, OutboundEmail.objects.all())
+        failed, sent = OutboundEmail.objects.order_by("subject")
+        self.assertEqual((failed.status, failed.attempts), (OutboundEmail.Status.PENDING, 0))
+        self.assertLessEqual(failed.next_attempt_at, timezone.now())
+        self.assertEqual((sent.status, sent.attempts), (OutboundEmail.Status.SENT, 1))
+        self.assertEqual(deliver_queued().sent, 1)
+        self.assertEqual(mail.outbox[0].subject, "Subject 0")
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], REPLICA_MAX_LAG_SECONDS=5, REPLICA_PIN_SECONDS=10)
+class ReadReplicaRouterTests(TestCase):
+    """Routing only – the test databases have no replica connection, so lag probes are faked."""
+
+    class View:
+        @replica_reads
+        def get(self, request):
+            return get_user_model().objects.all().db
+
+        @replica_reads
+        async def aget(self, request):
+            return get_user_model().objects.all().db
+
+    def setUp(self):
+        caches["default"].clear()
+        db_router._lag_cache.clear()
+        self.addCleanup(db_router._lag_cache.clear)
+        self.lag = 0.0
+        self.real_measure_lag = db_router._measure_lag
+        patcher = mock.patch.object(db_router, "_measure_lag", side_effect=lambda alias: self.lag)
+        self.measure_lag = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = get_user_model().objects.create_user("reader", "reader@example.com", "password-1")
+
+    def read(self, user=None):
+        request = RequestFactory().get("/")
+        request.user = user or AnonymousUser()
+        return self.View().get(request), async_to_sync(self.View().aget)(request)
+
+    def test_replica_reads(self):
+        self.assertEqual(get_user_model().objects.all().db, DEFAULT_DB_ALIAS)
+        self.assertEqual(self.read(), ("replica", "replica"))
+        self.assertEqual(self.read(self.user), ("replica", "replica"))
+        # Back to the primary once the view returns
+        self.assertEqual(get_user_model().objects.all().db, DEFAULT_DB_ALIAS)
+
+    def test_writes_go_to_primary(self):
+        router = ReadReplicaRouter()
+        with db_router.use_replica():
+            self.assertEqual(router.db_for_write(get_user_model()), DEFAULT_DB_ALIAS)
+            self.assertEqual(get_user_model().objects.all().db, "replica")
+            self.assertEqual(get_user_model().objects.select_for_update().db, DEFAULT_DB_ALIAS)
+        self.assertFalse(router.allow_migrate("replica", "user"))
+
+    def test_pinned_user_reads_primary(self):
+        # As after any successful write request
+        request = RequestFactory().post("/")
+        request.user = self.user
+        ReplicaPinningMiddleware(lambda request: HttpResponse()).process_response(request, HttpResponse())
+        self.assertEqual(self.read(self.user), (DEFAULT_DB_ALIAS, DEFAULT_DB_ALIAS))
+        self.assertEqual(self.read(), ("replica", "replica"))
+
+        # Failed writes don't pin
+        caches["default"].clear()
+        ReplicaPinningMiddleware(lambda request: HttpResponse()).process_response(request, HttpResponse(status=400))
+        self.assertEqual(self.read(self.user), ("replica", "replica"))
+
+    def test_lagging_replica_falls_back(self):
+        self.lag = 6.0
+        self.assertEqual(self.read(), (DEFAULT_DB_ALIAS, DEFAULT_DB_ALIAS))
+        # Probed once per LAG_CHECK_INTERVAL
+        self.assertEqual(self.measure_lag.call_count, 1)
+        self.lag = 0.0
+        self.assertEqual(self.read(), (DEFAULT_DB_ALIAS, DEFAULT_DB_ALIAS))
+        db_router._lag_cache.clear()
+        self.assertEqual(self.read(), ("replica", "replica"))
+
+    def test_unreachable_replica_falls_back(self):
+        self.measure_lag.side_effect = DatabaseError("connection refused")
+        with self.assertLogs("src.commons.db_router", "WARNING"):
+            self.assertEqual(self.read(), (DEFAULT_DB_ALIAS, DEFAULT_DB_ALIAS))
+
+    def test_local_replica_lag(self):
+        # LOCAL_REPLICA: a copy of the primary's SQLite file, as far behind as the copy is older
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        primary, replica = (os.path.join(directory.name, name) for name in ("db.sqlite3", "db.replica.sqlite3"))
+        now = time.time()
+        for path, mtime in ((primary, now), (replica, now - 8)):
+            open(path, "w").close()
+            os.utime(path, (mtime, mtime))
+
+        local = {"replica": SimpleNamespace(vendor="sqlite", settings_dict={"NAME": replica})}
+        with mock.patch.dict(settings.DATABASES[DEFAULT_DB_ALIAS], NAME=primary), \
+                mock.patch.object(db_router, "connections", local):
+            self.assertAlmostEqual(self.real_measure_lag("replica"), 8, places=3)
+            os.utime(replica, (now, now))
+            self.assertEqual(self.real_measure_lag("replica"), 0)
+
+
+@override_settings(METRICS_SAMPLE_RATE=1, METRICS_N_PLUS_ONE_THRESHOLD=3)
+class RequestMetricsTests(TestCase):
+
+    def setUp(self):
+        # Normally installed when the connection is opened, which may predate the receiver
+        metrics.install_query_recorder(sender=None, connection=connection)
+        self.route = f"test/{next(_routes)}"
+
+    def request(self, queries, method="GET"):
+        request = getattr(RequestFactory(), method.lower())("/")
+        request.resolver_match = SimpleNamespace(route=self.route)
+
+        def view(request):
+            for query in queries:
+                query()
+            return HttpResponse()
+
+        return RequestMetricsMiddleware(view)(request)
+
+    def series(self, metric):
+        return "\n".join(line for line in metric.expose() if f'route="{self.route}"' in line)
+
+    def lookup(self, *pks):
+        return lambda: get_user_model().objects.filter(pk__in=pks).exists()
+
+    def test_query_count(self):
+        self.request([self.lookup(1), lambda: get_user_model().objects.count()])
+        self.assertEqual(metrics.SAMPLED_REQUESTS.value(self.route), 1)
+        self.assertIn(f'db_queries_per_request_sum{{route="{self.route}"}} 2', self.series(metrics.QUERY_COUNT))
+        self.assertIn(f'db_query_seconds_per_request_count{{route="{self.route}"}} 1', self.series(metrics.QUERY_TIME))
+        self.assertIn(
+            f'http_request_duration_seconds_count{{route="{self.route}",method="GET",status="200"}} 1',
+            self.series(metrics.REQUEST_LATENCY),
+        )
+        self.assertEqual(metrics.N_PLUS_ONE.value(self.route), 0)
+
+    def test_n_plus_one(self):
+        # Below the threshold
+        self.request([self.lookup(1), self.lookup(2), lambda: get_user_model().objects.count()])
+        self.assertEqual(metrics.N_PLUS_ONE.value(self.route), 0)
+
+        # IN lists of any length are one shape
+        with self.assertLogs("src.commons.middleware", "WARNING") as logs:
+            self.request([self.lookup(1), self.lookup(2, 3), self.lookup(4, 5, 6)])
+        self.assertEqual(metrics.N_PLUS_ONE.value(self.route), 1)
+        self.assertIn(f"Possible N+1 on {self.route}: 3x SELECT", logs.output[0])
+        self.assertIn("IN (...)", logs.output[0])
+
+    def test_async(self):
+        request = RequestFactory().get("/")
+        request.resolver_match = SimpleNamespace(route=self.route)
+
+        async def view(request):
+            for pk in range(3):
+                await get_user_model().objects.filter(pk=pk).aexists()
+            # Sync code run from the async view is attributed to the request too
+            await sync_to_async(get_user_model().objects.count)()
+            return HttpResponse()
+
+        with self.assertLogs("src.commons.middleware", "WARNING"):
+            async_to_sync(RequestMetricsMiddleware(view))(request)
+        self.assertIn(f'db_queries_per_request_sum{{route="{self.route}"}} 4', self.series(metrics.QUERY_COUNT))
+        self.assertEqual(metrics.N_PLUS_ONE.value(self.route), 1)
+
+    def test_sampling(self):
+        with override_settings(METRICS_SAMPLE_RATE=0.25), \
+                mock.patch("src.commons.middleware.random.random", side_effect=[0.1, 0.5, 0.9, 0.2]):
+            for _ in range(4):
+                self.request([self.lookup(1)])
+        self.assertEqual(metrics.SAMPLED_REQUESTS.value(self.route), 2)
+        self.assertIn(f'db_queries_per_request_count{{route="{self.route}"}} 2', self.series(metrics.QUERY_COUNT))
+        # Latency is recorded for every request
+        self.assertIn(
+            f'http_request_duration_seconds_count{{route="{self.route}",method="GET",status="200"}} 4',
+            self.series(metrics.REQUEST_LATENCY),
+        )
+
+        with override_settings(METRICS_SAMPLE_RATE=0):
+            self.request([self.lookup(1)] * 3)
+        self.assertEqual(metrics.SAMPLED_REQUESTS.value(self.route), 2)
+        # Queries outside a sampled request aren't recorded anywhere
+        self.assertIsNone(metrics.current_recorder.get())
+
+
+@override_settings(
+    MIDDLEWARE=settings_api.MIDDLEWARE,
+    SESSION_STACK_MIDDLEWARE=settings_api.SESSION_STACK_MIDDLEWARE,
+    TOKEN_API_PATH_PREFIXES=settings_api.TOKEN_API_PATH_PREFIXES,
+)
+class TokenAPIMiddlewareTests(TestCase):
+    """The API profile's middleware: token API calls skip sessions, CSRF, auth and messages."""
+
+    def request(self, path, authorization=None, method="post"):
+        """(response, request as the view saw it) through TokenAPIMiddleware."""
+        headers = {} if authorization is None else {"HTTP_AUTHORIZATION": authorization}
+        request = getattr(RequestFactory(), method)(path, **headers)
+        seen = []
+
+        def view(request):
+            seen.append(request)
+            return HttpResponse()
+
+        middleware = TokenAPIMiddleware(view)
+        # What BaseHandler does between the middleware and the view (CSRF is checked here)
+        response = middleware.process_view(request, view, (), {}) or middleware(request)
+        return response, (seen[0] if seen else None)
+
+    def assertSessionStack(self, request, expected):
+        for attribute in ("session", "user", "_messages"):
+            self.assertEqual(hasattr(request, attribute), expected, attribute)
+
+    def test_token_api_request_skips_the_session_stack(self):
+        response, request = self.request("/api/v1/user/wallet/", "Token abc")
+        self.assertEqual(response.status_code, 200)  # no CSRF token needed
+        self.assertSessionStack(request, False)
+        self.assertFalse(response.cookies)
+
+    def test_other_requests_keep_the_session_stack(self):
+        for path, authorization in [
+            ("/api/v1/user/wallet/", None),  # session-authenticated API call
+            ("/api/v1/user/wallet/", "Bearer abc"),
+            ("/accounts/login/", "Token abc"),  # token outside TOKEN_API_PATH_PREFIXES
+        ]:
+            with self.subTest(path=path, authorization=authorization):
+                # CsrfViewMiddleware rejects the unsigned POST
+                response, request = self.request(path, authorization)
+                self.assertEqual(response.status_code, 403)
+                self.assertIsNone(request)
+
+                response, request = self.request(path, authorization, method="get")
+                self.assertEqual(response.status_code, 200)
+                self.assertSessionStack(request, True)
+
+    def test_full_stack(self):
+        user = get_user_model().objects.create(username="token-api", email="token-api@example.com")
+        token = Token.objects.create(user=user)
+
+        response = self.client.get("/api/v1/user/wallet/", secure=True, HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.cookies)
+        self.assertFalse(hasattr(response.wsgi_request, "session"))
+        self.assertTrue(hasattr(response.wsgi_request, "allauth"))
+
+        self.client.force_login(user)
+        response = self.client.get("/api/v1/user/wallet/", secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.user, user)
+        self.assertTrue(response.wsgi_request.session.session_key)
+
+
+class MetricsViewTests(TestCase):
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 404)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret-and-more").status_code, 404)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer śęcret").status_code, 404)
+
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", body)
+        self.assertIn('http_request_duration_seconds_count{route="metrics",method="GET",status="404"}', body)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_without_token_only_in_debug(self):
+        with override_settings(DEBUG=False):
+            self.assertEqual(self.client.get("/metrics").status_code, 404)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get("/metrics").status_code, 200)
@@ -1,11 +1,17 @@
+import hmac
+
 from django.shortcuts import render
 from django.views import View
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotFound, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 
-from src.services.user.models import UserProfile, PendingReferral
+from src.services.user.caches import referral_code_owner
+from src.services.user.models import PendingReferral
 from src.commons.utils import get_client_ip
+from src.commons.db_router import replica_reads
+from src.commons.metrics import REGISTRY
 
 
 class PasswordResetConfirmPageView(View):
@@ -75,6 +81,7 @@ class DownloadPageView(View):
 	POST /download/ - records a click (body must include 'refcode') and stores IP+refcode
 	"""
 
+	@replica_reads
 	def get(self, request):
 		refcode = request.GET.get('refcode') or None
 		context = {
@@ -84,12 +91,10 @@ class DownloadPageView(View):
 		}
 
 		if refcode:
-			try:
-				profile = UserProfile.objects.get(referral_code=refcode.upper())
-				context['referrer_username'] = profile.user.username
-				context['valid_code'] = True
-			except UserProfile.DoesNotExist:
-				context['valid_code'] = False
+			owner = referral_code_owner(refcode)
+			context['valid_code'] = owner is not None
+			if owner:
+				context['referrer_username'] = owner['username']
 
 		return render(request, 'download.html', context)
 
@@ -109,9 +114,8 @@ class DownloadPageView(View):
 			return JsonResponse({'success': False, 'error': 'missing refcode'}, status=400)
 
 		# Validate referral code exists — avoid storing bogus codes; still prefer IP attribution later
-		try:
-			profile = UserProfile.objects.get(referral_code=refcode.upper())
-		except UserProfile.DoesNotExist:
+		owner = referral_code_owner(refcode)
+		if owner is None:
 			return JsonResponse({'success': False, 'error': 'invalid refcode'}, status=400)
 
 		client_ip = get_client_ip(request)
@@ -120,7 +124,7 @@ class DownloadPageView(View):
 
 		# Avoid duplicate unredeemed entries for same ip+referrer_profile
 		existing = PendingReferral.objects.filter(
-			referrer_profile=profile,
+			referrer_profile_id=owner['profile_id'],
 			ip_address=client_ip,
 			redeemed_at__isnull=True
 		).first()
@@ -131,7 +135,7 @@ class DownloadPageView(View):
 		try:
 			PendingReferral.objects.create(
 				referral_code=refcode.upper(),
-				referrer_profile=profile,
+				referrer_profile_id=owner['profile_id'],
 				ip_address=client_ip
 			)
 			return JsonResponse({'success': True, 'tracked': True})
@@ -149,3 +153,21 @@ class AccountDeletionPageView(View):
 	"""
 	def get(self, request):
 		return render(request, 'delete_account.html')
+
+
+class MetricsView(View):
+	"""
+	Prometheus scrape endpoint.
+	GET /metrics — requires `Authorization: Bearer <METRICS_TOKEN>`; without a
+	configured token it is only available in DEBUG.
+	"""
+	def get(self, request):
+		if settings.METRICS_TOKEN:
+			# Constant-time, so response timing doesn't leak how much of the token matched
+			authorization = request.META.get('HTTP_AUTHORIZATION', '').encode()
+			if not hmac.compare_digest(authorization, f"Bearer {settings.METRICS_TOKEN}".encode()):
+				return HttpResponseNotFound()
+		elif not settings.DEBUG:
+			return HttpResponseNotFound()
+
+		return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
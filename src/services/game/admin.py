@@ -1,4 +1,68 @@
 from django.contrib import admin
-from .models import GameHistory
+from .models import (
+    GameHistory, GameHistoryCompaction, LeaderboardSnapshot, PlayerDailySummary, ScoreDistribution, Season, SeasonPoints,
+)
 
-admin.site.register(GameHistory)
\ No newline at end of file
+
+@admin.register(GameHistory)
+class GameHistoryAdmin(admin.ModelAdmin):
+    list_display = ("player", "match_id", "game_type", "game_mode", "final_score", "status", "timestamp")
+    list_filter = ("game_type", "game_mode", "status")
+    search_fields = ("match_id", "room_code", "player__username")
+    list_select_related = ("player",)
+    raw_id_fields = ("player",)
+
+
+@admin.register(PlayerDailySummary)
+class PlayerDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ("player", "day", "games", "points")
+    list_select_related = ("player",)
+    raw_id_fields = ("player",)
+    date_hierarchy = "day"
+
+
+@admin.register(GameHistoryCompaction)
+class GameHistoryCompactionAdmin(admin.ModelAdmin):
+    list_display = ("compacted_before", "games", "summaries", "pruned", "created_at")
+
+
+@admin.register(ScoreDistribution)
+class ScoreDistributionAdmin(admin.ModelAdmin):
+    list_display = ("grid_size", "operation", "game_mode", "players", "bin_width", "refreshed_at")
+    list_filter = ("operation", "game_mode")
+    # Rebuilt by `manage.py refresh_score_distributions`
+    readonly_fields = list_display
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Season)
+class SeasonAdmin(admin.ModelAdmin):
+    list_display = ("number", "name", "starts_at", "ends_at", "players", "frozen_at")
+    # Seasons are started and frozen by `manage.py start_season` / `freeze_seasons`
+    readonly_fields = ("number", "starts_at", "ends_at", "players", "frozen_at")
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(SeasonPoints)
+class SeasonPointsAdmin(admin.ModelAdmin):
+    list_display = ("player", "season", "points", "games")
+    list_filter = ("season",)
+    search_fields = ("player__username",)
+    list_select_related = ("player", "season")
+    raw_id_fields = ("player",)
+
+
+@admin.register(LeaderboardSnapshot)
+class LeaderboardSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("period", "period_start", "players", "created_at")
+    list_filter = ("period",)
+    date_hierarchy = "period_start"
+    # Written by `manage.py snapshot_leaderboards`
+    readonly_fields = list_display
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,98 @@
+"""
+Leaderboard building blocks shared by the sync (DRF) and async (ASGI) views.
+Only query construction and row shaping live here – executing the queries is
+left to the caller so each view can use the sync or async ORM API.
+"""
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from src.commons.cache import TieredCache
+from src.services.game import seasons, summaries
+from src.services.game.models import GameHistory
+
+PERIODS = ["today", "this_week", "this_month", "season", "all_time"]
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+# Response payloads keyed by (period, page, page_size). Invalidated by every
+# GameHistory save (src/services/game/signals.py); avatars and usernames may
+# lag behind by up to `timeout`.
+pages = TieredCache("leaderboard", timeout=30, l1_timeout=5)
+
+
+def period_start(period, now=None):
+    """
+    First timestamp included in `period` (None for all_time). Days, weeks and
+    months start at local (TIME_ZONE) midnight, as their snapshots do
+    (src/services/game/snapshots.py), so a frozen period is the board its
+    players saw.
+    """
+    # snapshots builds on this module
+    from src.services.game import snapshots
+
+    now = now or timezone.now()
+    if period == "season":
+        # Without an open season nothing counts yet
+        return seasons.current_start() or now
+    kind = snapshots.SNAPSHOT_PERIODS.get(period)
+    if kind is None:
+        return None
+    return snapshots.bounds(kind, snapshots.align(kind, timezone.localdate(now)))[0]
+
+
+def page_params(query_params):
+    """Returns (page, page_size, offset) from the request query string."""
+    page_size = min(int(query_params.get("page_size", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+    page = max(int(query_params.get("page", 1)), 1)
+    return page, page_size, (page - 1) * page_size
+
+
+def leaderboard_queryset(period):
+    """
+    Per-player points/games aggregate for `period`, best first. Periods that
+    reach back past the retention window (all_time) also count the daily
+    summaries of compacted games. The open season reads its SeasonPoints rows.
+    """
+    if period == "season":
+        return seasons.points_queryset()
+    return range_queryset(period_start(period))
+
+
+def range_queryset(start, end=None):
+    """leaderboard_queryset() rows of the games since `start` (None: all) and before `end`."""
+    if start is None or start < summaries.horizon():
+        return summaries.combined_leaderboard(start, end)
+
+    games = GameHistory.objects.filter(timestamp__gte=start)
+    if end is not None:
+        games = games.filter(timestamp__lt=end)
+    return (
+        games
+        .values("player")
+        .annotate(
+            period_points=Sum("points_earned"),
+            games_played=Count("id")
+        )
+        .order_by("-period_points", "player")
+    )
+
+
+def build_results(rows, cards, offset):
+    """
+    Shape aggregate rows into response entries, skipping players without a profile.
+    `cards` maps user id -> UserCard (src/services/user/cards.py).
+    """
+    results = []
+    for idx, item in enumerate(rows):
+        card = cards.get(item["player"])
+        if not card:
+            continue
+        results.append({
+            "rank": offset + idx + 1,
+            "user_id": item["player"],
+            "username": card.username,
+            "avatar": card.avatar,
+            "total_points": item["period_points"] or 0,
+            "games_played": item["games_played"],
+        })
+    return results
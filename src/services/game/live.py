@@ -0,0 +1,192 @@
+"""
+Live leaderboard fan-out for the SSE stream (AsyncLeaderboardStreamView).
+
+Subscribers of the same (period, page, page_size) share one Topic. A topic
+ticks every LEADERBOARD_STREAM_INTERVAL seconds and recomputes only when the
+leaderboard cache generation moved (any GameHistory write bumps it), so a
+burst of inserts costs at most one recompute per interval – and that
+recompute goes through the shared page cache, so workers coalesce too. The
+diff against the previous page is encoded once and the same bytes are queued
+to every subscriber.
+
+Topics live on the event loop of the worker that serves their subscribers and
+stop when the last one disconnects.
+"""
+import asyncio
+import logging
+import time
+import weakref
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+
+from src.commons.metrics import REGISTRY, Counter
+from src.services.game import leaderboard
+
+logger = logging.getLogger(__name__)
+
+# Keepalive comment for idle streams, so proxies don't close them
+HEARTBEAT_SECONDS = 15
+# Recompute even without writes, for time-based periods (today, this_week, ...)
+REFRESH_SECONDS = 60
+# Events buffered per subscriber before it is reset to a snapshot
+QUEUE_SIZE = 16
+
+RECOMPUTES = REGISTRY.register(Counter(
+    "leaderboard_stream_recomputes_total", "Leaderboard pages recomputed for live subscribers.",
+))
+EVENTS = REGISTRY.register(Counter(
+    "leaderboard_stream_events_total", "Events queued to live subscribers, by type.", ("event",),
+))
+
+_broadcasters = weakref.WeakKeyDictionary()  # event loop -> Broadcaster
+
+
+def diff_page(old, new):
+    """
+    Changes from page payload `old` to `new`: entries whose row changed, by
+    position, and the positions past the end of the new page. None if equal.
+    """
+    old_rows, new_rows = old["results"], new["results"]
+    changed = [
+        row for index, row in enumerate(new_rows)
+        if index >= len(old_rows) or old_rows[index] != row
+    ]
+    removed = [row["rank"] for row in old_rows[len(new_rows):]]
+    if not changed and not removed and old["count"] == new["count"]:
+        return None
+    return {"count": new["count"], "changed": changed, "removed_ranks": removed}
+
+
+def sse_event(event, data, event_id):
+    body = api_settings.DEFAULT_RENDERER_CLASSES[0]().render(data)
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event.encode(), body)
+
+
+class Subscriber:
+    __slots__ = ("queue",)
+
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def drain(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    def push(self, event, snapshot):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too slow to keep up: skip the backlog and start over from the current page
+            self.drain()
+            self.queue.put_nowait(snapshot)
+
+
+class Topic:
+
+    def __init__(self, broadcaster, key, compute):
+        self.broadcaster = broadcaster
+        self.key = key
+        self.compute = compute
+        self.interval = settings.LEADERBOARD_STREAM_INTERVAL
+        self.subscribers = set()
+        self.ready = asyncio.Event()
+        self.payload = None
+        self.snapshot = None
+        self.seq = 0
+        self.generation = None
+        self.computed_at = 0.0
+        self.sent_at = 0.0
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def run(self):
+        try:
+            while self.subscribers:
+                try:
+                    await self.tick()
+                except Exception:
+                    logger.exception("Leaderboard stream %s: refresh failed", self.key)
+                await asyncio.sleep(self.interval)
+        finally:
+            self.broadcaster.topics.pop(self.key, None)
+
+    async def tick(self):
+        now = time.monotonic()
+        generation = await leaderboard.pages.ageneration()
+        if self.ready.is_set() and generation == self.generation and now - self.computed_at < REFRESH_SECONDS:
+            if now - self.sent_at >= HEARTBEAT_SECONDS:
+                self.publish(b": keepalive\n\n", "heartbeat")
+            return
+
+        payload = await self.compute()
+        RECOMPUTES.inc()
+        self.generation, self.computed_at = generation, now
+
+        if self.payload is None:
+            self.payload = payload
+            self.snapshot = sse_event("snapshot", payload, self.seq)
+            self.ready.set()
+            return
+
+        diff = diff_page(self.payload, payload)
+        self.payload = payload
+        if diff is not None:
+            self.seq += 1
+            self.snapshot = sse_event("snapshot", payload, self.seq)
+            self.publish(sse_event("diff", diff, self.seq), "diff")
+
+    def publish(self, event, kind):
+        for subscriber in self.subscribers:
+            subscriber.push(event, self.snapshot)
+        EVENTS.inc(kind, amount=len(self.subscribers))
+        self.sent_at = time.monotonic()
+
+
+class Broadcaster:
+
+    def __init__(self):
+        self.topics = {}
+
+    async def stream(self, key, compute):
+        """SSE byte chunks for one subscriber of `key`: a snapshot, then diffs."""
+        topic = self.topics.get(key)
+        if topic is None:
+            topic = self.topics[key] = Topic(self, key, compute)
+        subscriber = Subscriber()
+        topic.subscribers.add(subscriber)
+        try:
+            await topic.ready.wait()
+            # Anything queued before the snapshot is already part of it
+            subscriber.drain()
+            EVENTS.inc("snapshot")
+            yield topic.snapshot
+            while True:
+                yield await subscriber.queue.get()
+        finally:
+            topic.subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        return sum(len(topic.subscribers) for topic in self.topics.values())
+
+
+def broadcaster():
+    """The Broadcaster of the running event loop."""
+    loop = asyncio.get_running_loop()
+    instance = _broadcasters.get(loop)
+    if instance is None:
+        instance = _broadcasters[loop] = Broadcaster()
+    return instance
+
+
+@REGISTRY.add_collector
+def leaderboard_stream_metrics():
+    subscribers = sum(b.subscriber_count() for b in list(_broadcasters.values()))
+    topics = sum(len(b.topics) for b in list(_broadcasters.values()))
+    return [
+        "# HELP leaderboard_stream_subscribers Open leaderboard streams in this process.",
+        "# TYPE leaderboard_stream_subscribers gauge",
+        f"leaderboard_stream_subscribers {subscribers}",
+        "# HELP leaderboard_stream_topics Distinct leaderboard pages being streamed.",
+        "# TYPE leaderboard_stream_topics gauge",
+        f"leaderboard_stream_topics {topics}",
+    ]
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from src.services.game.summaries import CHUNK_SIZE, compact, prune
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll games older than GAME_HISTORY_RETENTION_DAYS into daily per-player summaries. "
+        "With --prune, then delete the compacted raw rows in chunks (archiving them first "
+        "with --archive-dir). Safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows per batch")
+        parser.add_argument("--prune", action="store_true", help="Delete raw rows behind the compaction boundary")
+        parser.add_argument("--archive-dir", help="With --prune: append deleted rows to a .jsonl.gz file here")
+
+    def handle(self, *args, **options):
+        compaction = compact(chunk_size=options["chunk_size"])
+        if compaction is None:
+            self.stdout.write("Nothing new to compact")
+        else:
+            self.stdout.write(
+                f"Compacted {compaction.games} games before {compaction.compacted_before:%Y-%m-%d} "
+                f"into {compaction.summaries} daily summaries"
+            )
+
+        if options["prune"]:
+            pruned = prune(chunk_size=options["chunk_size"], archive_dir=options["archive_dir"])
+            self.stdout.write(f"Pruned {pruned} raw rows")
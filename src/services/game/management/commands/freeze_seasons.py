@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from src.services.game.seasons import FREEZE_AFTER, freeze_due
+
+
+class Command(BaseCommand):
+    help = (
+        "Freeze the final standings of seasons that ended more than "
+        f"{FREEZE_AFTER} ago into one packed blob each and delete their per-player "
+        "rows. Late games of a frozen season no longer count. Safe to re-run."
+    )
+
+    def handle(self, *args, **options):
+        frozen = freeze_due()
+        for season in frozen:
+            self.stdout.write(f"Froze {season}: {season.players} players")
+        self.stdout.write(f"{len(frozen)} seasons frozen")
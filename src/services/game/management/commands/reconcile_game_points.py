@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from src.services.game.reconcile import CHUNK_SIZE, reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount UserProfile.total_game_points from GameHistory and the daily summaries "
+        "of compacted games, and repair the profiles that drifted. Works through "
+        "user id ranges, one short transaction each; safe to run alongside new games."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="User ids per range")
+        parser.add_argument("--workers", type=int, default=1, help="Processes working through the ranges")
+        parser.add_argument("--dry-run", action="store_true", help="Only report the drifted profiles")
+        parser.add_argument("--show", type=int, default=20, help="Drifted profiles to list (largest drift first)")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        drifted = reconcile(chunk_size=options["chunk_size"], workers=options["workers"], dry_run=options["dry_run"])
+        elapsed = time.monotonic() - started
+
+        largest = sorted(drifted, key=lambda row: abs(row[2] - row[1]), reverse=True)[:options["show"]]
+        if largest:
+            self.stdout.write(f"{'user_id':>10} {'counted':>12} {'earned':>12} {'drift':>10}")
+            for user_id, counted, earned in largest:
+                self.stdout.write(f"{user_id:>10} {counted:>12} {earned:>12} {earned - counted:>+10}")
+        action = "found" if options["dry_run"] else "repaired"
+        self.stdout.write(
+            f"{len(drifted)} drifted profiles {action}, net drift "
+            f"{sum(earned - counted for _, counted, earned in drifted):+} points, in {elapsed:.1f}s"
+        )
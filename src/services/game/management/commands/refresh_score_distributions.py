@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from src.services.game.percentiles import CHUNK_SIZE, refresh
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the score histograms behind the percentile ranking "
+        "(one per grid size, operation and game mode). Run periodically."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows read per chunk")
+        parser.add_argument("--loop", action="store_true", help="Keep refreshing")
+        parser.add_argument("--interval", type=float, default=900, help="Seconds between refreshes with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            dimensions = refresh(chunk_size=options["chunk_size"])
+            self.stdout.write(f"Refreshed {dimensions} score distributions in {time.monotonic() - started:.2f}s")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,31 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from src.services.game.snapshots import SNAPSHOT_DELAY, snapshot_due
+
+
+class Command(BaseCommand):
+    help = (
+        "Store the final leaderboard of every day, week and month that ended more than "
+        f"{SNAPSHOT_DELAY} ago and has no snapshot yet. Run at least daily; safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="Date (YYYY-MM-DD) to backfill from when a period has no snapshots yet "
+                 "(default: only the last closed period)",
+        )
+
+    def handle(self, *args, **options):
+        since = options["since"]
+        if since is not None:
+            try:
+                since = datetime.date.fromisoformat(since)
+            except ValueError:
+                raise CommandError("--since must be a date (YYYY-MM-DD)")
+        created = snapshot_due(since=since)
+        for snap in created:
+            self.stdout.write(f"Snapshot {snap}")
+        self.stdout.write(f"{len(created)} snapshots written")
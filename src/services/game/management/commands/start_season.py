@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from src.services.game.seasons import start
+
+
+class Command(BaseCommand):
+    help = (
+        "Close the open leaderboard season and start the next one. Takes constant time: "
+        "points of the new season are created by each player's first game. Freeze the "
+        "closed season later with `manage.py freeze_seasons`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--name", default="", help="Display name of the new season")
+
+    def handle(self, *args, **options):
+        try:
+            season = start(name=options["name"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Started {season} at {season.starts_at:%Y-%m-%d %H:%M}"))
@@ -24,13 +24,13 @@ class GameHistory(models.Model):
         TIMED_OUT = "timed_out", "Timed Out"
 
     # Primary key from frontend
-    match_id = models.CharField(max_length=36, unique=True, db_index=True)
+    match_id = models.CharField(max_length=36, unique=True)
 
     player = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name="game_history",
-        db_index=True
+        db_index=False,  # Leading column of the (player, -timestamp, points_earned) index
     )
 
     # Core required fields
@@ -38,7 +38,7 @@ class GameHistory(models.Model):
     game_mode = models.CharField(max_length=20, choices=GameMode.choices)
     operation = models.CharField(max_length=20, choices=Operation.choices)
     grid_size = models.PositiveSmallIntegerField()
-    timestamp = models.DateTimeField(db_index=True)
+    timestamp = models.DateTimeField()
     status = models.CharField(max_length=20, choices=Status.choices)
 
     # Performance summary
@@ -55,7 +55,6 @@ class GameHistory(models.Model):
     # GAME POINTS
     points_earned = models.PositiveIntegerField(
         default=0,
-        db_index=True,
         help_text="Equals final_score for completed games, 0 otherwise"
     )
 
@@ -69,7 +68,6 @@ class GameHistory(models.Model):
         max_length=6,
         blank=True,
         null=True,
-        db_index=True,
         help_text="6-char room code – NULL for solo"
     )
     position = models.PositiveSmallIntegerField(
@@ -86,13 +84,13 @@ class GameHistory(models.Model):
     class Meta:
         verbose_name_plural = "Game History"
         indexes = [
-            Index(fields=["player", "-timestamp"]),          # Personal history
-            Index(fields=["-timestamp"]),                    # Global leaderboards
+            # Personal history; with points_earned it also covers per-player
+            # point totals (leaderboard subqueries) and period leaderboards,
+            # which the planner reads as a skip-scan over player then a
+            # timestamp range – compaction ranges too
+            Index(fields=["player", "-timestamp", "points_earned"]),
             Index(fields=["room_code", "-timestamp"]),       # Room results
         ]
-        constraints = [
-            models.UniqueConstraint(fields=["match_id"], name="unique_match_id")
-        ]
         ordering = ["-timestamp"]
 
     def __str__(self):
@@ -104,4 +102,166 @@ class GameHistory(models.Model):
             self.points_earned = self.final_score
         else:
             self.points_earned = 0
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class ScoreDistribution(models.Model):
+    """
+    Histogram of players' best completed score for one (grid_size, operation,
+    game_mode), rebuilt by `manage.py refresh_score_distributions`. Bin i
+    counts players whose best score is in [i * bin_width, (i + 1) * bin_width).
+    Read through src/services/game/percentiles.py.
+    """
+    grid_size = models.PositiveSmallIntegerField()
+    operation = models.CharField(max_length=20, choices=GameHistory.Operation.choices)
+    game_mode = models.CharField(max_length=20, choices=GameHistory.GameMode.choices)
+
+    bin_width = models.PositiveIntegerField()
+    players = models.PositiveIntegerField(help_text="Players in the histogram")
+    # Little-endian uint32 per bin
+    counts = models.BinaryField()
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["grid_size", "operation", "game_mode"], name="unique_score_distribution"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.grid_size}x{self.grid_size} {self.operation} {self.game_mode} ({self.players} players)"
+
+
+class PlayerDailySummary(models.Model):
+    """
+    One player's games of one day (TIME_ZONE), rolled up from GameHistory rows
+    older than GAME_HISTORY_RETENTION_DAYS by `manage.py compact_game_history`.
+    Reads combine summaries with the raw rows after the compaction boundary
+    (src/services/game/summaries.py).
+    """
+    player = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="daily_summaries",
+        db_index=False,  # Leading column of unique_player_day
+    )
+    day = models.DateField()
+    games = models.PositiveIntegerField(default=0)
+    points = models.PositiveIntegerField(default=0)
+    # A sum rather than an average, so summaries add up: average = accuracy_sum / games
+    accuracy_sum = models.FloatField(default=0)
+    # Games per value of each dimension: {"grid_size": {"4": 3}, "operation": {...}, ...}
+    breakdown = models.JSONField(default=dict)
+
+    class Meta:
+        verbose_name_plural = "Player Daily Summaries"
+        constraints = [
+            models.UniqueConstraint(fields=["player", "day"], name="unique_player_day")
+        ]
+        indexes = [
+            Index(fields=["day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.player_id} – {self.day} – {self.games} games"
+
+
+class GameHistoryCompaction(models.Model):
+    """
+    One compaction run. The latest `compacted_before` is the boundary: older
+    games are read from PlayerDailySummary, newer ones from GameHistory.
+    """
+    compacted_before = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    games = models.PositiveIntegerField(help_text="GameHistory rows rolled up")
+    summaries = models.PositiveIntegerField(help_text="PlayerDailySummary rows created")
+    pruned = models.PositiveIntegerField(default=0, help_text="Raw rows deleted (or archived) since")
+
+    class Meta:
+        ordering = ["-compacted_before"]
+
+    def __str__(self):
+        return f"Compacted before {self.compacted_before:%Y-%m-%d} ({self.games} games)"
+
+
+class Season(models.Model):
+    """
+    A leaderboard season. Starting one only inserts this row: points are kept
+    per (season, player) in SeasonPoints, created by a player's first game of
+    the season, so nothing is reset. Once closed, the final standings are
+    frozen into `standings` and read from there (src/services/game/seasons.py).
+    """
+    number = models.PositiveIntegerField(unique=True)
+    name = models.CharField(max_length=100, blank=True)
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField(null=True, blank=True, help_text="NULL while the season is open")
+
+    # Ranked (player, points, games) rows packed by src/services/game/standings.py
+    standings = models.BinaryField(null=True, editable=False)
+    players = models.PositiveIntegerField(null=True, blank=True, help_text="Players in the frozen standings")
+    frozen_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-number"]
+
+    def __str__(self):
+        return f"Season {self.number}" + (f" – {self.name}" if self.name else "")
+
+
+class SeasonPoints(models.Model):
+    """One player's points and completed games in one season."""
+    season = models.ForeignKey(
+        Season,
+        on_delete=models.CASCADE,
+        related_name="player_points",
+        db_index=False,  # Leading column of unique_season_player
+    )
+    player = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="season_points",
+    )
+    points = models.PositiveBigIntegerField(default=0)
+    games = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Season Points"
+        constraints = [
+            models.UniqueConstraint(fields=["season", "player"], name="unique_season_player")
+        ]
+        indexes = [
+            # The season leaderboard as an index-only scan
+            Index(fields=["season", "-points", "player", "games"]),
+        ]
+
+    def __str__(self):
+        return f"{self.player_id} – season {self.season_id} – {self.points}pts"
+
+
+class LeaderboardSnapshot(models.Model):
+    """
+    Final leaderboard of one closed day, week (from Monday) or month, in
+    TIME_ZONE, written once by `manage.py snapshot_leaderboards`. Historical
+    leaderboard requests read a slice of `standings` (src/services/game/snapshots.py).
+    """
+
+    class Period(models.TextChoices):
+        DAY = "day", "Day"
+        WEEK = "week", "Week"
+        MONTH = "month", "Month"
+
+    period = models.CharField(max_length=10, choices=Period.choices)
+    period_start = models.DateField()
+    # Ranked (player, points, games) rows packed by src/services/game/standings.py
+    standings = models.BinaryField(editable=False)
+    players = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["period", "period_start"], name="unique_leaderboard_snapshot")
+        ]
+        ordering = ["period", "-period_start"]
+
+    def __str__(self):
+        return f"{self.get_period_display()} of {self.period_start:%Y-%m-%d} ({self.players} players)"
@@ -0,0 +1,126 @@
+"""
+"You beat X% of players" per (grid_size, operation, game_mode).
+
+Percentiles are read from precomputed ScoreDistribution histograms instead of
+counting GameHistory rows per request. `refresh()` rebuilds them: one
+aggregate query per dimension streams each player's best completed score, and
+every chunk is binned with np.bincount.
+
+A histogram has at most MAX_BINS bins. While the top score stays below that,
+bins are one point wide and percentiles are exact. Above it, the percentile is
+interpolated within the score's bin, so it is off by less than that bin's
+share of players – returned as `error`.
+
+A lookup decodes the histogram once into cumulative counts (cached, with L1),
+after which it is two array reads.
+"""
+from itertools import islice
+
+import numpy as np
+from django.db.models import Max
+from django.utils import timezone
+
+from src.commons.cache import TieredCache
+from src.services.game.models import GameHistory, ScoreDistribution
+
+DIMENSIONS = ("grid_size", "operation", "game_mode")
+MAX_BINS = 1024
+CHUNK_SIZE = 10000
+# Storage format of ScoreDistribution.counts
+COUNT_DTYPE = np.dtype("<u4")
+
+# Decoded histograms keyed by (grid_size, operation, game_mode); refresh() drops them
+histograms = TieredCache("score_distribution", timeout=3600, l1_timeout=300)
+
+
+def bin_width_for(max_score):
+    """Narrowest bin width that fits scores 0..max_score into MAX_BINS bins."""
+    return max(1, -(-(max_score + 1) // MAX_BINS))
+
+
+def histogram(scores, bin_width, bins, chunk_size=CHUNK_SIZE):
+    """Counts per bin of the integer iterable `scores`, consumed `chunk_size` at a time."""
+    counts = np.zeros(bins, dtype=np.int64)
+    scores = iter(scores)
+    while True:
+        chunk = np.fromiter(islice(scores, chunk_size), dtype=np.int64)
+        if not chunk.size:
+            return counts
+        # Scores past the top bin (posted since the max was read) go into it
+        counts += np.bincount(np.minimum(chunk // bin_width, bins - 1), minlength=bins)
+
+
+def refresh(chunk_size=CHUNK_SIZE):
+    """Rebuild every ScoreDistribution from GameHistory. Returns the number of dimensions."""
+    now = timezone.now()
+    completed = GameHistory.objects.filter(status=GameHistory.Status.COMPLETED).order_by()
+    dimensions = list(completed.values(*DIMENSIONS).annotate(max_score=Max("final_score")))
+
+    for dimension in dimensions:
+        key = {name: dimension[name] for name in DIMENSIONS}
+        bin_width = bin_width_for(dimension["max_score"])
+        bins = dimension["max_score"] // bin_width + 1
+        best_scores = (
+            completed.filter(**key)
+            .values("player")
+            .annotate(best=Max("final_score"))
+            .values_list("best", flat=True)
+        )
+        counts = histogram(best_scores.iterator(chunk_size=chunk_size), bin_width, bins, chunk_size)
+        ScoreDistribution.objects.update_or_create(**key, defaults={
+            "bin_width": bin_width,
+            "players": int(counts.sum()),
+            "counts": counts.astype(COUNT_DTYPE).tobytes(),
+            "refreshed_at": now,
+        })
+
+    # Dimensions without completed games any more
+    ScoreDistribution.objects.filter(refreshed_at__lt=now).delete()
+    histograms.invalidate_all()
+    return len(dimensions)
+
+
+def _distribution(grid_size, operation, game_mode):
+    def load():
+        row = (
+            ScoreDistribution.objects
+            .filter(grid_size=grid_size, operation=operation, game_mode=game_mode)
+            .values("bin_width", "players", "counts", "refreshed_at")
+            .first()
+        )
+        if row is None:
+            return None
+        counts = np.frombuffer(bytes(row["counts"]), dtype=COUNT_DTYPE).astype(np.int64)
+        # below[i]: players in bins before i
+        row["below"] = np.concatenate(([0], np.cumsum(counts)))
+        row["counts"] = counts
+        return row
+
+    return histograms.get_or_set((grid_size, operation, game_mode), load)
+
+
+def percentile(grid_size, operation, game_mode, score):
+    """
+    {"percentile", "players", "error", "refreshed_at"}: the share of players
+    (in %) whose best score is below `score`. None before the first refresh
+    of this dimension.
+    """
+    distribution = _distribution(grid_size, operation, game_mode)
+    if distribution is None or not distribution["players"]:
+        return None
+
+    players, bin_width, counts = distribution["players"], distribution["bin_width"], distribution["counts"]
+    index = score // bin_width
+    if index >= len(counts):
+        beaten, error = players, 0
+    else:
+        in_bin = int(counts[index])
+        beaten = int(distribution["below"][index]) + in_bin * (score - index * bin_width) / bin_width
+        error = in_bin if bin_width > 1 else 0
+
+    return {
+        "percentile": round(100 * beaten / players, 2),
+        "players": players,
+        "error": round(100 * error / players, 2),
+        "refreshed_at": distribution["refreshed_at"],
+    }
@@ -0,0 +1,194 @@
+"""
+In-process rank snapshots: each period's leaderboard as NumPy arrays.
+
+With LEADERBOARD_RANKS_MAX_AGE set, leaderboard pages and "my rank"
+lookups are answered from a snapshot of the period's leaderboard held in
+worker memory, rebuilt once it is older than that (or from before
+midnight). They may lag behind new games by up to LEADERBOARD_RANKS_MAX_AGE
+seconds, and every worker holds its own copy. Unset, both read the database.
+
+Builds run in a background thread, never in a request: the request that
+finds the snapshot stale starts one and is answered from the stale snapshot,
+or from the database while there is none yet (a cold worker, after midnight).
+
+A build streams leaderboard_queryset() in rank order, CHUNK_SIZE rows at a
+time, into a packed standings array (src/services/game/standings.py) plus
+the players sorted by id and the points in ascending order. A rank is then
+one searchsorted over the player ids, a percentile one over the points, and
+a page or the top K a slice. A rebuild replaces the period's snapshot with
+one dict assignment; requests holding the old one finish with it.
+
+`Ranks.nbytes` is the memory a snapshot holds: 40 bytes per player,
+~38 MiB per million players per period. `footprint()` reports it for the
+snapshots of this process; `manage.py bench_ranks` measures it along with
+the lookup times.
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from src.services.game import leaderboard, standings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 10000
+
+_current = {}  # period -> Ranks
+_locks = {period: threading.Lock() for period in leaderboard.PERIODS}
+
+
+class Ranks:
+    """Standings of one period in rank order, with lookups by player and by points."""
+
+    def __init__(self, ranked, day=None):
+        self.standings = ranked
+        self.built_at = time.monotonic()
+        self.day = day
+        order = np.argsort(ranked["player"])
+        self.players = ranked["player"][order]
+        self.positions = order.astype(np.int32)
+        self.ascending = ranked["points"][::-1].copy()
+
+    @classmethod
+    def build(cls, period, chunk_size=CHUNK_SIZE):
+        day = timezone.localdate()
+        rows = leaderboard.leaderboard_queryset(period).values_list("player", "period_points", "games_played")
+        return cls(standings.collect(rows.iterator(chunk_size=chunk_size), chunk_size), day)
+
+    def __len__(self):
+        return len(self.standings)
+
+    @property
+    def nbytes(self):
+        return self.standings.nbytes + self.players.nbytes + self.positions.nbytes + self.ascending.nbytes
+
+    def rank(self, player_id):
+        """{"rank", "points", "games_played", "players", "percentile"} of the player, None if not ranked."""
+        index = int(np.searchsorted(self.players, player_id))
+        if index == len(self.players) or self.players[index] != player_id:
+            return None
+        position = int(self.positions[index])
+        points, games = int(self.standings["points"][position]), int(self.standings["games"][position])
+        return {
+            "rank": position + 1,
+            "points": points,
+            "games_played": games,
+            "players": len(self),
+            "percentile": self.percentile(points),
+        }
+
+    def percentile(self, points):
+        """Share of players (in %) with fewer than `points` points."""
+        if not len(self):
+            return None
+        return round(100 * int(np.searchsorted(self.ascending, points)) / len(self), 2)
+
+    def page(self, offset, page_size):
+        return standings.page_rows(self.standings, offset, page_size)
+
+    def top(self, k):
+        return self.page(0, k)
+
+
+def _fresh(ranks):
+    return (
+        ranks is not None
+        and time.monotonic() - ranks.built_at < settings.LEADERBOARD_RANKS_MAX_AGE
+        # today, this_week, ... start over at midnight
+        and ranks.day == timezone.localdate()
+    )
+
+
+def refresh(period, chunk_size=CHUNK_SIZE):
+    """Build the period's snapshot and swap it in."""
+    ranks = Ranks.build(period, chunk_size)
+    _current[period] = ranks
+    return ranks
+
+
+def _rebuild(period, lock):
+    try:
+        refresh(period)
+    except Exception:
+        logger.exception("Rebuilding the %s rank snapshot failed", period)
+    finally:
+        lock.release()
+        # The thread's own database connection
+        connection.close()
+
+
+def _start_rebuild(period, lock):
+    threading.Thread(target=_rebuild, args=(period, lock), name=f"ranks-{period}", daemon=True).start()
+
+
+def current(period):
+    """
+    The period's Ranks, None to read the database instead: while
+    LEADERBOARD_RANKS_MAX_AGE is unset, or until the first snapshot of the
+    period (of the day) is built. A stale one starts a rebuild.
+    """
+    if settings.LEADERBOARD_RANKS_MAX_AGE <= 0:
+        return None
+    ranks = _current.get(period)
+    if _fresh(ranks):
+        return ranks
+    lock = _locks[period]
+    # One rebuild per period at a time; it releases the lock when done
+    if lock.acquire(blocking=False):
+        _start_rebuild(period, lock)
+    # Yesterday's today, this_week, ... would rank the wrong games
+    if ranks is not None and ranks.day != timezone.localdate():
+        return None
+    return ranks
+
+
+async def acurrent(period):
+    # current() never waits on the database
+    return current(period)
+
+
+def clear():
+    _current.clear()
+
+
+def footprint():
+    """Memory held by this process's snapshots, per period."""
+    return {
+        period: {
+            "players": len(ranks),
+            "bytes": ranks.nbytes,
+            "bytes_per_million_players": round(ranks.nbytes / len(ranks) * 1_000_000) if len(ranks) else None,
+        }
+        for period, ranks in _current.items()
+    }
+
+
+def player_rank(period, player_id):
+    """
+    Ranks.rank() of the player in `period`: from the snapshot when
+    LEADERBOARD_RANKS_MAX_AGE is set, otherwise counted in the database.
+    """
+    ranks = current(period)
+    if ranks is not None:
+        return ranks.rank(player_id)
+
+    rows = leaderboard.leaderboard_queryset(period)
+    own = rows.filter(player=player_id).first()
+    if own is None:
+        return None
+    points = own["period_points"]
+    ahead = rows.filter(Q(period_points__gt=points) | Q(period_points=points, player__lt=player_id)).count()
+    players = rows.count()
+    return {
+        "rank": ahead + 1,
+        "points": points,
+        "games_played": own["games_played"],
+        "players": players,
+        "percentile": round(100 * rows.filter(period_points__lt=points).count() / players, 2),
+    }
@@ -0,0 +1,156 @@
+"""
+Recount of UserProfile.total_game_points from the games themselves.
+
+The column is only maintained by the award_game_points signal, so it drifts
+whenever games are written without it – bulk_create, the admin, raw SQL, a
+deleted game, a status edited afterwards. `reconcile()` (`manage.py
+reconcile_game_points`) repairs it: a player's points are the SUM of
+points_earned over the raw rows plus the daily summaries of compacted games
+(src/services/game/summaries.py), and the counter – main column plus the
+shards not folded yet (src/services/user/counters.py) – must equal that.
+
+Profiles are processed in ranges of `chunk_size` user ids, each set-based
+and in its own short transaction. On PostgreSQL that is a single
+UPDATE ... FROM over the range's profiles (locked), joined to the GROUP BY
+player totals of the games, summaries and shards of the range. The ORM has
+no UPDATE ... FROM, so elsewhere (SQLite) it is one SELECT of the drifted
+rows with both totals (locking them) and one UPDATE of those rows that
+recomputes the total with the same correlated aggregate, an index-only
+lookup per row on the (player, timestamp, points_earned) index. A game
+recorded meanwhile is counted once either way:
+AddGameHistoryView inserts it and awards its points in one transaction, and
+an award to a locked row waits for the recount to commit and adds on top.
+
+With `workers` > 1 the ranges are spread over that many processes (not on
+SQLite, which takes one writer at a time).
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
+
+import django
+from django.db import connection, connections, transaction
+from django.db.models import F, Max, Min
+
+from src.services.game import summaries
+from src.services.game.models import GameHistory, GameHistoryCompaction, PlayerDailySummary
+from src.services.user import counters
+from src.services.user.caches import profile_rows
+from src.services.user.models import CounterShard, UserProfile
+
+CHUNK_SIZE = 1000
+
+# The range's profiles (locked) with both totals: `counted` is the main column
+# plus the shards, `earned` the raw games since the boundary plus the summaries.
+_DRIFTED_SQL = """
+    SELECT u.user_id, u.total_game_points + COALESCE(s.value, 0) AS counted,
+           COALESCE(s.value, 0) AS shards, COALESCE(g.points, 0) AS earned
+    FROM (
+        SELECT user_id, total_game_points FROM {profile}
+        WHERE user_id >= %(first)s AND user_id < %(last)s
+        {for_update}
+    ) u
+    LEFT JOIN (
+        SELECT user_id, SUM(value) AS value FROM {shard}
+        WHERE counter = %(counter)s AND %(sharded)s AND user_id >= %(first)s AND user_id < %(last)s
+        GROUP BY user_id
+    ) s ON s.user_id = u.user_id
+    LEFT JOIN (
+        SELECT player_id, SUM(points) AS points FROM (
+            SELECT player_id, points_earned AS points FROM {game}
+            WHERE player_id >= %(first)s AND player_id < %(last)s AND timestamp >= COALESCE(
+                (SELECT compacted_before FROM {compaction} ORDER BY compacted_before DESC LIMIT 1), %(epoch)s
+            )
+            UNION ALL
+            SELECT player_id, points FROM {summary}
+            WHERE player_id >= %(first)s AND player_id < %(last)s
+        ) games
+        GROUP BY player_id
+    ) g ON g.player_id = u.user_id
+"""
+
+_RECOUNT_SQL = """
+    UPDATE {profile} AS p SET total_game_points = t.earned - t.shards
+    FROM ({drifted}) t
+    WHERE p.user_id = t.user_id AND t.counted <> t.earned
+    RETURNING p.user_id, t.counted, t.earned
+"""
+
+
+def _reconcile_range_sql(first, last, dry_run):
+    tables = {
+        "profile": UserProfile._meta.db_table,
+        "shard": CounterShard._meta.db_table,
+        "game": GameHistory._meta.db_table,
+        "summary": PlayerDailySummary._meta.db_table,
+        "compaction": GameHistoryCompaction._meta.db_table,
+    }
+    for_update = "FOR UPDATE" if connection.features.has_select_for_update else ""
+    drifted = _DRIFTED_SQL.format(for_update=for_update, **tables)
+    if dry_run:
+        sql = f"SELECT user_id, counted, earned FROM ({drifted}) t WHERE counted <> earned"
+    else:
+        sql = _RECOUNT_SQL.format(drifted=drifted, **tables)
+    params = {
+        "first": first,
+        "last": last,
+        "counter": counters.GAME_POINTS,
+        "sharded": counters.sharded(),
+        "epoch": connection.ops.adapt_datetimefield_value(summaries._EPOCH),
+    }
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        drifted = sorted(cursor.fetchall())
+        if drifted and not dry_run:
+            profile_rows.invalidate(*(user_id for user_id, _, _ in drifted))
+    return drifted
+
+
+def reconcile_range(first, last, dry_run=False):
+    """
+    Repair the profiles with user ids in [first, last). Returns the drifted
+    ones as (user_id, counted, earned) tuples, as found before the repair.
+    """
+    if connection.vendor == "postgresql":
+        return _reconcile_range_sql(first, last, dry_run)
+
+    counted = counters.total_expression(counters.GAME_POINTS)
+    earned = summaries.points_expression()
+    with transaction.atomic():
+        profiles = UserProfile.objects.filter(user_id__gte=first, user_id__lt=last)
+        drifted = list(
+            profiles.annotate(counted=counted, earned=earned)
+            .exclude(counted=F("earned"))
+            .select_for_update()
+            .order_by("user_id")
+            .values_list("user_id", "counted", "earned")
+        )
+        if drifted and not dry_run:
+            user_ids = [user_id for user_id, _, _ in drifted]
+            profiles.filter(user_id__in=user_ids).update(
+                total_game_points=F("total_game_points") + earned - counted
+            )
+            profile_rows.invalidate(*user_ids)
+    return drifted
+
+
+def _start_worker():
+    # Workers started without fork import the project from scratch
+    django.setup()
+
+
+def reconcile(chunk_size=CHUNK_SIZE, workers=1, dry_run=False):
+    """Repair every profile, `chunk_size` user ids at a time. Returns reconcile_range()'s tuples of all of them."""
+    ids = UserProfile.objects.aggregate(first=Min("user_id"), last=Max("user_id"))
+    if ids["first"] is None:
+        return []
+    firsts = range(ids["first"], ids["last"] + 1, chunk_size)
+    lasts = [first + chunk_size for first in firsts]
+
+    # SQLite has a single writer: parallel ranges would only fail on its lock
+    if workers <= 1 or connection.vendor == "sqlite":
+        return list(chain.from_iterable(map(reconcile_range, firsts, lasts, repeat(dry_run))))
+
+    # Forked workers must not share the parent's database connections
+    connections.close_all()
+    with ProcessPoolExecutor(workers, initializer=_start_worker) as pool:
+        return list(chain.from_iterable(pool.map(reconcile_range, firsts, lasts, repeat(dry_run))))
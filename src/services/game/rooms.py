@@ -0,0 +1,54 @@
+"""
+Multiplayer room standings (GET /api/v1/game/rooms/<room_code>/results/).
+
+Every player of a match posts their own GameHistory row, all carrying the
+room code, their position and the room's total_players. A room code can be
+reused for later matches, so "the latest match" is cut from the newest rows
+of the room: one (room_code, -timestamp) index range of at most
+MAX_ROOM_PLAYERS rows, read newest first until a player repeats, the player
+count changes or the rows are too far apart to be one match.
+"""
+from datetime import timedelta
+
+from src.commons.cache import TieredCache
+from src.services.game.models import GameHistory
+
+# Upper bound on players per room; also the size of the index range read
+MAX_ROOM_PLAYERS = 16
+# Results of one match are posted within this window of each other
+MATCH_WINDOW = timedelta(minutes=30)
+
+# Response payloads keyed by room code. Invalidated whenever a result for the
+# room arrives (src/services/game/signals.py), so an incomplete match is only
+# served from cache until the next player reports; a complete one stays until
+# the room is reused.
+results = TieredCache("room_results", timeout=3600)
+
+
+def room_rows(room_code, columns):
+    """The room's newest results, newest first – one index range scan."""
+    return (
+        GameHistory.objects.filter(room_code=room_code)
+        .order_by("-timestamp")
+        .values(*columns)[:MAX_ROOM_PLAYERS]
+    )
+
+
+def latest_match(rows):
+    """The rows of `rows` (newest first) belonging to the newest match."""
+    if not rows:
+        return []
+    newest = rows[0]
+    expected = newest["total_players"] or MAX_ROOM_PLAYERS
+    match, players = [], set()
+    for row in rows:
+        if (
+            len(match) >= expected
+            or row["player"] in players
+            or row["total_players"] != newest["total_players"]
+            or newest["timestamp"] - row["timestamp"] > MATCH_WINDOW
+        ):
+            break
+        players.add(row["player"])
+        match.append(row)
+    return sorted(match, key=lambda row: (row["position"] or MAX_ROOM_PLAYERS + 1, -row["final_score"]))
@@ -0,0 +1,146 @@
+"""
+Leaderboard seasons.
+
+A season's points live in SeasonPoints, one row per player who played in
+it, created by that player's first game of the season (`record_game()`,
+from the GameHistory post_save signal). Starting a season (`start()`,
+`manage.py start_season`) closes the open one and inserts the next: two
+single-row writes, however many players there are – nobody's points are
+reset, the new season simply has no rows yet.
+
+Games count towards the season they were played in, by timestamp, so a game
+posted late still lands in the right one. Once a closed season is past that
+grace period, `freeze()` (`manage.py freeze_seasons`) packs its final
+standings into Season.standings and deletes its SeasonPoints rows; historical
+season leaderboards are a slice of that blob from then on.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Q, Subquery
+from django.utils import timezone
+
+from src.commons.cache import TieredCache
+from src.services.game import standings
+from src.services.game.models import Season, SeasonPoints
+
+CHUNK_SIZE = 5000
+# How long after its end a season still takes late games before it is frozen
+FREEZE_AFTER = timedelta(hours=1)
+
+# Seasons that still take games, as (id, starts_at, ends_at), oldest first.
+# Season saves invalidate it (src/services/game/signals.py) – in the process
+# that saved, so other workers' L1 may lag behind; only reads use it.
+unfrozen = TieredCache("seasons", timeout=300, l1_timeout=30)
+# Decoded standings of frozen seasons, keyed by season number
+frozen = TieredCache("season_standings", timeout=3600, l1_timeout=300)
+
+
+def _unfrozen():
+    return unfrozen.get_or_set("all", lambda: list(
+        Season.objects.filter(frozen_at__isnull=True).order_by("starts_at").values_list("id", "starts_at", "ends_at")
+    ))
+
+
+def season_at(timestamp):
+    """
+    Id of the unfrozen season `timestamp` falls in, or None. Read from the
+    database, not `unfrozen`: right after a rollover another worker's cached
+    list would still credit the closed season.
+    """
+    return (
+        Season.objects
+        .filter(frozen_at__isnull=True, starts_at__lte=timestamp)
+        .filter(Q(ends_at__isnull=True) | Q(ends_at__gt=timestamp))
+        .order_by("-starts_at")
+        .values_list("pk", flat=True)
+        .first()
+    )
+
+
+def current_start():
+    """Start of the open season, None if there is none."""
+    for _, starts_at, ends_at in _unfrozen():
+        if ends_at is None:
+            return starts_at
+    return None
+
+
+def record_game(game):
+    """Add a new game to its season: points of completed games, and every game to games."""
+    season_id = season_at(game.timestamp)
+    if season_id is None:
+        return
+    rows = SeasonPoints.objects.filter(season_id=season_id, player_id=game.player_id)
+    if rows.update(points=F("points") + game.points_earned, games=F("games") + 1):
+        return
+    try:
+        with transaction.atomic():
+            SeasonPoints.objects.create(season_id=season_id, player_id=game.player_id, points=game.points_earned, games=1)
+    except IntegrityError:
+        # The player's other device created the row first
+        rows.update(points=F("points") + game.points_earned, games=F("games") + 1)
+
+
+def start(name="", at=None):
+    """Close the open season (if any) at `at` (default: now) and open the next one."""
+    at = at or timezone.now()
+    with transaction.atomic():
+        previous = Season.objects.select_for_update().filter(ends_at__isnull=True).first()
+        if previous:
+            if at <= previous.starts_at:
+                raise ValueError(f"{previous} starts at {previous.starts_at}, after {at}")
+            previous.ends_at = at
+            previous.save(update_fields=["ends_at"])
+        number = (Season.objects.aggregate(last=Max("number"))["last"] or 0) + 1
+        return Season.objects.create(number=number, name=name, starts_at=at)
+
+
+def points_queryset():
+    """leaderboard_queryset() rows of the open season, best first."""
+    return (
+        SeasonPoints.objects
+        .filter(season=Subquery(Season.objects.filter(ends_at__isnull=True).values("pk")[:1]))
+        .values("player", period_points=F("points"), games_played=F("games"))
+        .order_by("-period_points", "player")
+    )
+
+
+def freeze(season, chunk_size=CHUNK_SIZE):
+    """Pack the season's final standings into Season.standings and drop its SeasonPoints rows."""
+    rows = SeasonPoints.objects.filter(season=season)
+    ranked = rows.order_by("-points", "player").values_list("player_id", "points", "games")
+    blob = standings.pack(ranked.iterator(chunk_size=chunk_size), chunk_size)
+    season.standings = blob
+    season.players = len(blob) // standings.STANDINGS_DTYPE.itemsize
+    season.frozen_at = timezone.now()
+    season.save(update_fields=["standings", "players", "frozen_at"])
+
+    while ids := list(rows.order_by("pk").values_list("pk", flat=True)[:chunk_size]):
+        SeasonPoints.objects.filter(pk__in=ids).delete()
+    frozen.invalidate(season.number)
+    return season
+
+
+def freeze_due(now=None):
+    """Freeze every season that ended more than FREEZE_AFTER ago. Returns them."""
+    now = now or timezone.now()
+    due = Season.objects.filter(frozen_at__isnull=True, ends_at__lte=now - FREEZE_AFTER).order_by("number")
+    return [freeze(season) for season in due]
+
+
+def frozen_standings(number):
+    """Decoded standings of frozen season `number`, None if it is not frozen (or does not exist)."""
+    def load():
+        blob = Season.objects.filter(number=number, frozen_at__isnull=False).values_list("standings", flat=True).first()
+        return None if blob is None else standings.unpack(blob)
+
+    return frozen.get_or_set(number, load)
+
+
+async def afrozen_standings(number):
+    async def load():
+        blob = await Season.objects.filter(number=number, frozen_at__isnull=False).values_list("standings", flat=True).afirst()
+        return None if blob is None else standings.unpack(blob)
+
+    return await frozen.aget_or_set(number, load)
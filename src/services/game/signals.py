@@ -1,8 +1,12 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.db import transaction
-from django.db.models import F
-from .models import GameHistory
+from src.services.game import seasons
+from src.services.game.leaderboard import pages as leaderboard_pages
+from src.services.game.rooms import results as room_results
+from src.services.game.summaries import fold_late_game
+from src.services.user import counters
+from src.services.user.caches import profile_rows
+from .models import GameHistory, Season
 
 
 
@@ -11,16 +15,44 @@ def award_game_points(sender, instance, created, **kwargs):
     """
     On every new COMPLETED game:
     → Add points_earned (== final_score) to UserProfile.total_game_points
-    → Atomic update with select_for_update (prevents race conditions)
+    → Single F() update, or a counter shard while COUNTER_SHARDS is set
     """
     if not created or instance.status != sender.Status.COMPLETED:
         return
 
     points = instance.points_earned  # set by GameHistory.save()
 
-    # Update UserProfile total
-    with transaction.atomic():
-        from src.services.user.models import UserProfile
-        UserProfile.objects.filter(user=instance.player).select_for_update().update(
-            total_game_points=F("total_game_points") + points
-        )
\ No newline at end of file
+    counters.increment(counters.GAME_POINTS, instance.player_id, points)
+    profile_rows.invalidate(instance.player_id)
+
+
+@receiver(post_save, sender=GameHistory)
+def record_season_points(sender, instance, created, **kwargs):
+    # Before invalidate_leaderboard, so the season page is rebuilt with this game
+    if created:
+        seasons.record_game(instance)
+
+
+@receiver(post_save, sender=Season)
+def invalidate_seasons(sender, instance, **kwargs):
+    # A new season replaces the open one on the "season" leaderboard
+    seasons.unfrozen.invalidate_all()
+    leaderboard_pages.invalidate_all()
+
+
+@receiver(post_save, sender=GameHistory)
+def invalidate_leaderboard(sender, instance, **kwargs):
+    # Every game counts towards games_played, whatever its status
+    leaderboard_pages.invalidate_all()
+
+@receiver(post_save, sender=GameHistory)
+def invalidate_room_results(sender, instance, **kwargs):
+    if instance.room_code:
+        room_results.invalidate(instance.room_code)
+
+
+@receiver(post_save, sender=GameHistory)
+def summarize_late_game(sender, instance, created, **kwargs):
+    # Games timestamped before the compaction boundary are only read from summaries
+    if created:
+        fold_late_game(instance)
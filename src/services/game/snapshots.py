@@ -0,0 +1,152 @@
+"""
+Frozen leaderboards of closed periods.
+
+Once a day, week or month (in TIME_ZONE) is over its leaderboard is final,
+so `snapshot_due()` (`manage.py snapshot_leaderboards`, run at least daily)
+ranks it once more and stores the result as a LeaderboardSnapshot blob.
+Periods are snapshotted SNAPSHOT_DELAY after they end, leaving time for
+games posted late; later ones no longer change the snapshot.
+
+A historical leaderboard request (`period_start` for day/week/month,
+`season` for seasons – src/services/game/seasons.py) is then one cached
+blob read and a slice, whatever the number of players.
+"""
+import datetime
+
+from django.db.models import Max
+from django.utils import timezone
+
+from src.commons.cache import TieredCache
+from src.services.game import leaderboard, seasons, standings
+from src.services.game.models import LeaderboardSnapshot
+
+DAY, WEEK, MONTH = LeaderboardSnapshot.Period.values
+# Leaderboard period -> the closed periods of that kind
+SNAPSHOT_PERIODS = {"today": DAY, "this_week": WEEK, "this_month": MONTH}
+SNAPSHOT_DELAY = datetime.timedelta(hours=1)
+CHUNK_SIZE = 10000
+
+# Decoded standings keyed by (period, period_start)
+frozen = TieredCache("leaderboard_snapshot", timeout=3600, l1_timeout=300)
+
+
+def align(period, day):
+    """First day of the `period` containing the date `day`."""
+    if period == WEEK:
+        return day - datetime.timedelta(days=day.weekday())
+    if period == MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def next_start(period, day):
+    if period == WEEK:
+        return day + datetime.timedelta(days=7)
+    if period == MONTH:
+        return (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return day + datetime.timedelta(days=1)
+
+
+def bounds(period, day):
+    """(start, end) of the `period` starting on `day`, as local midnights."""
+    def midnight(date):
+        return timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
+    return midnight(day), midnight(next_start(period, day))
+
+
+def requested(period, query_params):
+    """
+    The frozen standings a leaderboard request asks for, as (kind, key):
+    ("season", number) or (DAY/WEEK/MONTH, first day). None for the live
+    leaderboard. Raises ValueError for invalid parameters.
+    """
+    number = query_params.get("season")
+    if period == "season" and number is not None:
+        if not number.isdigit():
+            raise ValueError("season must be a season number.")
+        return "season", int(number)
+
+    start = query_params.get("period_start")
+    if start is None:
+        return None
+    if period not in SNAPSHOT_PERIODS:
+        raise ValueError(f"period_start needs a period in {list(SNAPSHOT_PERIODS)}.")
+    try:
+        day = datetime.date.fromisoformat(start)
+    except ValueError:
+        raise ValueError("period_start must be a date (YYYY-MM-DD).") from None
+    kind = SNAPSHOT_PERIODS[period]
+    if align(kind, day) != day:
+        raise ValueError(f"period_start must be the first day of a {kind}.")
+    if day == align(kind, timezone.localdate()):
+        return None  # The current period
+    return kind, day
+
+
+def page_extra(kind, key):
+    """What identifies the frozen standings in the response."""
+    return {"season": key} if kind == "season" else {"period_start": key.isoformat()}
+
+
+def snapshot(period, day, chunk_size=CHUNK_SIZE):
+    """Rank the `period` starting on `day` and store it (once). Returns the LeaderboardSnapshot."""
+    start, end = bounds(period, day)
+    ranked = leaderboard.range_queryset(start, end).values_list("player", "period_points", "games_played")
+    blob = standings.pack(ranked.iterator(chunk_size=chunk_size), chunk_size)
+    snap, _ = LeaderboardSnapshot.objects.get_or_create(period=period, period_start=day, defaults={
+        "standings": blob,
+        "players": len(blob) // standings.STANDINGS_DTYPE.itemsize,
+    })
+    frozen.invalidate((period, day))
+    return snap
+
+
+def snapshot_due(since=None, now=None, chunk_size=CHUNK_SIZE):
+    """
+    Snapshot every period that ended SNAPSHOT_DELAY ago and has no snapshot
+    yet, after the latest existing one of its kind. Without any, start at
+    the period containing the date `since`, or else the last closed period.
+    Returns the new snapshots.
+    """
+    cutoff = (now or timezone.now()) - SNAPSHOT_DELAY
+    created = []
+    for period in LeaderboardSnapshot.Period.values:
+        last = LeaderboardSnapshot.objects.filter(period=period).aggregate(last=Max("period_start"))["last"]
+        if last is not None:
+            day = next_start(period, last)
+        elif since is not None:
+            day = align(period, since)
+        else:
+            # The period before the one `cutoff` falls in
+            day = align(period, align(period, timezone.localdate(cutoff)) - datetime.timedelta(days=1))
+        while bounds(period, day)[1] <= cutoff:
+            created.append(snapshot(period, day, chunk_size))
+            day = next_start(period, day)
+    return created
+
+
+def _blob(period, day):
+    return LeaderboardSnapshot.objects.filter(period=period, period_start=day).values_list("standings", flat=True)
+
+
+def frozen_standings(kind, key):
+    """Decoded standings for `requested()`'s (kind, key), None if there are none."""
+    if kind == "season":
+        return seasons.frozen_standings(key)
+
+    def load():
+        blob = _blob(kind, key).first()
+        return None if blob is None else standings.unpack(blob)
+
+    return frozen.get_or_set((kind, key), load)
+
+
+async def afrozen_standings(kind, key):
+    if kind == "season":
+        return await seasons.afrozen_standings(key)
+
+    async def load():
+        blob = await _blob(kind, key).afirst()
+        return None if blob is None else standings.unpack(blob)
+
+    return await frozen.aget_or_set((kind, key), load)
@@ -0,0 +1,39 @@
+"""
+Frozen leaderboard standings: a final ranking stored as one packed blob.
+
+Rows are (player, points, games) in rank order, little-endian fixed-width
+records, so a stored ranking decodes with one np.frombuffer (no copy) and a
+page is a slice of it.
+"""
+from itertools import islice
+
+import numpy as np
+
+STANDINGS_DTYPE = np.dtype([("player", "<i8"), ("points", "<i8"), ("games", "<u4")])
+CHUNK_SIZE = 10000
+
+
+def collect(rows, chunk_size=CHUNK_SIZE):
+    """Array of the ranked (player, points, games) tuples of the iterable `rows`, read `chunk_size` at a time."""
+    rows = iter(rows)
+    chunks = []
+    while chunk := list(islice(rows, chunk_size)):
+        chunks.append(np.array(chunk, dtype=STANDINGS_DTYPE))
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=STANDINGS_DTYPE)
+
+
+def pack(rows, chunk_size=CHUNK_SIZE):
+    """Blob of the ranked (player, points, games) tuples of the iterable `rows`."""
+    return collect(rows, chunk_size).tobytes()
+
+
+def unpack(blob):
+    return np.frombuffer(bytes(blob), dtype=STANDINGS_DTYPE)
+
+
+def page_rows(standings, offset, page_size):
+    """leaderboard_queryset()-style rows (player, period_points, games_played) of one page."""
+    return [
+        {"player": player, "period_points": points, "games_played": games}
+        for player, points, games in standings[offset:offset + page_size].tolist()
+    ]
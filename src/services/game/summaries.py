@@ -0,0 +1,297 @@
+"""
+Daily per-player summaries of old games.
+
+`compact()` (run by `manage.py compact_game_history`) rolls GameHistory rows
+older than GAME_HISTORY_RETENTION_DAYS into PlayerDailySummary rows – whole
+days in TIME_ZONE – and records the boundary as a GameHistoryCompaction.
+Reads that reach back past the retention window combine both sources: the
+summaries, plus the raw rows at or after the boundary. Raw rows before it are
+ignored whether or not `prune()` has deleted (or archived) them yet, so
+results are the same before and after compaction and pruning.
+
+A game posted later with a timestamp before the boundary is folded straight
+into its day's summary (`fold_late_game`, from the post_save signal, in the
+game's transaction). It reads the boundary under the row lock `compact()`
+holds, so a game posted during a run either commits before the run reads the
+games (and is compacted) or waits for the run and is folded. The first run
+inserts an empty boundary at the epoch beforehand, so there is a row to lock.
+"""
+import datetime
+import gzip
+import json
+import os
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from src.services.game.models import GameHistory, GameHistoryCompaction, PlayerDailySummary
+from src.services.game.rooms import results as room_results
+
+# Dimensions counted in PlayerDailySummary.breakdown
+BREAKDOWN = ("grid_size", "operation", "game_mode", "game_type", "status")
+CHUNK_SIZE = 2000
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def horizon(now=None):
+    """Local midnight GAME_HISTORY_RETENTION_DAYS ago; older games may be compacted."""
+    today = timezone.localdate(now)
+    day = today - datetime.timedelta(days=settings.GAME_HISTORY_RETENTION_DAYS)
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def boundary():
+    """The current compaction boundary, or None before the first run."""
+    return GameHistoryCompaction.objects.values_list("compacted_before", flat=True).first()
+
+
+def boundary_expression():
+    """The compaction boundary as a subquery, the epoch before the first run."""
+    return Coalesce(
+        Subquery(GameHistoryCompaction.objects.values("compacted_before")[:1]),
+        Value(_EPOCH),
+        output_field=models.DateTimeField(),
+    )
+
+
+def sources(start=None, player=None, end=None):
+    """
+    (raw GameHistory, PlayerDailySummary) querysets that together cover the
+    games since `start` (all games if None) and before `end` (if given),
+    optionally of one player. Summaries are whole days, so a `start` or `end`
+    inside the compacted range is rounded down to its day; periods inside
+    the retention window read raw rows only.
+    """
+    raw = GameHistory.objects.order_by()
+    summaries = PlayerDailySummary.objects.order_by()
+    if player is not None:
+        raw, summaries = raw.filter(player=player), summaries.filter(player=player)
+    if end is not None:
+        raw, summaries = raw.filter(timestamp__lt=end), summaries.filter(day__lt=timezone.localdate(end))
+
+    if start is not None and start >= horizon():
+        return raw.filter(timestamp__gte=start), summaries.none()
+
+    raw = raw.filter(timestamp__gte=boundary_expression())
+    if start is not None:
+        raw = raw.filter(timestamp__gte=start)
+        summaries = summaries.filter(day__gte=timezone.localdate(start))
+    return raw, summaries
+
+
+def _add_breakdown(breakdown, values, games):
+    for name in BREAKDOWN:
+        bucket = breakdown.setdefault(name, {})
+        key = str(values[name])
+        bucket[key] = bucket.get(key, 0) + games
+
+
+# ====================================================================================== COMPACTION
+
+def _summaries(grouped):
+    """PlayerDailySummary objects from rows grouped by player, day and BREAKDOWN, in (player, day) order."""
+    current = None
+    for row in grouped:
+        if current is not None and (current.player_id, current.day) != (row["player"], row["day"]):
+            yield current
+            current = None
+        if current is None:
+            current = PlayerDailySummary(player_id=row["player"], day=row["day"], breakdown={})
+        current.games += row["games"]
+        current.points += row["points"] or 0
+        current.accuracy_sum += row["accuracy"] or 0
+        _add_breakdown(current.breakdown, row, row["games"])
+    if current is not None:
+        yield current
+
+
+def _lock_boundary():
+    """
+    Lock the boundary row, waiting for a compaction run that holds it. False
+    before the first run. Read the boundary afresh afterwards: the locking
+    SELECT still returns the row it waited for, not the one the run inserted.
+    """
+    return bool(GameHistoryCompaction.objects.select_for_update().values_list("pk", flat=True)[:1])
+
+
+def compact(before=None, chunk_size=CHUNK_SIZE):
+    """
+    Roll games before `before` (default: horizon()) that are not summarized
+    yet into PlayerDailySummary rows and move the boundary. Returns the new
+    GameHistoryCompaction, or None if there was nothing to do.
+    """
+    from src.services.game.leaderboard import pages as leaderboard_pages
+
+    before = before or horizon()
+    # Whole days only, so a day never ends up split between two runs
+    before = timezone.make_aware(datetime.datetime.combine(timezone.localdate(before), datetime.time.min))
+
+    if not GameHistoryCompaction.objects.exists():
+        GameHistoryCompaction.objects.get_or_create(compacted_before=_EPOCH, defaults={"games": 0, "summaries": 0})
+
+    with transaction.atomic():
+        # Serializes concurrent runs and fold_late_game() (where the database supports it)
+        _lock_boundary()
+        previous = GameHistoryCompaction.objects.first()
+        if previous is not None and before <= previous.compacted_before:
+            return None
+
+        games = GameHistory.objects.filter(timestamp__lt=before)
+        if previous is not None:
+            games = games.filter(timestamp__gte=previous.compacted_before)
+        grouped = (
+            games.order_by()
+            .annotate(day=TruncDate("timestamp"))
+            .values("player", "day", *BREAKDOWN)
+            .annotate(games=Count("id"), points=Sum("points_earned"), accuracy=Sum("accuracy_percentage"))
+            .order_by("player", "day")
+        )
+
+        summarized = created = 0
+        summaries = _summaries(grouped.iterator(chunk_size=chunk_size))
+        while batch := list(islice(summaries, chunk_size)):
+            PlayerDailySummary.objects.bulk_create(batch)
+            summarized += sum(summary.games for summary in batch)
+            created += len(batch)
+
+        compaction = GameHistoryCompaction.objects.create(
+            compacted_before=before, games=summarized, summaries=created
+        )
+
+    leaderboard_pages.invalidate_all()
+    return compaction
+
+
+def prune(chunk_size=CHUNK_SIZE, archive_dir=None):
+    """
+    Delete raw rows before the boundary in chunks, first appending them to a
+    gzipped JSON-lines file in `archive_dir` if given. Returns the row count.
+    """
+    compaction = GameHistoryCompaction.objects.first()
+    if compaction is None:
+        return 0
+
+    queryset = GameHistory.objects.filter(timestamp__lt=compaction.compacted_before)
+    archive = None
+    if archive_dir:
+        os.makedirs(archive_dir, exist_ok=True)
+        path = os.path.join(archive_dir, f"game_history-before-{compaction.compacted_before:%Y%m%d}.jsonl.gz")
+        archive = gzip.open(path, "at", encoding="utf-8")
+
+    pruned = 0
+    try:
+        while ids := list(queryset.order_by("pk").values_list("pk", flat=True)[:chunk_size]):
+            chunk = GameHistory.objects.filter(pk__in=ids)
+            if archive is not None:
+                for row in chunk.values():
+                    archive.write(json.dumps(row, cls=DjangoJSONEncoder) + "\n")
+                archive.flush()
+            with transaction.atomic():
+                chunk.delete()
+            pruned += len(ids)
+    finally:
+        if archive is not None:
+            archive.close()
+        if pruned:
+            GameHistoryCompaction.objects.filter(pk=compaction.pk).update(pruned=F("pruned") + pruned)
+            room_results.invalidate_all()
+    return pruned
+
+
+def fold_late_game(game):
+    """Add `game` to its day's summary if it is behind the boundary. True if folded."""
+    if game.timestamp >= horizon():
+        # The boundary is never later than the horizon: nothing to look up
+        return False
+    with transaction.atomic():
+        if not _lock_boundary() or game.timestamp >= boundary():
+            return False
+
+        summary, _ = PlayerDailySummary.objects.select_for_update().get_or_create(
+            player_id=game.player_id, day=timezone.localdate(game.timestamp)
+        )
+        summary.games += 1
+        summary.points += game.points_earned
+        summary.accuracy_sum += game.accuracy_percentage
+        _add_breakdown(summary.breakdown, {name: getattr(game, name) for name in BREAKDOWN}, 1)
+        summary.save()
+    return True
+
+
+# ====================================================================================== READS
+
+def _total(queryset, aggregate):
+    """Correlated per-player total of `queryset` (already filtered on the outer user)."""
+    return Coalesce(
+        Subquery(queryset.values("player").annotate(total=aggregate).values("total")),
+        0,
+    )
+
+
+def points_expression(player_ref=OuterRef("user_id")):
+    """Correlated all-time points of the outer player (`player_ref`): raw rows plus summaries."""
+    raw, summaries = sources()
+    return (
+        _total(raw.filter(player=player_ref), Sum("points_earned"))
+        + _total(summaries.filter(player=player_ref), Sum("points"))
+    )
+
+
+def combined_leaderboard(start=None, end=None):
+    """leaderboard_queryset() rows over summaries and raw rows: player, period_points, games_played."""
+    from django.contrib.auth import get_user_model
+
+    raw, summaries = sources(start, end=end)
+    raw = raw.filter(player=OuterRef("pk"))
+    summaries = summaries.filter(player=OuterRef("pk"))
+    return (
+        get_user_model().objects
+        .annotate(
+            player=F("pk"),
+            period_points=_total(raw, Sum("points_earned")) + _total(summaries, Sum("points")),
+            games_played=_total(raw, Count("id")) + _total(summaries, Sum("games")),
+        )
+        .filter(games_played__gt=0)
+        .values("player", "period_points", "games_played")
+        .order_by("-period_points", "player")
+    )
+
+
+def player_stats(player, start=None):
+    """Totals and per-dimension game counts of `player` since `start`, over summaries and raw rows."""
+    raw, summaries = sources(start, player=player)
+    games = points = 0
+    accuracy_sum = 0.0
+    breakdown = {name: {} for name in BREAKDOWN}
+
+    grouped = (
+        raw.values(*BREAKDOWN)
+        .annotate(games=Count("id"), points=Sum("points_earned"), accuracy=Sum("accuracy_percentage"))
+    )
+    for row in grouped:
+        games += row["games"]
+        points += row["points"] or 0
+        accuracy_sum += row["accuracy"] or 0
+        _add_breakdown(breakdown, row, row["games"])
+
+    for summary in summaries.values("games", "points", "accuracy_sum", "breakdown"):
+        games += summary["games"]
+        points += summary["points"]
+        accuracy_sum += summary["accuracy_sum"]
+        for name, counts in summary["breakdown"].items():
+            bucket = breakdown.setdefault(name, {})
+            for key, count in counts.items():
+                bucket[key] = bucket.get(key, 0) + count
+
+    return {
+        "games_played": games,
+        "total_points": points,
+        "average_accuracy": round(accuracy_sum / games, 2) if games else None,
+        "breakdown": {name: dict(sorted(counts.items())) for name, counts in breakdown.items()},
+    }
@@ -1,3 +1,872 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import gzip
+import os
+import tempfile
+from functools import partial
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.db import DatabaseError, connection
+from django.db.models import Max
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from src.api.v1.game import async_views
+from src.api.v1.game.serializers import GameHistorySerializer, game_history_plan
+from src.commons import db_router
+from src.services.game import (
+    leaderboard, live, percentiles, ranks, reconcile, rooms, seasons, snapshots, standings, summaries,
+)
+from src.services.game.models import (
+    GameHistory, GameHistoryCompaction, LeaderboardSnapshot, PlayerDailySummary, Season, SeasonPoints,
+)
+from src.services.user import caches as user_caches, counters
+from src.services.user.cards import user_cards
+from src.services.user.models import User, UserProfile
+
+
+def make_games(player, count=12):
+    base = datetime.datetime(2025, 3, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc)
+    for i in range(count):
+        multiplayer = i % 3 == 0
+        GameHistory.objects.create(
+            match_id=f"{player.pk}-{i}",
+            player=player,
+            game_type="multiplayer" if multiplayer else "solo",
+            game_mode="timed" if i % 2 else "untimed",
+            operation="addition" if i % 2 else "subtraction",
+            grid_size=4 + i % 3,
+            timestamp=base - datetime.timedelta(minutes=i, microseconds=i),
+            status=["completed", "abandoned", "timed_out"][i % 3],
+            final_score=i * 7,
+            points_earned=i * 7,
+            accuracy_percentage=[0.0, 12.5, 99.99, 100.0, 33.333333333333336, 0.1][i % 6],
+            hints_used=i % 4,
+            completion_time=30 + i if i % 2 else None,
+            room_code="ROOM1" if multiplayer else None,
+            position=1 if multiplayer else None,
+            total_players=4 if multiplayer else None,
+        )
+
+
+class GameHistoryReadPlanTests(TestCase):
+    """The compiled read path must return exactly what GameHistorySerializer returns."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("plan", "plan@example.com", "pass")
+        make_games(cls.user)
+
+    def test_matches_serializer(self):
+        games = GameHistory.objects.filter(player=self.user).order_by("-timestamp")
+        rows = games.values(*game_history_plan.columns)
+        self.assertEqual(game_history_plan.many(rows), GameHistorySerializer(games, many=True).data)
+
+    def test_matches_serializer_in_other_timezone(self):
+        with timezone.override("Asia/Kolkata"):
+            self.test_matches_serializer()
+
+    def test_matches_serializer_without_timezone_support(self):
+        with override_settings(USE_TZ=False):
+            self.test_matches_serializer()
+
+    def test_list_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get("/api/v1/game/list/", {"page_size": 5, "page": 2}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        expected = GameHistory.objects.filter(player=self.user).order_by("-timestamp")[5:10]
+        self.assertEqual(response.json()["results"], GameHistorySerializer(expected, many=True).data)
+
+
+class UserCardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.plain = User.objects.create_user("plain", "plain@example.com", "pass")
+        cls.pictured = User.objects.create_user("pictured", "pictured@example.com", "pass")
+        make_games(cls.plain, 3)
+        make_games(cls.pictured, 5)
+        UserProfile.objects.filter(user=cls.pictured).update(avatar="avatars/a b/ünï.jpg")
+
+    def setUp(self):
+        user_caches.cards.invalidate_all()
+
+    def test_results_match_model_fields(self):
+        rows = list(leaderboard.leaderboard_queryset("all_time"))
+        results = leaderboard.build_results(rows, user_cards([row["player"] for row in rows]), offset=0)
+        self.assertEqual(len(results), 2)
+        for entry in results:
+            profile = UserProfile.objects.select_related("user").get(user_id=entry["user_id"])
+            self.assertEqual(entry["username"], profile.user.username)
+            self.assertEqual(entry["avatar"], profile.avatar.url if profile.avatar else None)
+        self.assertIsNotNone(results[0]["avatar"])
+
+    def test_warm_cards_need_no_user_queries(self):
+        user_cards([self.plain.pk, self.pictured.pk])
+        client = APIClient()
+        client.force_authenticate(self.plain)
+        leaderboard.pages.invalidate_all()
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get("/api/v1/game/leaderboard/", secure=True)
+        self.assertEqual([entry["username"] for entry in response.json()["results"]], ["pictured", "plain"])
+        # The count and the page of the aggregate, nothing else
+        self.assertEqual(len(captured), 2)
+        self.assertFalse([q for q in captured.captured_queries if "user_userprofile" in q["sql"]])
+
+    def test_invalidated_on_save(self):
+        self.assertEqual(user_cards([self.plain.pk])[self.plain.pk].username, "plain")
+        self.plain.username = "renamed"
+        self.plain.save()
+        profile = self.plain.profile
+        profile.avatar = "avatars/new.jpg"
+        profile.save()
+        card = user_cards([self.plain.pk])[self.plain.pk]
+        self.assertEqual((card.username, card.avatar), ("renamed", profile.avatar.url))
+
+    def test_missing_profiles_are_cached(self):
+        loner = User.objects.create(username="loner", email="loner@example.com")
+        UserProfile.objects.filter(user=loner).delete()
+        self.assertEqual(user_cards([loner.pk, self.plain.pk]).keys(), {self.plain.pk})
+        with self.assertNumQueries(0):
+            self.assertEqual(user_cards([loner.pk, self.plain.pk]).keys(), {self.plain.pk})
+
+
+class RoomResultsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.players = [User.objects.create_user(f"room{i}", f"room{i}@example.com", "pass") for i in range(3)]
+        base = timezone.now() - datetime.timedelta(minutes=5)
+        # An earlier match in the same room, then the current one with 2 of 3 results in
+        for i, player in enumerate(cls.players):
+            cls.room_game(player, "old", base - datetime.timedelta(hours=2), position=3 - i)
+        cls.room_game(cls.players[0], "new", base, position=2)
+        cls.room_game(cls.players[1], "new", base + datetime.timedelta(seconds=3), position=1)
+
+    @staticmethod
+    def room_game(player, match, timestamp, position, room_code="RMTEST"):
+        return GameHistory.objects.create(
+            match_id=f"{match}-{player.pk}",
+            player=player,
+            game_type="multiplayer",
+            game_mode="untimed",
+            operation="addition",
+            grid_size=4,
+            timestamp=timestamp,
+            status="completed",
+            final_score=100 * (4 - position),
+            accuracy_percentage=90.0,
+            room_code=room_code,
+            position=position,
+            total_players=3,
+        )
+
+    def setUp(self):
+        # Cached payloads outlive each test's rolled back rows
+        rooms.results.invalidate_all()
+        self.client = APIClient()
+        self.client.force_authenticate(self.players[0])
+
+    def get(self, room_code="RMTEST"):
+        return self.client.get(f"/api/v1/game/rooms/{room_code}/results/", secure=True)
+
+    def test_latest_match_standings(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data["total_players"], data["reported"], data["complete"]), (3, 2, False))
+        self.assertEqual(
+            [(r["match_id"], r["position"], r["username"]) for r in data["results"]],
+            [(f"new-{self.players[1].pk}", 1, "room1"), (f"new-{self.players[0].pk}", 2, "room0")],
+        )
+
+    def test_new_result_invalidates(self):
+        self.assertFalse(self.get().json()["complete"])
+        with self.assertNumQueries(0):
+            self.get()
+
+        self.room_game(self.players[2], "new", timezone.now(), position=3)
+        data = self.get().json()
+        self.assertTrue(data["complete"])
+        self.assertEqual([r["position"] for r in data["results"]], [1, 2, 3])
+
+    def test_unknown_room(self):
+        self.assertEqual(self.get("NOROOM").status_code, 404)
+
+
+class PercentileTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("ranked", "ranked@example.com", "pass")
+        players = [User.objects.create(username=f"pct{i}", email=f"pct{i}@example.com") for i in range(40)]
+        now = timezone.now()
+        games = []
+        for i, player in enumerate(players):
+            # Best of two games per player: 10 * i in the small grid, ~2500 * i in the big one
+            for j, (grid_size, score) in enumerate(((4, 10 * i), (4, 5 * i), (9, 2503 * i), (9, 7))):
+                games.append(GameHistory(
+                    match_id=f"pct-{player.pk}-{j}", player=player, game_type="solo",
+                    game_mode="untimed", operation="addition", grid_size=grid_size, timestamp=now,
+                    status="completed", final_score=score, points_earned=score, accuracy_percentage=50.0,
+                ))
+        GameHistory.objects.bulk_create(games)
+        percentiles.refresh(chunk_size=7)
+
+    def best_scores(self, grid_size):
+        return [
+            row["best"] for row in GameHistory.objects.filter(grid_size=grid_size).order_by()
+            .values("player").annotate(best=Max("final_score"))
+        ]
+
+    def test_exact_with_narrow_bins(self):
+        best = self.best_scores(4)
+        for score in (0, 1, 55, 60, 390, 391, 1000):
+            ranking = percentiles.percentile(4, "addition", "untimed", score)
+            expected = 100 * sum(b < score for b in best) / len(best)
+            self.assertEqual((ranking["percentile"], ranking["error"]), (round(expected, 2), 0))
+            self.assertEqual(ranking["players"], 40)
+
+    def test_error_is_bounded_with_wide_bins(self):
+        best = self.best_scores(9)
+        self.assertGreater(percentiles.bin_width_for(max(best)), 1)
+        for score in (0, 7, 8, 40000, 50050, 97617, 200000):
+            ranking = percentiles.percentile(9, "addition", "untimed", score)
+            expected = 100 * sum(b < score for b in best) / len(best)
+            self.assertLessEqual(abs(ranking["percentile"] - expected), ranking["error"] + 0.01)
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = "/api/v1/game/percentile/"
+        response = client.get(url, {"grid_size": 4, "operation": "addition", "game_mode": "untimed", "score": 200}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["percentile"], 50.0)
+        response = client.get(url, {"grid_size": 5, "operation": "addition", "game_mode": "untimed", "score": 1}, secure=True)
+        self.assertEqual(response.status_code, 404)
+        response = client.get(url, {"grid_size": 4, "operation": "division", "game_mode": "untimed"}, secure=True)
+        self.assertEqual(set(response.json()), {"operation", "score"})
+
+    def test_add_game_response(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post("/api/v1/game/add-game/", {
+            "match_id": "pct-new", "player_id": str(self.user.pk), "game_type": "solo",
+            "game_mode": "untimed", "operation": "addition", "grid_size": 4,
+            "timestamp": timezone.now().isoformat(), "status": "completed",
+            "final_score": 100, "accuracy_percentage": 80.0,
+        }, format="json", secure=True)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["percentile"], 25.0)
+
+
+class CompactionTests(TestCase):
+    """Leaderboard and stats must not change when old games are compacted and pruned."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.players = [User.objects.create(username=f"old{i}", email=f"old{i}@example.com") for i in range(4)]
+        now = timezone.now()
+        games = []
+        for i, player in enumerate(cls.players):
+            for day in range(0, 200, 7 + i):
+                games.append(GameHistory(
+                    match_id=f"old-{player.pk}-{day}", player=player,
+                    game_type="solo", game_mode=["timed", "untimed"][day % 2], operation="addition",
+                    grid_size=4 + day % 3, timestamp=now - datetime.timedelta(days=day, hours=i),
+                    status=["completed", "abandoned"][day % 5 == 0], final_score=day + i,
+                    points_earned=0 if day % 5 == 0 else day + i, accuracy_percentage=(day * 3.7) % 100,
+                ))
+        GameHistory.objects.bulk_create(games)
+
+    def snapshot(self):
+        return (
+            {period: list(leaderboard.leaderboard_queryset(period)) for period in leaderboard.PERIODS},
+            [summaries.player_stats(player) for player in self.players],
+        )
+
+    def test_results_unchanged(self):
+        before = self.snapshot()
+        compaction = summaries.compact()
+        self.assertGreater(compaction.games, 0)
+        self.assertEqual(PlayerDailySummary.objects.count(), compaction.summaries)
+        self.assertEqual(self.snapshot(), before)
+
+        # Nothing new to compact; pruning (with an archive) changes nothing either
+        self.assertIsNone(summaries.compact())
+        with tempfile.TemporaryDirectory() as archive_dir:
+            self.assertEqual(summaries.prune(chunk_size=7, archive_dir=archive_dir), compaction.games)
+            with gzip.open(os.path.join(archive_dir, os.listdir(archive_dir)[0]), "rt") as archive:
+                self.assertEqual(sum(1 for _ in archive), compaction.games)
+        self.assertFalse(GameHistory.objects.filter(timestamp__lt=compaction.compacted_before).exists())
+        self.assertEqual(self.snapshot(), before)
+
+    def test_late_game_is_folded(self):
+        summaries.compact()
+        player = self.players[0]
+        before = summaries.player_stats(player)
+        GameHistory.objects.create(
+            match_id="late", player=player, game_type="solo", game_mode="timed", operation="subtraction",
+            grid_size=4, timestamp=timezone.now() - datetime.timedelta(days=150), status="completed",
+            final_score=40, accuracy_percentage=50.0, completion_time=30,
+        )
+        after = summaries.player_stats(player)
+        self.assertEqual(after["games_played"], before["games_played"] + 1)
+        self.assertEqual(after["total_points"], before["total_points"] + 40)
+        self.assertEqual(after["breakdown"]["operation"]["subtraction"], 1)
+
+    def test_game_posted_during_compaction(self):
+        first = summaries.compact(before=timezone.now() - datetime.timedelta(days=180))
+        # The first run leaves an empty boundary at the epoch behind it
+        self.assertEqual(GameHistoryCompaction.objects.count(), 2)
+        player = self.players[0]
+
+        # A run that read the games before this one was committed moves the boundary
+        # past it while the game's transaction waits for the boundary lock
+        lock = summaries._lock_boundary
+
+        def compacted_meanwhile():
+            locked = lock()
+            GameHistoryCompaction.objects.create(compacted_before=summaries.horizon(), games=0, summaries=0)
+            return locked
+
+        timestamp = first.compacted_before + datetime.timedelta(days=20)
+        with mock.patch.object(summaries, "_lock_boundary", side_effect=compacted_meanwhile):
+            GameHistory.objects.create(
+                match_id="during", player=player, game_type="solo", game_mode="timed", operation="addition",
+                grid_size=4, timestamp=timestamp, status="completed", final_score=25, accuracy_percentage=50.0,
+            )
+        summary = PlayerDailySummary.objects.get(player=player, day=timezone.localdate(timestamp))
+        self.assertEqual((summary.games, summary.points), (1, 25))
+
+    def test_stats_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.players[1])
+        response = client.get("/api/v1/game/stats/", secure=True)
+        self.assertEqual(response.status_code, 200)
+        expected = GameHistory.objects.filter(player=self.players[1])
+        data = response.json()
+        self.assertEqual(data["games_played"], expected.count())
+        self.assertEqual(sum(data["breakdown"]["status"].values()), expected.count())
+        self.assertEqual(client.get("/api/v1/game/stats/", {"period": "ever"}, secure=True).status_code, 400)
+
+
+class SeasonTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.players = [User.objects.create(username=f"season{i}", email=f"season{i}@example.com") for i in range(3)]
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.clear_caches()
+        # Cached season ids outlive each test's rolled back rows
+        self.addCleanup(self.clear_caches)
+        self.client = APIClient()
+        self.client.force_authenticate(self.players[0])
+
+    @staticmethod
+    def clear_caches():
+        seasons.unfrozen.invalidate_all()
+        seasons.frozen.invalidate_all()
+        leaderboard.pages.invalidate_all()
+
+    def play(self, player, score, ago, status="completed"):
+        GameHistory.objects.create(
+            match_id=f"{player.pk}-{score}-{ago}", player=player, game_type="solo", game_mode="timed",
+            operation="addition", grid_size=4, timestamp=self.now - ago, status=status,
+            final_score=score, accuracy_percentage=90.0,
+        )
+
+    def leaderboard(self, **params):
+        return self.client.get("/api/v1/game/leaderboard/", {"period": "season", **params}, secure=True)
+
+    def standings(self, **params):
+        response = self.leaderboard(**params)
+        self.assertEqual(response.status_code, 200)
+        return [(r["username"], r["total_points"], r["games_played"]) for r in response.json()["results"]]
+
+    def test_points_per_season(self):
+        hour = datetime.timedelta(hours=1)
+        self.play(self.players[0], 500, 30 * hour)  # before any season
+        seasons.start(name="Spring", at=self.now - 24 * hour)
+        self.play(self.players[0], 10, 20 * hour)
+        self.play(self.players[0], 0, 19 * hour, status="abandoned")
+        self.play(self.players[1], 30, 18 * hour)
+        self.assertEqual(self.standings(), [("season1", 30, 1), ("season0", 10, 2)])
+
+        with CaptureQueriesContext(connection) as captured:
+            seasons.start(at=self.now - 2 * hour)
+        # Nothing per player: lock and close the open season, number and insert the next one
+        statements = [query["sql"].split()[0] for query in captured if "SAVEPOINT" not in query["sql"]]
+        self.assertEqual(statements, ["SELECT", "UPDATE", "SELECT", "INSERT"])
+        self.assertEqual(self.standings(), [])
+
+        self.play(self.players[2], 40, hour)
+        self.play(self.players[1], 50, 3 * hour)  # posted late, played in season 1
+        self.assertEqual(self.standings(), [("season2", 40, 1)])
+        self.assertEqual(
+            set(SeasonPoints.objects.values_list("season__number", "player__username", "points")),
+            {(1, "season0", 10), (1, "season1", 80), (2, "season2", 40)},
+        )
+
+        stats = self.client.get("/api/v1/game/stats/", {"period": "season"}, secure=True)
+        self.assertEqual(stats.status_code, 200)
+
+    def test_rollover_in_another_worker(self):
+        hour = datetime.timedelta(hours=1)
+        seasons.start(at=self.now - 24 * hour)
+        self.play(self.players[0], 10, 2 * hour)
+        # Only the worker that starts a season drops its cached list
+        with mock.patch.object(seasons.unfrozen, "invalidate_all"):
+            seasons.start(at=self.now - hour)
+        self.play(self.players[0], 20, datetime.timedelta(minutes=1))
+        self.assertEqual(
+            set(SeasonPoints.objects.values_list("season__number", "points")), {(1, 10), (2, 20)},
+        )
+
+    def test_freeze(self):
+        hour = datetime.timedelta(hours=1)
+        seasons.start(at=self.now - 48 * hour)
+        for i, player in enumerate(self.players):
+            self.play(player, 10 * (i + 1), 30 * hour)
+        seasons.start(at=self.now - 24 * hour)
+        self.play(self.players[0], 99, hour)
+
+        self.assertEqual(self.leaderboard(season=1).status_code, 404)
+        self.assertEqual([season.number for season in seasons.freeze_due()], [1])
+        self.assertFalse(SeasonPoints.objects.filter(season__number=1).exists())
+        self.assertEqual(Season.objects.get(number=1).players, 3)
+
+        self.assertEqual(self.standings(season=1), [("season2", 30, 1), ("season1", 20, 1), ("season0", 10, 1)])
+        response = self.leaderboard(season=1, page=2, page_size=2)
+        self.assertEqual(response.json()["count"], 3)
+        self.assertEqual([(r["rank"], r["username"]) for r in response.json()["results"]], [(3, "season0")])
+        with self.assertNumQueries(0):
+            self.leaderboard(season=1, page=2, page_size=2)
+
+        # A late game of a frozen season no longer counts anywhere
+        self.play(self.players[1], 70, 30 * hour)
+        self.assertEqual(self.standings(season=1)[0], ("season2", 30, 1))
+        self.assertEqual(self.standings(), [("season0", 99, 1)])
+
+        self.assertEqual(self.leaderboard(season=2).status_code, 404)
+        self.assertEqual(self.leaderboard(season="first").status_code, 400)
+
+
+class LeaderboardSnapshotTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.players = [User.objects.create(username=f"snap{i}", email=f"snap{i}@example.com") for i in range(3)]
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.yesterday = self.today - datetime.timedelta(days=1)
+        self.clear_caches()
+        self.addCleanup(self.clear_caches)
+        self.client = APIClient()
+        self.client.force_authenticate(self.players[0])
+
+    @staticmethod
+    def clear_caches():
+        snapshots.frozen.invalidate_all()
+        leaderboard.pages.invalidate_all()
+
+    def play(self, player, score, day, hour=12):
+        start, _ = snapshots.bounds(snapshots.DAY, day)
+        GameHistory.objects.create(
+            match_id=f"{player.pk}-{score}-{day}-{hour}", player=player, game_type="solo", game_mode="timed",
+            operation="addition", grid_size=4, timestamp=start + datetime.timedelta(hours=hour),
+            status="completed", final_score=score, accuracy_percentage=90.0,
+        )
+
+    def leaderboard(self, period="today", **params):
+        return self.client.get("/api/v1/game/leaderboard/", {"period": period, **params}, secure=True)
+
+    def test_snapshot_matches_range(self):
+        for i, player in enumerate(self.players):
+            self.play(player, 10 * (i + 1), self.yesterday)
+        self.play(self.players[0], 5, self.yesterday, hour=23)
+        self.play(self.players[0], 99, self.today, hour=0)
+        start, end = snapshots.bounds(snapshots.DAY, self.yesterday)
+        live = [tuple(row.values()) for row in leaderboard.range_queryset(start, end)]
+
+        snap = snapshots.snapshot(snapshots.DAY, self.yesterday)
+        self.assertEqual(snap.players, 3)
+        self.assertEqual(live, [(self.players[2].pk, 30, 1), (self.players[1].pk, 20, 1), (self.players[0].pk, 15, 2)])
+
+        response = self.leaderboard(period_start=self.yesterday.isoformat(), page=2, page_size=2)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data["period_start"], data["count"]), (self.yesterday.isoformat(), 3))
+        self.assertEqual([(r["rank"], r["username"], r["total_points"]) for r in data["results"]], [(3, "snap0", 15)])
+        with self.assertNumQueries(0):
+            self.leaderboard(period_start=self.yesterday.isoformat(), page=2, page_size=2)
+
+        # Written once: a late game no longer changes it
+        self.play(self.players[0], 50, self.yesterday)
+        self.assertEqual(snapshots.snapshot(snapshots.DAY, self.yesterday).players, 3)
+        self.assertEqual(self.leaderboard(period_start=self.yesterday.isoformat()).json()["results"][0]["username"], "snap2")
+
+    def test_snapshot_due(self):
+        now = snapshots.bounds(snapshots.DAY, self.today)[0] + datetime.timedelta(hours=2)
+        week = snapshots.align(snapshots.WEEK, self.today) - datetime.timedelta(days=7)
+        month = snapshots.align(snapshots.MONTH, self.today.replace(day=1) - datetime.timedelta(days=1))
+        self.assertEqual(
+            {(snap.period, snap.period_start) for snap in snapshots.snapshot_due(now=now)},
+            {(snapshots.DAY, self.yesterday), (snapshots.WEEK, week), (snapshots.MONTH, month)},
+        )
+        self.assertEqual(snapshots.snapshot_due(now=now), [])
+
+        # Not yet SNAPSHOT_DELAY after the end of today
+        tomorrow = now + datetime.timedelta(days=1)
+        self.assertEqual(snapshots.snapshot_due(now=tomorrow - datetime.timedelta(hours=2)), [])
+        self.assertEqual([snap.period_start for snap in snapshots.snapshot_due(now=tomorrow)], [self.today])
+
+        LeaderboardSnapshot.objects.all().delete()
+        since = self.today - datetime.timedelta(days=3)
+        days = [snap.period_start for snap in snapshots.snapshot_due(since=since, now=now) if snap.period == snapshots.DAY]
+        self.assertEqual(days, [since + datetime.timedelta(days=i) for i in range(3)])
+
+    def test_params(self):
+        self.play(self.players[1], 40, self.today, hour=0)
+        monday = snapshots.align(snapshots.WEEK, self.today)
+        self.assertEqual(self.leaderboard("this_week", period_start=(monday - datetime.timedelta(days=1)).isoformat()).status_code, 400)
+        self.assertEqual(self.leaderboard("this_month", period_start=self.today.replace(day=2).isoformat()).status_code, 400)
+        self.assertEqual(self.leaderboard("all_time", period_start=self.today.isoformat()).status_code, 400)
+        self.assertEqual(self.leaderboard(period_start="yesterday").status_code, 400)
+        self.assertEqual(self.leaderboard("this_week", period_start=(monday - datetime.timedelta(days=7)).isoformat()).status_code, 404)
+
+        # The current period is the live leaderboard
+        data = self.leaderboard(period_start=self.today.isoformat()).json()
+        self.assertNotIn("period_start", data)
+        self.assertEqual([r["username"] for r in data["results"]], ["snap1"])
+
+
+    @override_settings(TIME_ZONE="Pacific/Auckland")
+    def test_live_periods_in_local_time(self):
+        # Monday 10:00 in Auckland is still Sunday in UTC
+        monday = datetime.date(2025, 3, 3)
+        now = snapshots.bounds(snapshots.DAY, monday)[0] + datetime.timedelta(hours=10)
+        self.assertEqual(now.astimezone(datetime.timezone.utc).weekday(), 6)
+        self.play(self.players[0], 10, monday, hour=8)
+        self.play(self.players[1], 20, monday - datetime.timedelta(days=1), hour=23)
+        self.play(self.players[2], 30, monday - datetime.timedelta(days=3), hour=23)
+
+        with mock.patch("django.utils.timezone.now", return_value=now):
+            for period, kind, first_day, players in (
+                ("today", snapshots.DAY, monday, ["snap0"]),
+                ("this_week", snapshots.WEEK, monday, ["snap0"]),
+                ("this_month", snapshots.MONTH, monday.replace(day=1), ["snap1", "snap0"]),
+            ):
+                # The same window as the period's snapshot, which starts today
+                self.assertEqual(leaderboard.period_start(period), snapshots.bounds(kind, first_day)[0])
+                self.assertIsNone(snapshots.requested(period, {"period_start": first_day.isoformat()}))
+                ranked = [row["player"] for row in leaderboard.leaderboard_queryset(period)]
+                self.assertEqual(ranked, [User.objects.get(username=name).pk for name in players])
+
+
+class RankSnapshotTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.players = [User.objects.create(username=f"rank{i}", email=f"rank{i}@example.com") for i in range(4)]
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.clear_caches()
+        # Snapshots live in the process, outliving each test's rolled back rows
+        self.addCleanup(self.clear_caches)
+        self.client = APIClient()
+        self.client.force_authenticate(self.players[0])
+        # Record the background rebuilds instead: their thread could not see the test's rows
+        self.rebuilds = []
+        patcher = mock.patch.object(ranks, "_start_rebuild", side_effect=self.start_rebuild)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def start_rebuild(self, period, lock):
+        self.rebuilds.append(period)
+        lock.release()
+
+    @staticmethod
+    def clear_caches():
+        ranks.clear()
+        leaderboard.pages.invalidate_all()
+
+    def play(self, player, score, ago=datetime.timedelta(minutes=1)):
+        GameHistory.objects.create(
+            match_id=f"{player.pk}-{score}-{ago}", player=player, game_type="solo", game_mode="timed",
+            operation="addition", grid_size=4, timestamp=self.now - ago, status="completed",
+            final_score=score, accuracy_percentage=90.0,
+        )
+
+    def test_lookups(self):
+        ranked = ranks.Ranks(standings.collect([(7, 50, 1), (9, 50, 3), (3, 20, 2), (5, 0, 1)]))
+        self.assertEqual(ranked.rank(9), {"rank": 2, "points": 50, "games_played": 3, "players": 4, "percentile": 50.0})
+        self.assertEqual(ranked.rank(5)["percentile"], 0.0)
+        self.assertIsNone(ranked.rank(4))
+        self.assertIsNone(ranked.rank(10))
+        self.assertEqual(ranked.percentile(21), 50.0)
+        self.assertEqual(ranked.percentile(99), 100.0)
+        self.assertEqual([row["player"] for row in ranked.top(3)], [7, 9, 3])
+        self.assertEqual(ranked.page(3, 2), [{"player": 5, "period_points": 0, "games_played": 1}])
+        self.assertEqual(ranked.nbytes, 4 * 40)
+        self.assertIsNone(ranks.Ranks(standings.collect([])).percentile(10))
+
+    def test_matches_database(self):
+        for i, player in enumerate(self.players[:3]):
+            self.play(player, 10 * (i + 1))
+        self.play(self.players[0], 20, ago=datetime.timedelta(days=40))
+        self.play(self.players[1], 10, ago=datetime.timedelta(days=40))
+
+        for period in ("today", "all_time"):
+            expected = {player.pk: ranks.player_rank(period, player.pk) for player in self.players}
+            with override_settings(LEADERBOARD_RANKS_MAX_AGE=60):
+                ranks.refresh(period)
+                self.assertEqual({player.pk: ranks.player_rank(period, player.pk) for player in self.players}, expected)
+                self.assertEqual(
+                    ranks.current(period).page(0, 10),
+                    list(leaderboard.leaderboard_queryset(period).values("player", "period_points", "games_played")),
+                )
+        self.assertEqual(expected[self.players[0].pk]["rank"], 1)  # ties broken by player id
+        self.assertIsNone(expected[self.players[3].pk])
+        self.assertEqual(set(ranks.footprint()), {"today", "all_time"})
+
+    @override_settings(LEADERBOARD_RANKS_MAX_AGE=60)
+    def test_leaderboard_from_snapshot(self):
+        self.play(self.players[1], 30)
+        self.play(self.players[2], 10)
+
+        def page():
+            response = self.client.get("/api/v1/game/leaderboard/", {"period": "today"}, secure=True)
+            return response.json()["count"], [r["username"] for r in response.json()["results"]]
+
+        self.assertEqual(page(), (2, ["rank1", "rank2"]))
+        self.assertEqual(self.rebuilds, ["today"])
+        snapshot = ranks.refresh("today")
+        # Within LEADERBOARD_RANKS_MAX_AGE new games don't show yet
+        self.play(self.players[3], 50)
+        self.assertEqual(page(), (2, ["rank1", "rank2"]))
+        me = self.client.get("/api/v1/game/leaderboard/me/", {"period": "today"}, secure=True)
+        self.assertEqual(me.status_code, 404)
+
+        # A rebuild swaps in a new snapshot; the old one stays usable
+        self.assertIsNot(ranks.refresh("today"), snapshot)
+        self.assertEqual(len(snapshot), 2)
+        self.assertEqual(page(), (3, ["rank3", "rank1", "rank2"]))
+
+        self.client.force_authenticate(self.players[1])
+        me = self.client.get("/api/v1/game/leaderboard/me/", {"period": "today"}, secure=True).json()
+        self.assertEqual((me["rank"], me["points"], me["players"], me["percentile"]), (2, 30, 3, 33.33))
+
+    @override_settings(LEADERBOARD_RANKS_MAX_AGE=60)
+    def test_rebuilds_off_the_request(self):
+        self.play(self.players[1], 30)
+        # Cold: the database answers while the first snapshot is built
+        self.assertIsNone(ranks.current("today"))
+        self.assertEqual(ranks.player_rank("today", self.players[1].pk)["rank"], 1)
+        self.assertEqual(self.rebuilds, ["today", "today"])
+
+        snapshot = ranks.refresh("today")
+        self.assertIs(ranks.current("today"), snapshot)
+        # Stale: served as is, one rebuild at a time
+        self.rebuilds.clear()
+        lock = ranks._locks["today"]
+        with mock.patch.object(ranks, "_start_rebuild"), mock.patch("time.monotonic", return_value=snapshot.built_at + 61):
+            self.assertIs(ranks.current("today"), snapshot)
+            self.assertTrue(lock.locked())
+            self.assertIs(ranks.current("today"), snapshot)
+        lock.release()
+        # From before midnight: not served at all
+        with mock.patch("django.utils.timezone.now", return_value=self.now + datetime.timedelta(days=1)):
+            self.assertIsNone(ranks.current("today"))
+        self.assertEqual(self.rebuilds, ["today"])
+
+    @override_settings(LEADERBOARD_RANKS_MAX_AGE=60)
+    def test_failed_rebuild_releases_the_lock(self):
+        lock = ranks._locks["all_time"]
+        lock.acquire()
+        with (
+            mock.patch.object(ranks, "refresh", side_effect=DatabaseError),
+            mock.patch.object(ranks, "connection") as thread_connection,
+            self.assertLogs("src.services.game.ranks", "ERROR"),
+        ):
+            ranks._rebuild("all_time", lock)
+        self.assertFalse(lock.locked())
+        thread_connection.close.assert_called_once_with()
+        self.assertIsNone(ranks.current("all_time"))
+
+
+class ReconcileTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.players = [User.objects.create(username=f"recount{i}", email=f"recount{i}@example.com") for i in range(3)]
+
+    def game(self, player, score, days=0, status="completed"):
+        return GameHistory(
+            match_id=f"{player.pk}-{score}-{days}", player=player, game_type="solo", game_mode="timed",
+            operation="addition", grid_size=4, timestamp=timezone.now() - datetime.timedelta(days=days),
+            status=status, final_score=score, points_earned=score if status == "completed" else 0,
+            accuracy_percentage=90.0,
+        )
+
+    def points(self):
+        return dict(UserProfile.objects.filter(user__in=self.players).values_list("user__username", "total_game_points"))
+
+    def test_repairs_drift(self):
+        a, b, c = self.players
+        self.game(a, 10).save()  # awarded by the signal
+        GameHistory.objects.bulk_create([self.game(a, 20, days=200), self.game(b, 30), self.game(b, 5, status="abandoned")])
+        summaries.compact()
+        self.game(c, 40).save()
+        GameHistory.objects.filter(player=c).delete()
+        self.assertEqual(self.points(), {"recount0": 10, "recount1": 0, "recount2": 40})
+
+        drifted = reconcile.reconcile(chunk_size=2, dry_run=True)
+        self.assertEqual(drifted, [(a.pk, 10, 30), (b.pk, 0, 30), (c.pk, 40, 0)])
+        self.assertEqual(self.points()["recount0"], 10)
+
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(reconcile.reconcile(chunk_size=2), drifted)
+        # Per range: SELECT of the drifted rows, one UPDATE of them
+        statements = [query["sql"].split()[0] for query in captured if "SAVEPOINT" not in query["sql"]]
+        self.assertEqual(statements.count("UPDATE"), 2)
+        self.assertEqual(self.points(), {"recount0": 30, "recount1": 30, "recount2": 0})
+        self.assertEqual(reconcile.reconcile(), [])
+
+    @override_settings(COUNTER_SHARDS=4)
+    def test_counts_unfolded_shards(self):
+        player = self.players[0]
+        self.game(player, 25).save()  # lands in a shard
+        self.assertEqual(reconcile.reconcile(), [])
+
+        GameHistory.objects.bulk_create([self.game(player, 5, days=1)])
+        self.assertEqual(reconcile.reconcile(), [(player.pk, 25, 30)])
+        counters.fold()
+        self.assertEqual(self.points()["recount0"], 30)
+
+    @override_settings(COUNTER_SHARDS=4)
+    def test_set_based_totals(self):
+        # PostgreSQL's UPDATE ... FROM joins the same totals; SQLite can run
+        # their SELECT (minus FOR UPDATE) but not that UPDATE's RETURNING
+        a, b, c = self.players
+        self.game(a, 10).save()  # lands in a shard
+        GameHistory.objects.bulk_create([self.game(a, 20, days=200), self.game(b, 30)])
+        summaries.compact()
+        self.game(c, 40).save()
+        GameHistory.objects.filter(player=c).delete()
+
+        expected = reconcile.reconcile(chunk_size=2, dry_run=True)
+        self.assertEqual(expected, [(a.pk, 10, 30), (b.pk, 0, 30), (c.pk, 40, 0)])
+        with mock.patch.object(connection, "vendor", "postgresql"):
+            self.assertEqual(reconcile.reconcile(chunk_size=2, dry_run=True), expected)
+            self.assertEqual(reconcile.reconcile_range(c.pk + 1, c.pk + 10, dry_run=True), [])
+
+
+def page_payload(*points, count=None):
+    results = [{"rank": rank, "player": 100 + rank, "points": p} for rank, p in enumerate(points, start=1)]
+    return {"count": len(points) if count is None else count, "results": results}
+
+
+class LiveDiffTests(SimpleTestCase):
+
+    def test_equal_pages(self):
+        self.assertIsNone(live.diff_page(page_payload(30, 20, 10), page_payload(30, 20, 10)))
+
+    def test_changed_rows(self):
+        new = page_payload(30, 25, 10)
+        self.assertEqual(
+            live.diff_page(page_payload(30, 20, 10), new),
+            {"count": 3, "changed": [new["results"][1]], "removed_ranks": []},
+        )
+        # Rows past the end of the old page are new
+        self.assertEqual(
+            live.diff_page(page_payload(30), new),
+            {"count": 3, "changed": new["results"][1:], "removed_ranks": []},
+        )
+
+    def test_removed_ranks(self):
+        self.assertEqual(
+            live.diff_page(page_payload(30, 20, 10), page_payload(30)),
+            {"count": 1, "changed": [], "removed_ranks": [2, 3]},
+        )
+
+    def test_count_change(self):
+        # A player joined on a later page: this page looks the same
+        self.assertEqual(
+            live.diff_page(page_payload(30, 20, count=40), page_payload(30, 20, count=41)),
+            {"count": 41, "changed": [], "removed_ranks": []},
+        )
+
+
+class LiveSubscriberTests(SimpleTestCase):
+
+    def test_slow_subscriber_is_reset_to_snapshot(self):
+        async def scenario():
+            subscriber = live.Subscriber()
+            for i in range(live.QUEUE_SIZE):
+                subscriber.push(f"diff {i}", "snapshot 0")
+            self.assertEqual(subscriber.queue.qsize(), live.QUEUE_SIZE)
+            subscriber.push("diff overflow", "snapshot 1")
+            queued = [subscriber.queue.get_nowait() for _ in range(subscriber.queue.qsize())]
+            self.assertEqual(queued, ["snapshot 1"])
+            subscriber.push("diff next", "snapshot 2")
+            self.assertEqual(subscriber.queue.get_nowait(), "diff next")
+
+        async_to_sync(scenario)()
+
+
+@override_settings(LEADERBOARD_STREAM_INTERVAL=0.01)
+class LiveTopicTests(TestCase):
+
+    def test_stops_after_last_subscriber(self):
+        computed = []
+
+        async def compute():
+            computed.append(1)
+            return page_payload(30, 20)
+
+        async def scenario():
+            broadcaster = live.Broadcaster()
+            first, second = broadcaster.stream("key", compute), broadcaster.stream("key", compute)
+            snapshot = await anext(first)
+            self.assertTrue(snapshot.startswith(b"id: 0\nevent: snapshot\n"))
+            self.assertEqual(await anext(second), snapshot)
+            topic = broadcaster.topics["key"]
+            self.assertEqual((len(broadcaster.topics), broadcaster.subscriber_count()), (1, 2))
+
+            await first.aclose()
+            await asyncio.sleep(0.05)
+            self.assertFalse(topic.task.done())
+            self.assertEqual(broadcaster.subscriber_count(), 1)
+
+            await second.aclose()
+            await asyncio.wait_for(topic.task, 1)
+            self.assertEqual(broadcaster.topics, {})
+            # The pages cache generation didn't move: computed once for both subscribers
+            self.assertEqual(len(computed), 1)
+
+        async_to_sync(scenario)()
+
+    def test_topic_reads_replica(self):
+        # The topic computes in its own task, outside any request's @replica_reads
+        async def leaderboard_page(period, page, page_size):
+            return {"count": 0, "results": [], "replica": db_router._replica_allowed.get()}
+
+        async def scenario():
+            compute = partial(async_views.live_leaderboard_page, "all_time", 1, 20)
+            events = live.Broadcaster().stream(("all_time", 1, 20), compute)
+            try:
+                return await anext(events)
+            finally:
+                await events.aclose()
+
+        with mock.patch.object(async_views, "leaderboard_page", leaderboard_page):
+            self.assertIn(b'"replica":true', async_to_sync(scenario)())
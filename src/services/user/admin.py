@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, UserProfile, UserWallet, PendingReferral
+from .models import User, UserProfile, UserWallet, PendingReferral, AccountDeletionRequest
 
 class UserAdmin(admin.ModelAdmin):
     list_display = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser', 'created_at', 'updated_at')
@@ -14,19 +14,38 @@ class UserProfileAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'user__email', 'location')
     list_filter = ('birth_date',)
     ordering = ('user',)
+    list_select_related = ('user',)
 
 class UserWalletAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'total_coins', 'available_coins', 'used_coins')
     search_fields = ('user__username', 'user__email')
     list_filter = ('total_coins', 'used_coins')
     ordering = ('user',)
+    list_select_related = ('user',)
 
     def get_readonly_fields(self, request, obj=None):
         if obj:  # In edit mode
             return 'user', 'created_at', 'updated_at'
         return 'created_at', 'updated_at'
 
+class PendingReferralAdmin(admin.ModelAdmin):
+    list_display = ('id', 'referral_code', 'referrer_profile', 'ip_address', 'clicked_at', 'redeemed_at', 'redeemed_by')
+    list_filter = ('redeemed_at',)
+    search_fields = ('referral_code', 'ip_address')
+    ordering = ('-clicked_at',)
+    # referrer_profile renders as "Profile of <user>"
+    list_select_related = ('referrer_profile__user', 'redeemed_by')
+    raw_id_fields = ('referrer_profile', 'redeemed_by')
+
+class AccountDeletionRequestAdmin(admin.ModelAdmin):
+    list_display = ('id', 'account_id', 'status', 'stage', 'rows_processed', 'attempts', 'requested_at', 'due_at', 'completed_at')
+    list_filter = ('status', 'stage')
+    search_fields = ('account_id',)
+    ordering = ('-requested_at',)
+    readonly_fields = ('user', 'account_id', 'stage', 'rows_processed', 'attempts', 'last_error', 'requested_at', 'started_at', 'completed_at')
+
 admin.site.register(User, UserAdmin)
 admin.site.register(UserProfile, UserProfileAdmin)
 admin.site.register(UserWallet, UserWalletAdmin)
-admin.site.register(PendingReferral)
+admin.site.register(PendingReferral, PendingReferralAdmin)
+admin.site.register(AccountDeletionRequest, AccountDeletionRequestAdmin)
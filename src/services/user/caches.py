@@ -0,0 +1,42 @@
+"""
+Cached user reads (TieredCache, src/commons/cache.py).
+
+Model saves invalidate through src/services/user/signals.py; code that writes
+with queryset.update() calls `invalidate_user()` itself.
+"""
+from src.commons.cache import TieredCache
+
+# values() row behind GET /v1/user/profile/, keyed by user id
+profile_rows = TieredCache("user_profile", timeout=300)
+# UserWalletSerializer data, keyed by user id
+wallets = TieredCache("user_wallet", timeout=300)
+# Referral code -> owner; codes never change, so a short L1 is safe
+referral_codes = TieredCache("referral_code", timeout=600, l1_timeout=60)
+# UserCard (src/services/user/cards.py) keyed by user id; a card is ~100 bytes,
+# so L1 holds every active player of a process
+cards = TieredCache("user_card", timeout=3600, l1_timeout=60, l1_size=20000)
+
+
+def invalidate_user(user_id):
+    profile_rows.invalidate(user_id)
+    wallets.invalidate(user_id)
+    cards.invalidate(user_id)
+
+
+def referral_code_owner(code):
+    """{"profile_id", "user_id", "username"} of the profile owning `code`, or None."""
+    from src.services.user.models import UserProfile
+
+    code = code.strip().upper()
+    if not code:
+        return None
+
+    def lookup():
+        row = (
+            UserProfile.objects.filter(referral_code=code)
+            .values("id", "user_id", "user__username")
+            .first()
+        )
+        return row and {"profile_id": row["id"], "user_id": row["user_id"], "username": row["user__username"]}
+
+    return referral_codes.get_or_set(code, lookup)
@@ -0,0 +1,46 @@
+"""
+User cards: the (id, username, avatar URL) shown next to a player on shared
+surfaces – leaderboards, room standings – without joining User and
+UserProfile on every page.
+
+Cards are plain tuples, cached per user id in `caches.cards` (per-process
+LRU in front of the shared cache) and fetched in bulk: one cache round trip
+per list of ids, one query for the misses. User and UserProfile saves
+invalidate them (src/services/user/signals.py). `avatar` is the storage URL
+without host, as the API serializers render it without a request.
+"""
+from collections import namedtuple
+
+from src.services.user.caches import cards
+from src.services.user.models import UserProfile
+
+UserCard = namedtuple("UserCard", ["id", "username", "avatar"])
+
+
+def _rows(user_ids):
+    return UserProfile.objects.filter(user_id__in=user_ids).values_list("user_id", "user__username", "avatar")
+
+
+def _cards(rows):
+    storage = UserProfile._meta.get_field("avatar").storage
+    return {
+        user_id: UserCard(user_id, username, storage.url(avatar) if avatar else None)
+        for user_id, username, avatar in rows
+    }
+
+
+def _present(found):
+    # Users without a profile are cached as None
+    return {user_id: card for user_id, card in found.items() if card is not None}
+
+
+def user_cards(user_ids):
+    """{user id: UserCard} for `user_ids`; users without a profile are left out."""
+    return _present(cards.get_many_or_set(user_ids, lambda missing: _cards(_rows(missing))))
+
+
+async def auser_cards(user_ids):
+    async def load(missing):
+        return _cards([row async for row in _rows(missing)])
+
+    return _present(await cards.aget_many_or_set(user_ids, load))
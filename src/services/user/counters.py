@@ -0,0 +1,103 @@
+"""
+Sharded per-user counters: UserWallet.total_coins and UserProfile.total_game_points.
+
+Every increment of a counter is an UPDATE of one row, so during a promotion
+(a popular referral code, a burst of games from several devices) they all
+queue on that row's lock. With COUNTER_SHARDS = N (> 1), `increment()` adds
+to one of N CounterShard rows of the counter instead, picked at random, so
+up to N increments proceed at once. The counter's value is the main column
+plus its shards: `pending()` / `total_expression()` add them on read, and
+`fold()` (`manage.py fold_counter_shards`) periodically moves them back into
+the main column so the shards stay few and small.
+
+Reads only look at shards while COUNTER_SHARDS is set – fold once more after
+unsetting it. Decrements (spending) stay on the main row and check against
+main + shards; increments only ever grow the shards, so a concurrent one can
+make that check stricter, never looser.
+"""
+import random
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from src.services.user.caches import invalidate_user
+from src.services.user.models import CounterShard, UserProfile, UserWallet
+
+COINS = CounterShard.Counter.COINS
+GAME_POINTS = CounterShard.Counter.GAME_POINTS
+
+# counter -> (model with a `user` one-to-one, counted column)
+COUNTERS = {
+    COINS: (UserWallet, "total_coins"),
+    GAME_POINTS: (UserProfile, "total_game_points"),
+}
+
+
+def sharded():
+    return settings.COUNTER_SHARDS > 1
+
+
+def increment(counter, user_id, amount):
+    """Add `amount` to the user's counter. Returns the number of rows updated (0: no such row)."""
+    model, field = COUNTERS[counter]
+    if not sharded():
+        return model.objects.filter(user_id=user_id).update(**{field: F(field) + amount})
+
+    shard = random.randrange(settings.COUNTER_SHARDS)
+    rows = CounterShard.objects.filter(user_id=user_id, counter=counter, shard=shard)
+    if rows.update(value=F("value") + amount):
+        return 1
+    if not model.objects.filter(user_id=user_id).exists():
+        return 0
+    try:
+        with transaction.atomic():
+            CounterShard.objects.create(user_id=user_id, counter=counter, shard=shard, value=amount)
+    except IntegrityError:
+        # Another increment created the shard first
+        rows.update(value=F("value") + amount)
+    return 1
+
+
+def pending(counter, user_id):
+    """Sum of the counter's shards not folded into the main column yet."""
+    if not sharded():
+        return 0
+    return CounterShard.objects.filter(user_id=user_id, counter=counter).aggregate(
+        total=Coalesce(Sum("value"), 0)
+    )["total"]
+
+
+def total_expression(counter, user_ref=OuterRef("user_id")):
+    """The counter's value (main column + shards) as an expression on its model's queryset."""
+    _, field = COUNTERS[counter]
+    if not sharded():
+        return F(field)
+    shards = (
+        CounterShard.objects.filter(user_id=user_ref, counter=counter)
+        .order_by().values("user_id").annotate(total=Sum("value")).values("total")
+    )
+    return F(field) + Coalesce(Subquery(shards), 0)
+
+
+def fold():
+    """Move every counter's shards into its main column. Returns the number of counters folded."""
+    folded = 0
+    owners = CounterShard.objects.order_by("user_id", "counter").values_list("user_id", "counter").distinct()
+    for user_id, counter in owners.iterator():
+        model, field = COUNTERS[counter]
+        with transaction.atomic():
+            # Increments to these rows wait, then find them gone and create new ones
+            shards = list(
+                CounterShard.objects.select_for_update()
+                .filter(user_id=user_id, counter=counter)
+                .values_list("pk", "value")
+            )
+            if not shards:
+                continue
+            model.objects.filter(user_id=user_id).update(**{field: F(field) + sum(value for _, value in shards)})
+            CounterShard.objects.filter(pk__in=[pk for pk, _ in shards]).delete()
+        invalidate_user(user_id)
+        folded += 1
+    return folded
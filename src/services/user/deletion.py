@@ -0,0 +1,195 @@
+"""
+Chunked account deletion.
+
+Deleting a heavy player in one `user.delete()` cascades through every
+GameHistory row inside a single transaction. Instead, the account is
+deactivated right away and the data is removed here, stage by stage, in
+bounded chunks – each chunk in its own short transaction.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from src.services.game.leaderboard import pages as leaderboard_pages
+from src.services.game.rooms import results as room_results
+from src.services.user.caches import profile_rows
+from src.services.user.models import AccountDeletionRequest, PendingReferral, ReferralClosure, User, UserProfile
+
+logger = logging.getLogger(__name__)
+
+# Requirement doc: "Deletion requests should be processed within 30 days."
+DELETION_GRACE_DAYS = 30
+MAX_ATTEMPTS = 5
+
+
+def schedule_account_deletion(user):
+    """
+    Queue `user` for deletion and return the request.
+    An account that already has an open request gets that request back.
+    """
+    open_request = AccountDeletionRequest.objects.filter(
+        account_id=user.id,
+        status__in=[AccountDeletionRequest.Status.PENDING, AccountDeletionRequest.Status.PROCESSING],
+    ).first()
+    if open_request:
+        return open_request
+
+    return AccountDeletionRequest.objects.create(
+        user=user,
+        account_id=user.id,
+        due_at=timezone.now() + timedelta(days=DELETION_GRACE_DAYS),
+    )
+
+
+def _game_history(account_id):
+    from src.services.game.models import GameHistory
+    return GameHistory.objects.filter(player_id=account_id), "delete", {}
+
+
+def _daily_summaries(account_id):
+    from src.services.game.models import PlayerDailySummary
+    return PlayerDailySummary.objects.filter(player_id=account_id), "delete", {}
+
+
+def _season_points(account_id):
+    from src.services.game.models import SeasonPoints
+    return SeasonPoints.objects.filter(player_id=account_id), "delete", {}
+
+
+def _referral_paths(account_id):
+    # Upline-to-downline pairs that only exist through the deleted profile; they
+    # must go before its own rows, which are what finds them
+    profile = UserProfile.objects.filter(user_id=account_id).values("pk")
+    return ReferralClosure.objects.filter(
+        ancestor_id__in=ReferralClosure.objects.filter(descendant_id__in=profile).values("ancestor_id"),
+        descendant_id__in=ReferralClosure.objects.filter(ancestor_id__in=profile).values("descendant_id"),
+    ), "delete", {}
+
+
+def _referral_links(account_id):
+    return ReferralClosure.objects.filter(
+        Q(ancestor__user_id=account_id) | Q(descendant__user_id=account_id)
+    ), "delete", {}
+
+
+def _referred_profiles(account_id):
+    # Keep the referred users – only drop the link to the deleted account
+    return UserProfile.objects.filter(referred_by__user_id=account_id), "update", {"referred_by": None}
+
+
+def _redeemed_referrals(account_id):
+    # Clicks redeemed by this account belong to the referrer – anonymize them
+    return PendingReferral.objects.filter(redeemed_by_id=account_id), "update", {"redeemed_by": None}
+
+
+def _pending_referrals(account_id):
+    return PendingReferral.objects.filter(referrer_profile__user_id=account_id), "delete", {}
+
+
+# Ordered stages. Each stage is (name, callable returning (queryset, action, values)).
+# A stage is done once its queryset is empty, so re-running a stage is always safe.
+STAGES = [
+    ("game_history", _game_history),
+    ("daily_summaries", _daily_summaries),
+    ("season_points", _season_points),
+    ("referral_paths", _referral_paths),
+    ("referral_links", _referral_links),
+    ("referred_profiles", _referred_profiles),
+    ("redeemed_referrals", _redeemed_referrals),
+    ("pending_referrals", _pending_referrals),
+]
+FINAL_STAGE = "account"
+
+
+def _process_chunk(queryset, action, values, chunk_size):
+    """Delete or update at most `chunk_size` rows of `queryset`. Returns the row count."""
+    ids = list(queryset.order_by("pk").values_list("pk", flat=True)[:chunk_size])
+    if not ids:
+        return 0
+
+    with transaction.atomic():
+        chunk = queryset.model.objects.filter(pk__in=ids)
+        if action == "delete":
+            chunk.delete()
+        else:
+            chunk.update(**values)
+    return len(ids)
+
+
+def _update_progress(deletion, **fields):
+    AccountDeletionRequest.objects.filter(pk=deletion.pk).update(**fields)
+    for name, value in fields.items():
+        if not isinstance(value, F):
+            setattr(deletion, name, value)
+
+
+def process_deletion(deletion, chunk_size=500, pause=0.1, max_chunks=None):
+    """
+    Run (or resume) one deletion request.
+
+    Stages before `deletion.stage` are already finished and are skipped.
+    `pause` seconds are slept between chunks so the worker never saturates
+    the database. Returns True when the request is completed, False when it
+    stopped early because `max_chunks` was reached.
+    """
+    stage_names = [name for name, _ in STAGES] + [FINAL_STAGE]
+    start = stage_names.index(deletion.stage) if deletion.stage in stage_names else 0
+
+    if deletion.status != AccountDeletionRequest.Status.PROCESSING:
+        _update_progress(
+            deletion,
+            status=AccountDeletionRequest.Status.PROCESSING,
+            started_at=deletion.started_at or timezone.now(),
+        )
+
+    chunks = 0
+    for name, build in STAGES[start:]:
+        _update_progress(deletion, stage=name)
+        queryset, action, values = build(deletion.account_id)
+
+        while True:
+            if max_chunks is not None and chunks >= max_chunks:
+                return False
+
+            processed = _process_chunk(queryset, action, values, chunk_size)
+            if not processed:
+                break
+
+            chunks += 1
+            _update_progress(deletion, rows_processed=F("rows_processed") + processed)
+            logger.debug("Deletion %s: %s -> %s rows", deletion.pk, name, processed)
+            if pause:
+                time.sleep(pause)
+
+    # Only small rows are left (profile, wallet, token, allauth addresses),
+    # so the final cascade is cheap.
+    _update_progress(deletion, stage=FINAL_STAGE)
+    with transaction.atomic():
+        User.objects.filter(pk=deletion.account_id).delete()
+
+    # Chunk updates and deletes bypass the model signals that keep caches fresh
+    leaderboard_pages.invalidate_all()
+    room_results.invalidate_all()
+    profile_rows.invalidate_all()
+
+    _update_progress(
+        deletion,
+        status=AccountDeletionRequest.Status.COMPLETED,
+        completed_at=timezone.now(),
+        last_error="",
+    )
+    return True
+
+
+def record_failure(deletion, error):
+    """Count a failed run; the request is retried until MAX_ATTEMPTS is reached."""
+    attempts = deletion.attempts + 1
+    status = (
+        AccountDeletionRequest.Status.FAILED if attempts >= MAX_ATTEMPTS
+        else AccountDeletionRequest.Status.PENDING
+    )
+    _update_progress(deletion, attempts=attempts, status=status, last_error=str(error))
@@ -0,0 +1,95 @@
+"""
+Case-insensitive usernames and emails.
+
+User has unique Lower("email") and Lower("username") indexes. allauth (and
+dj-rest-auth, Django's password reset form) look users up with `__iexact`,
+which compiles to UPPER(col) = UPPER(%s) on PostgreSQL and LIKE on SQLite –
+neither can use those indexes. LowerIExact, registered as `iexact` on the two
+fields, compiles to LOWER(col) = LOWER(%s) instead, which matches the index
+expression; everything else about the lookup is unchanged.
+
+The indexes cannot be created while two rows differ only in case.
+`manage.py normalize_user_identifiers` lowercases emails and reports (or
+renames) such rows; run it before applying the constraints.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Lookup
+from django.db.models.functions import Lower, Trim
+
+
+class LowerIExact(Lookup):
+    lookup_name = "iexact"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"LOWER({lhs}) = LOWER({rhs})", (*lhs_params, *rhs_params)
+
+
+def duplicates(field, expression=None):
+    """{normalized value: [user ids, oldest first]} for values shared by more than one user."""
+    from src.services.user.models import User
+
+    expression = expression or Lower(field)
+    shared = (
+        User.objects.order_by()
+        .annotate(normalized=expression)
+        .values("normalized")
+        .annotate(users=Count("id"))
+        .filter(users__gt=1)
+        .values_list("normalized", flat=True)
+    )
+    groups = {}
+    rows = (
+        User.objects.annotate(normalized=expression)
+        .filter(normalized__in=shared)
+        .order_by("normalized", "pk")
+        .values_list("normalized", "pk")
+    )
+    for normalized, pk in rows:
+        groups.setdefault(normalized, []).append(pk)
+    return groups
+
+
+def normalize_emails(dry_run=False):
+    """
+    Lowercase and strip stored emails, as User.save() does for new rows.
+    Rows whose normalized email belongs to another user are left alone.
+    Returns (updated, conflicting user ids).
+    """
+    from src.services.user.models import User
+
+    normalized = Lower(Trim("email"))
+    conflicts = {pk for pks in duplicates("email", normalized).values() for pk in pks}
+    pending = (
+        User.objects.annotate(normalized=normalized)
+        .exclude(email=F("normalized"))
+        .exclude(pk__in=conflicts)
+    )
+    if dry_run:
+        return pending.count(), sorted(conflicts)
+    with transaction.atomic():
+        updated = User.objects.filter(pk__in=pending.values("pk")).update(email=normalized)
+    return updated, sorted(conflicts)
+
+
+def rename_duplicate_usernames(dry_run=False):
+    """
+    Keep the oldest of each group of usernames that differ only in case and
+    rename the others to "<username>_<id>". Returns {old username: new username}.
+    """
+    from src.services.user.caches import invalidate_user
+    from src.services.user.models import User
+
+    max_length = User._meta.get_field("username").max_length
+    renamed = {}
+    with transaction.atomic():
+        for pks in duplicates("username").values():
+            for user in User.objects.filter(pk__in=pks[1:]).only("pk", "username"):
+                suffix = f"_{user.pk}"
+                new = user.username[:max_length - len(suffix)] + suffix
+                renamed[user.username] = new
+                if not dry_run:
+                    User.objects.filter(pk=user.pk).update(username=new)
+                    invalidate_user(user.pk)
+    return renamed
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from src.services.user.counters import fold
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold sharded wallet coin and game point counters (COUNTER_SHARDS) back into "
+        "UserWallet.total_coins / UserProfile.total_game_points. Safe to run alongside "
+        "increments; run once more after unsetting COUNTER_SHARDS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep folding until stopped")
+        parser.add_argument("--interval", type=float, default=60, help="Seconds between folds with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            self.stdout.write(f"Folded {fold()} counters")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
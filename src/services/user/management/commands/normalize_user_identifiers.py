@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from src.services.user.identifiers import duplicates, normalize_emails, rename_duplicate_usernames
+
+
+class Command(BaseCommand):
+    help = (
+        "Prepare existing users for the case-insensitive unique constraints on email and "
+        "username: lowercase and strip stored emails, and report usernames that differ only "
+        "in case (--rename-duplicates renames all but the oldest). Fails while conflicts remain."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rename-duplicates", action="store_true",
+                            help="Rename usernames that clash with an older account to <username>_<id>")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        prefix = "Would update" if dry_run else "Updated"
+
+        updated, email_conflicts = normalize_emails(dry_run=dry_run)
+        self.stdout.write(f"{prefix} {updated} emails")
+
+        if options["rename_duplicates"]:
+            renamed = rename_duplicate_usernames(dry_run=dry_run)
+            for old, new in renamed.items():
+                self.stdout.write(f"  {old} -> {new}")
+            self.stdout.write(f"{'Would rename' if dry_run else 'Renamed'} {len(renamed)} usernames")
+        # A dry run of the renames would resolve every clash
+        username_conflicts = {} if options["rename_duplicates"] and dry_run else duplicates("username")
+
+        problems = []
+        if email_conflicts:
+            # Two accounts for one address need a human decision (merge or delete)
+            problems.append(f"users sharing an email up to case: {email_conflicts}")
+        for username, pks in username_conflicts.items():
+            problems.append(f"username '{username}' is used by users {pks}")
+        if problems:
+            raise CommandError("Resolve before adding the constraints:\n  " + "\n  ".join(problems))
+        self.stdout.write(self.style.SUCCESS("Emails and usernames are unique regardless of case"))
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from src.services.user.deletion import process_deletion, record_failure
+from src.services.user.models import AccountDeletionRequest
+
+
+class Command(BaseCommand):
+    help = (
+        "Process queued account deletions in bounded chunks. "
+        "Safe to stop at any time – the next run resumes from the recorded stage. "
+        "Run a single worker at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500, help="Rows deleted/updated per transaction")
+        parser.add_argument("--pause", type=float, default=0.1, help="Seconds to sleep between chunks")
+        parser.add_argument("--max-chunks", type=int, default=None, help="Stop a request after this many chunks")
+        parser.add_argument("--limit", type=int, default=None, help="Max requests to process in this run")
+        parser.add_argument("--loop", action="store_true", help="Keep polling for new requests")
+        parser.add_argument("--interval", type=float, default=60, help="Polling interval with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            self._run_once(options)
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+    def _run_once(self, options):
+        # PROCESSING requests were interrupted mid-way – resume them first
+        queue = AccountDeletionRequest.objects.filter(
+            status__in=[AccountDeletionRequest.Status.PROCESSING, AccountDeletionRequest.Status.PENDING]
+        ).order_by("-status", "requested_at")
+        if options["limit"]:
+            queue = queue[:options["limit"]]
+
+        for deletion in queue:
+            self.stdout.write(f"Account {deletion.account_id}: starting at stage '{deletion.stage or 'start'}'")
+            try:
+                done = process_deletion(
+                    deletion,
+                    chunk_size=options["chunk_size"],
+                    pause=options["pause"],
+                    max_chunks=options["max_chunks"],
+                )
+            except Exception as e:
+                record_failure(deletion, e)
+                self.stderr.write(f"Account {deletion.account_id}: failed at stage '{deletion.stage}': {e}")
+                continue
+
+            deletion.refresh_from_db()
+            if done:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Account {deletion.account_id}: deleted ({deletion.rows_processed} rows processed)"
+                ))
+            else:
+                self.stdout.write(
+                    f"Account {deletion.account_id}: paused at stage '{deletion.stage}' "
+                    f"({deletion.rows_processed} rows processed)"
+                )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from src.services.user.referrals import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the referral closure table (ReferralClosure) from UserProfile.referred_by: "
+        "backfills existing referrals and repairs the table after referred_by was edited "
+        "outside ProcessReferralAPIView. Runs in one transaction."
+    )
+
+    def handle(self, *args, **options):
+        rows = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Referral closure rebuilt: {rows} rows"))
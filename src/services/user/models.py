@@ -3,9 +3,12 @@ import uuid
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.db.models import F
+from django.db.models.functions import Lower
 from django_resized import ResizedImageField
 
 from core.settings import BASE_URL
+from src.services.user.caches import wallets
+from src.services.user.identifiers import LowerIExact
 
 
 def user_avatar_path(instance, filename):
@@ -17,6 +20,14 @@ class User(AbstractUser):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Case-insensitive uniqueness, and the indexes behind `iexact` lookups
+            # (src/services/user/identifiers.py)
+            models.UniqueConstraint(Lower("email"), name="user_email_ci_unique"),
+            models.UniqueConstraint(Lower("username"), name="user_username_ci_unique"),
+        ]
+
     def save(self, *args, **kwargs):
         self.email = self.email.lower().strip() if self.email else self.email
         super().save(*args, **kwargs)
@@ -29,6 +40,10 @@ class User(AbstractUser):
         return self.email or self.username
 
 
+User._meta.get_field("email").register_lookup(LowerIExact)
+User._meta.get_field("username").register_lookup(LowerIExact)
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     bio = models.TextField(blank=True, null=True)
@@ -62,7 +77,8 @@ class UserProfile(models.Model):
 
     @property
     def available_game_points(self):
-        return self.total_game_points - self.used_game_points
+        from src.services.user import counters
+        return self.total_game_points + counters.pending(counters.GAME_POINTS, self.user_id) - self.used_game_points
 
     @property
     def referral_link(self):
@@ -104,29 +120,35 @@ class UserWallet(models.Model):
 
     @property
     def available_coins(self):
-        return self.total_coins - self.used_coins
+        from src.services.user import counters
+        return self.total_coins + counters.pending(counters.COINS, self.user_id) - self.used_coins
 
     def increment_coins(self, amount):
+        from src.services.user import counters
         if amount <= 0:
             raise ValueError("Amount must be positive")
-        updated = UserWallet.objects.filter(user=self.user).update(
-            total_coins=F('total_coins') + amount
-        )
+        # Goes to a counter shard while COUNTER_SHARDS is set
+        updated = counters.increment(counters.COINS, self.user_id, amount)
         if updated:
+            wallets.invalidate(self.user_id)
             self.refresh_from_db()
         return updated
 
     def decrement_coins(self, amount):
+        from src.services.user import counters
         if amount <= 0:
             raise ValueError("Amount must be positive")
-        updated = UserWallet.objects.filter(
+        updated = UserWallet.objects.alias(
+            coins=counters.total_expression(counters.COINS)
+        ).filter(
             user=self.user,
-            total_coins__gte=F('used_coins') + amount
+            coins__gte=F('used_coins') + amount
         ).update(
             used_coins=F('used_coins') + amount
         )
         if not updated:
             raise ValueError("Insufficient coins")
+        wallets.invalidate(self.user_id)
         self.refresh_from_db()
         return True
 
@@ -134,20 +156,78 @@ class UserWallet(models.Model):
         return f"{self.user} – {self.available_coins} coins"
 
 
+class CounterShard(models.Model):
+    """
+    Part of a hot per-user counter (UserWallet.total_coins,
+    UserProfile.total_game_points) while COUNTER_SHARDS is set: increments go
+    to one of N rows chosen at random instead of all locking the main row.
+    The counter's value is the main column plus its shards;
+    `manage.py fold_counter_shards` moves the shards back into the main row
+    (src/services/user/counters.py).
+    """
+
+    class Counter(models.TextChoices):
+        COINS = "coins", "UserWallet.total_coins"
+        GAME_POINTS = "game_points", "UserProfile.total_game_points"
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='counter_shards', db_index=False)
+    counter = models.CharField(max_length=20, choices=Counter.choices)
+    shard = models.PositiveSmallIntegerField()
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'counter', 'shard'], name='unique_counter_shard'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.counter}[{self.shard}] = {self.value}"
+
+
+class ReferralClosure(models.Model):
+    """
+    Transitive closure of the UserProfile.referred_by tree: one row per
+    (ancestor, descendant) pair, `depth` levels apart (1 = direct referral).
+    Profiles have no row for themselves. Maintained by
+    src/services/user/referrals.py; `manage.py rebuild_referral_closure`
+    rebuilds it from referred_by.
+    """
+    ancestor = models.ForeignKey(
+        UserProfile, on_delete=models.CASCADE, related_name='descendant_links', db_index=False
+    )
+    descendant = models.ForeignKey(
+        UserProfile, on_delete=models.CASCADE, related_name='ancestor_links', db_index=False
+    )
+    depth = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            # Also the upline lookup: descendant = %s
+            models.UniqueConstraint(fields=['descendant', 'ancestor'], name='unique_referral_path'),
+        ]
+        indexes = [
+            # Downline by level, and the join to the descendants' profiles
+            models.Index(fields=['ancestor', 'depth', 'descendant']),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
+
 class PendingReferral(models.Model):
     """
     Tracks a potential referral when a visitor clicks a shared referral link.
     Created when a visitor clicks a download button and includes the referral code
     and the visitor's public IP address. Later matched at signup time.
     """
-    referral_code = models.CharField(max_length=50, db_index=True)
+    referral_code = models.CharField(max_length=50)  # Indexed with clicked_at below
     referrer_profile = models.ForeignKey(
         'UserProfile',
         on_delete=models.CASCADE,
         related_name='pending_referrals',
         help_text="The user profile that owns this referral code"
     )
-    ip_address = models.GenericIPAddressField(db_index=True, help_text="IPv4 or IPv6 address")
+    ip_address = models.GenericIPAddressField(help_text="IPv4 or IPv6 address")  # Indexed with redeemed_at below
     clicked_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     # Redemption tracking
@@ -175,4 +255,54 @@ class PendingReferral(models.Model):
         return f"{self.referral_code} - {self.ip_address} ({status})"
 
     def is_redeemed(self):
-        return self.redeemed_at is not None
\ No newline at end of file
+        return self.redeemed_at is not None
+
+class AccountDeletionRequest(models.Model):
+    """
+    Queued account deletion. DeleteUserAPIView only deactivates the account and
+    records a request; the `process_account_deletions` worker removes the data
+    in small chunks so one heavy account never holds long locks.
+    The policy allows up to 30 days for processing (see `due_at`).
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSING = "processing", "Processing"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='deletion_requests',
+        help_text="NULL once the account itself has been removed"
+    )
+    account_id = models.PositiveBigIntegerField(
+        db_index=True,
+        help_text="Id of the deleted account, kept after the user row is gone"
+    )
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+
+    # Progress tracking – lets the worker resume where it stopped
+    stage = models.CharField(max_length=40, blank=True, default="")
+    rows_processed = models.PositiveBigIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+
+    requested_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    due_at = models.DateTimeField(help_text="Policy deadline (requested_at + 30 days)")
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Account Deletion Request"
+        verbose_name_plural = "Account Deletion Requests"
+        indexes = [
+            models.Index(fields=['status', 'requested_at']),
+        ]
+        ordering = ['requested_at']
+
+    def __str__(self):
+        return f"Deletion of account {self.account_id} ({self.status})"
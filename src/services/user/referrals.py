@@ -0,0 +1,137 @@
+"""
+Referral network on top of the ReferralClosure table.
+
+UserProfile.referred_by only links a profile to its direct referrer, so
+walking the tree takes one query per level. ReferralClosure stores every
+(ancestor, descendant) pair with their distance instead: the whole upline
+or downline of a profile is one indexed lookup, and the network leaderboard
+is one indexed join per direction.
+
+`link()` adds the rows of a new referred_by link and must run in the
+transaction that sets it (ProcessReferralAPIView). Account deletion drops
+the paths through the deleted profile (src/services/user/deletion.py);
+`rebuild()` (`manage.py rebuild_referral_closure`) recreates the table from
+referred_by, e.g. for existing data or after editing referred_by by hand.
+"""
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, Value
+
+from src.services.user.cards import user_cards
+from src.services.user.models import ReferralClosure, UserProfile
+
+BATCH_SIZE = 2000
+# Levels up and down the tree included in the network leaderboard
+NETWORK_DEPTH = 3
+
+
+def would_cycle(profile_id, referrer_id):
+    """True if `referrer_id` is `profile_id` itself or was referred (indirectly) by it."""
+    return profile_id == referrer_id or ReferralClosure.objects.filter(
+        ancestor_id=profile_id, descendant_id=referrer_id
+    ).exists()
+
+
+def link(profile_id, referrer_id):
+    """
+    Add the closure rows for `referrer_id` referring `profile_id`: every
+    ancestor of the referrer (and the referrer) gets every descendant of the
+    profile (and the profile). Returns the number of rows added.
+    """
+    descendants = [(profile_id, 0), *ReferralClosure.objects.filter(ancestor_id=profile_id).values_list("descendant_id", "depth")]
+    if any(descendant == referrer_id for descendant, _ in descendants):
+        raise ValueError(f"Profile {referrer_id} is in the referral network of profile {profile_id}")
+    ancestors = [(referrer_id, 0), *ReferralClosure.objects.filter(descendant_id=referrer_id).values_list("ancestor_id", "depth")]
+    rows = [
+        ReferralClosure(ancestor_id=ancestor, descendant_id=descendant, depth=up + down + 1)
+        for ancestor, up in ancestors
+        for descendant, down in descendants
+    ]
+    ReferralClosure.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
+
+
+def _insert(pairs, depth):
+    pairs = iter(pairs)
+    while batch := list(islice(pairs, BATCH_SIZE)):
+        ReferralClosure.objects.bulk_create(
+            [ReferralClosure(ancestor_id=a, descendant_id=d, depth=depth) for a, d in batch if a != d],
+            # A pair already present at a lower depth means referred_by has a cycle
+            ignore_conflicts=True,
+        )
+
+
+def rebuild():
+    """Recreate the whole table from UserProfile.referred_by, level by level. Returns the row count."""
+    with transaction.atomic():
+        ReferralClosure.objects.all().delete()
+        _insert(UserProfile.objects.filter(referred_by__isnull=False).values_list("referred_by_id", "pk").iterator(), 1)
+        depth = 1
+        while ReferralClosure.objects.filter(depth=depth).exists():
+            # Extend each path of `depth` levels by the descendant's direct referrals
+            longer = (
+                ReferralClosure.objects.filter(depth=depth, descendant__referrals__isnull=False)
+                .values_list("ancestor_id", "descendant__referrals__id")
+            )
+            depth += 1
+            _insert(longer.iterator(), depth)
+        return ReferralClosure.objects.count()
+
+
+def level_counts(profile_id):
+    """[{"depth": 1, "referrals": n}, ...]: the profile's downline per level."""
+    return list(
+        ReferralClosure.objects.filter(ancestor_id=profile_id)
+        .values("depth")
+        .annotate(referrals=Count("descendant_id"))
+        .order_by("depth")
+    )
+
+
+def network_queryset(profile_id, depth=NETWORK_DEPTH):
+    """
+    The profile's network – itself, its upline and downline up to `depth`
+    levels – as (player, points, level) rows, best first. `level` is
+    positive for referrals, negative for referrers and 0 for the profile.
+    Points are UserProfile.total_game_points; with COUNTER_SHARDS set they
+    lag behind until the next fold (src/services/user/counters.py).
+    """
+    level = IntegerField()
+    downline = ReferralClosure.objects.filter(ancestor_id=profile_id, depth__lte=depth).values(
+        player=F("descendant__user_id"),
+        points=F("descendant__total_game_points"),
+        level=ExpressionWrapper(F("depth"), output_field=level),
+    )
+    upline = ReferralClosure.objects.filter(descendant_id=profile_id, depth__lte=depth).values(
+        player=F("ancestor__user_id"),
+        points=F("ancestor__total_game_points"),
+        level=ExpressionWrapper(-F("depth"), output_field=level),
+    )
+    own = UserProfile.objects.filter(pk=profile_id).values(
+        player=F("user_id"),
+        points=F("total_game_points"),
+        level=Value(0, output_field=level),
+    )
+    return own.union(downline, upline, all=True).order_by("-points", "player")
+
+
+def network_leaderboard(profile_id, page_size, offset, depth=NETWORK_DEPTH):
+    """(count, results) of one page of the network leaderboard."""
+    network = network_queryset(profile_id, depth)
+    count = network.count()
+    rows = list(network[offset:offset + page_size])
+
+    cards = user_cards([row["player"] for row in rows])
+    results = []
+    for idx, row in enumerate(rows):
+        card = cards.get(row["player"])
+        results.append({
+            "rank": offset + idx + 1,
+            "user_id": row["player"],
+            "username": card and card.username,
+            "avatar": card and card.avatar,
+            "total_points": row["points"],
+            "level": row["level"],
+        })
+    return count, results
@@ -1,6 +1,7 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from src.services.user.caches import cards, profile_rows, referral_codes, wallets
 from src.services.user.models import User, UserProfile, UserWallet
 
 
@@ -13,3 +14,21 @@ def create_user_profile(sender, instance, created, **kwargs):
 def create_user_wallet(sender, instance, created, **kwargs):
     if created:
         UserWallet.objects.create(user=instance)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_card(sender, instance, update_fields=None, **kwargs):
+    # Skips the last_login update of every login
+    if update_fields is None or "username" in update_fields:
+        cards.invalidate(instance.pk)
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_profile_caches(sender, instance, **kwargs):
+    profile_rows.invalidate(instance.user_id)
+    cards.invalidate(instance.user_id)
+    if instance.referral_code:
+        referral_codes.invalidate(instance.referral_code)
+
+@receiver([post_save, post_delete], sender=UserWallet)
+def invalidate_wallet_cache(sender, instance, **kwargs):
+    wallets.invalidate(instance.user_id)
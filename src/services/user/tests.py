@@ -1,3 +1,401 @@
-from django.test import TestCase
+import datetime
+import io
+from unittest import mock
 
-# Create your tests here.
+from allauth.account.models import EmailAddress
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from src.api.auth.views import DeleteUserAPIView
+from src.api.v1.user.serializers import UserProfileSerializer, user_profile_plan
+from src.services.game.models import GameHistory, PlayerDailySummary, Season, SeasonPoints
+from src.services.user import counters, referrals
+from src.services.user import deletion as deletion_module
+from src.services.user.caches import invalidate_user
+from src.services.user.deletion import MAX_ATTEMPTS, process_deletion, record_failure, schedule_account_deletion
+from src.services.user.models import (
+    AccountDeletionRequest, CounterShard, PendingReferral, ReferralClosure, User, UserProfile, UserWallet,
+)
+
+
+class UserProfileReadPlanTests(TestCase):
+    """The compiled read path must return exactly what UserProfileSerializer returns."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.referrer = User.objects.create_user("referrer", "referrer@example.com", "pass")
+        cls.user = User.objects.create_user("player", "player@example.com", "pass")
+        UserProfile.objects.filter(user=cls.user).update(
+            bio="Plays ünïcode 🎲", location="Lagos", birth_date=datetime.date(1999, 12, 31),
+            avatar="avatars/a b/c.jpg", referred_by=cls.referrer.profile, total_referrals=3,
+            total_game_points=1200, used_game_points=300,
+        )
+
+    def assertSameOutput(self, user, request=None):
+        context = {"request": request} if request else {}
+        profile = UserProfile.objects.get(user=user)
+        row = UserProfile.objects.filter(user=user).values(*user_profile_plan.columns).get()
+        self.assertEqual(user_profile_plan.one(row, request), UserProfileSerializer(profile, context=context).data)
+
+    def test_empty_profile(self):
+        self.assertSameOutput(self.referrer)
+
+    def test_filled_profile(self):
+        self.assertSameOutput(self.user)
+
+    def test_absolute_avatar_url_with_request(self):
+        request = APIRequestFactory().get("/api/v1/user/profile/", secure=True)
+        self.assertSameOutput(self.user, request)
+        self.assertSameOutput(self.referrer, request)
+
+    def test_profile_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get("/api/v1/user/profile/", secure=True)
+        self.assertEqual(response.status_code, 200)
+        profile = UserProfile.objects.get(user=self.user)
+        expected = UserProfileSerializer(profile, context={"request": response.wsgi_request}).data
+        self.assertEqual(response.json(), expected)
+        self.assertEqual(response.json()["available_game_points"], 900)
+
+
+class CaseInsensitiveIdentifierTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Player", "player@example.com", "pass")
+        cls.other = User.objects.create(username="other", email="other@example.com")
+
+    def test_iexact_uses_lower(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(User.objects.get(username__iexact="PLAYER"), self.user)
+            self.assertEqual(User.objects.get(email__iexact="Player@Example.COM"), self.user)
+        self.assertIn('LOWER("user_user"."username") = LOWER(', captured[0]["sql"])
+        self.assertIn('LOWER("user_user"."email") = LOWER(', captured[1]["sql"])
+        # LIKE wildcards are plain characters, as with the built-in iexact
+        self.assertFalse(User.objects.filter(username__iexact="pl_yer").exists())
+
+    def test_unique_regardless_of_case(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create(username="PLAYER", email="someone@example.com")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.filter(pk=self.other.pk).update(email="PLAYER@example.com")
+
+    def test_login_with_other_case(self):
+        EmailAddress.objects.create(user=self.user, email=self.user.email, verified=True, primary=True)
+        response = APIClient().post(
+            "/api/auth/login/", {"username": "pLAYER", "password": "pass"}, format="json", secure=True
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_username_update_rejects_other_case(self):
+        client = APIClient()
+        client.force_authenticate(self.other)
+        response = client.patch("/api/v1/user/detail/", {"username": "PLAYER"}, format="json", secure=True)
+        self.assertEqual(response.status_code, 400)
+        response = client.patch("/api/v1/user/detail/", {"username": "Other"}, format="json", secure=True)
+        self.assertEqual(response.status_code, 200)
+
+    def test_normalize_emails(self):
+        User.objects.filter(pk=self.other.pk).update(email="  Other@Example.COM ")
+        out = io.StringIO()
+        call_command("normalize_user_identifiers", "--dry-run", stdout=out)
+        self.assertIn("Would update 1 emails", out.getvalue())
+        self.assertEqual(User.objects.get(pk=self.other.pk).email, "  Other@Example.COM ")
+
+        call_command("normalize_user_identifiers", stdout=io.StringIO())
+        self.assertEqual(User.objects.get(pk=self.other.pk).email, "other@example.com")
+
+
+@override_settings(COUNTER_SHARDS=4)
+class CounterShardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="owner", email="owner@example.com")
+        UserWallet.objects.filter(user=cls.user).update(total_coins=10)
+        UserProfile.objects.filter(user=cls.user).update(total_game_points=1000)
+
+    def setUp(self):
+        invalidate_user(self.user.pk)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, path):
+        response = self.client.get(path, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_increments_go_to_shards(self):
+        wallet = self.user.get_wallet()
+        for _ in range(20):
+            wallet.increment_coins(1)
+        self.assertEqual(UserWallet.objects.get(user=self.user).total_coins, 10)
+        shards = CounterShard.objects.filter(user=self.user, counter=counters.COINS)
+        self.assertLessEqual(shards.count(), 4)
+        self.assertEqual(sum(shard.value for shard in shards), 20)
+        self.assertEqual(wallet.available_coins, 30)
+        self.assertEqual(self.get("/api/v1/user/wallet/"), {"available_coins": 30})
+
+    def test_fold(self):
+        counters.increment(counters.COINS, self.user.pk, 5)
+        counters.increment(counters.GAME_POINTS, self.user.pk, 7)
+        self.assertEqual(self.get("/api/v1/user/wallet/"), {"available_coins": 15})
+
+        out = io.StringIO()
+        call_command("fold_counter_shards", stdout=out)
+        self.assertIn("Folded 2 counters", out.getvalue())
+        self.assertFalse(CounterShard.objects.exists())
+        self.assertEqual(UserWallet.objects.get(user=self.user).total_coins, 15)
+        self.assertEqual(UserProfile.objects.get(user=self.user).total_game_points, 1007)
+        self.assertEqual(self.get("/api/v1/user/wallet/"), {"available_coins": 15})
+
+    def test_decrement_counts_shards(self):
+        wallet = self.user.get_wallet()
+        wallet.increment_coins(20)
+        wallet.decrement_coins(25)
+        with self.assertRaises(ValueError):
+            wallet.decrement_coins(6)
+        self.assertEqual(wallet.available_coins, 5)
+
+    def test_points_profile_and_redeem(self):
+        counters.increment(counters.GAME_POINTS, self.user.pk, 500)
+        self.assertEqual(self.get("/api/v1/user/profile/")["available_game_points"], 1500)
+
+        response = self.client.post("/api/v1/user/wallet/redeem/", {"coins": 16}, format="json", secure=True)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post("/api/v1/user/wallet/redeem/", {"coins": 15}, format="json", secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"coins_awarded": 15, "available_game_points": 0, "available_coins": 25})
+
+    @override_settings(COUNTER_SHARDS=0)
+    def test_disabled_updates_main_row(self):
+        self.assertEqual(counters.increment(counters.COINS, self.user.pk, 3), 1)
+        self.assertEqual(counters.increment(counters.COINS, 0, 3), 0)
+        self.assertFalse(CounterShard.objects.exists())
+        self.assertEqual(UserWallet.objects.get(user=self.user).total_coins, 13)
+
+
+class ReferralNetworkTests(TestCase):
+    """root -> a -> b -> c, root -> d"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {}
+        for points, name in enumerate(["root", "a", "b", "c", "d"]):
+            cls.users[name] = User.objects.create(username=name, email=f"{name}@example.com")
+            UserProfile.objects.filter(user=cls.users[name]).update(total_game_points=points * 100)
+
+    def profile(self, name):
+        return UserProfile.objects.get(user=self.users[name])
+
+    def refer(self, name, referrer):
+        client = APIClient()
+        client.force_authenticate(self.users[name])
+        return client.post(
+            "/api/v1/user/process-referral/", {"referral_code": self.profile(referrer).referral_code},
+            format="json", secure=True,
+        )
+
+    def build(self):
+        # b joins a's network before a joins root's: link() must carry b along
+        for name, referrer in [("b", "a"), ("c", "b"), ("a", "root"), ("d", "root")]:
+            self.assertEqual(self.refer(name, referrer).status_code, 200)
+
+    def closure(self):
+        return set(ReferralClosure.objects.values_list("ancestor__user__username", "descendant__user__username", "depth"))
+
+    def test_closure_matches_rebuild(self):
+        self.build()
+        expected = {
+            ("root", "a", 1), ("root", "b", 2), ("root", "c", 3), ("root", "d", 1),
+            ("a", "b", 1), ("a", "c", 2), ("b", "c", 1),
+        }
+        self.assertEqual(self.closure(), expected)
+        out = io.StringIO()
+        call_command("rebuild_referral_closure", stdout=out)
+        self.assertIn("7 rows", out.getvalue())
+        self.assertEqual(self.closure(), expected)
+
+    def test_cycle_is_ignored(self):
+        self.build()
+        self.assertEqual(self.refer("root", "c").status_code, 200)
+        self.assertIsNone(self.profile("root").referred_by_id)
+        with self.assertRaises(ValueError):
+            referrals.link(self.profile("root").pk, self.profile("c").pk)
+
+    def test_concurrent_submit_keeps_first_referrer(self):
+        # d's other device links d to a between this request's check and its transaction
+        would_cycle = referrals.would_cycle
+
+        def concurrent(descendant_id, ancestor_id):
+            UserProfile.objects.filter(pk=descendant_id).update(referred_by=self.profile("a"))
+            referrals.link(descendant_id, self.profile("a").pk)
+            return would_cycle(descendant_id, ancestor_id)
+
+        with mock.patch.object(referrals, "would_cycle", side_effect=concurrent):
+            self.assertEqual(self.refer("d", "root").status_code, 200)
+        self.assertEqual(self.profile("d").referred_by_id, self.profile("a").pk)
+        self.assertEqual(self.closure(), {("a", "d", 1)})
+        self.assertEqual(self.profile("root").total_referrals, 0)
+
+    def test_level_counts(self):
+        self.build()
+        client = APIClient()
+        client.force_authenticate(self.users["root"])
+        response = client.get("/api/v1/user/referrals/", secure=True)
+        self.assertEqual(response.json(), {
+            "total": 4,
+            "levels": [{"depth": 1, "referrals": 2}, {"depth": 2, "referrals": 1}, {"depth": 3, "referrals": 1}],
+        })
+
+    def test_network_leaderboard(self):
+        self.build()
+        client = APIClient()
+        client.force_authenticate(self.users["b"])
+        response = client.get("/api/v1/user/referrals/leaderboard/", secure=True)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["count"], 4)  # d is not in b's line
+        self.assertEqual(
+            [(entry["rank"], entry["username"], entry["total_points"], entry["level"]) for entry in data["results"]],
+            [(1, "c", 300, 1), (2, "b", 200, 0), (3, "a", 100, -1), (4, "root", 0, -2)],
+        )
+        response = client.get("/api/v1/user/referrals/leaderboard/", {"page": 2, "page_size": 3}, secure=True)
+        self.assertEqual([entry["username"] for entry in response.json()["results"]], ["root"])
+
+    def test_account_deletion_detaches_subtree(self):
+        self.build()
+        process_deletion(schedule_account_deletion(self.users["a"]), pause=0)
+        self.assertEqual(self.closure(), {("root", "d", 1), ("b", "c", 1)})
+        referrals.rebuild()
+        self.assertEqual(self.closure(), {("root", "d", 1), ("b", "c", 1)})
+
+
+class AccountDeletionTests(TestCase):
+    """`gone` referred `kept` and was referred by `referrer`; `other` is an unrelated player."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.gone, cls.kept, cls.referrer, cls.other = [
+            User.objects.create_user(username=name, email=f"{name}@example.com", password="old-password-1")
+            for name in ("gone", "kept", "referrer", "other")
+        ]
+        for user, referrer in [(cls.gone, cls.referrer), (cls.kept, cls.gone)]:
+            UserProfile.objects.filter(user=user).update(referred_by=referrer.profile)
+            referrals.link(user.profile.pk, referrer.profile.pk)
+
+        now = timezone.now()
+        GameHistory.objects.bulk_create([
+            GameHistory(
+                match_id=f"{player.username}-{i}", player=player, game_type="solo", game_mode="timed",
+                operation="addition", grid_size=4, timestamp=now, status="completed",
+                final_score=i, points_earned=i, accuracy_percentage=90.0,
+            )
+            for player, games in [(cls.gone, 5), (cls.other, 2)] for i in range(games)
+        ])
+        PlayerDailySummary.objects.create(player=cls.gone, day=now.date(), games=3, points=30)
+        season = Season.objects.create(number=1, starts_at=now)
+        SeasonPoints.objects.create(season=season, player=cls.gone, points=10, games=5)
+        PendingReferral.objects.bulk_create([
+            PendingReferral(referral_code="GONE", referrer_profile=cls.gone.profile, ip_address=f"10.0.0.{i}")
+            for i in range(3)
+        ] + [
+            PendingReferral(referral_code="REF", referrer_profile=cls.referrer.profile, ip_address="10.0.1.1",
+                            redeemed_by=cls.gone, redeemed_at=now),
+        ])
+
+    def test_resumed_run(self):
+        deletion = schedule_account_deletion(self.gone)
+        self.assertEqual(schedule_account_deletion(self.gone), deletion)
+
+        # Stops after two chunks of two games, and resumes from there
+        self.assertFalse(process_deletion(deletion, chunk_size=2, pause=0, max_chunks=2))
+        deletion.refresh_from_db()
+        self.assertEqual((deletion.status, deletion.stage, deletion.rows_processed), ("processing", "game_history", 4))
+        self.assertEqual(GameHistory.objects.filter(player=self.gone).count(), 1)
+
+        # A failing stage keeps the progress before it
+        def broken(account_id):
+            raise RuntimeError("connection lost")
+
+        def replace(stage):
+            return [(name, broken if name == stage else build) for name, build in deletion_module.STAGES]
+
+        with mock.patch.object(deletion_module, "STAGES", replace("referred_profiles")), \
+                self.assertRaises(RuntimeError) as failure:
+            process_deletion(deletion, chunk_size=2, pause=0)
+        record_failure(deletion, failure.exception)
+        deletion.refresh_from_db()
+        self.assertEqual(
+            (deletion.status, deletion.stage, deletion.attempts, deletion.last_error),
+            ("pending", "referred_profiles", 1, "connection lost"),
+        )
+        self.assertFalse(GameHistory.objects.filter(player=self.gone).exists())
+        self.assertFalse(ReferralClosure.objects.filter(
+            Q(ancestor__user=self.gone) | Q(descendant__user=self.gone)
+        ).exists())
+        rows_before = deletion.rows_processed
+
+        # Finished stages are not run again
+        with mock.patch.object(deletion_module, "STAGES", replace("game_history")):
+            self.assertTrue(process_deletion(deletion, chunk_size=2, pause=0))
+        deletion.refresh_from_db()
+        self.assertEqual((deletion.status, deletion.stage, deletion.last_error), ("completed", "account", ""))
+        # kept's referred_by, the redeemed click and gone's three clicks (two chunks)
+        self.assertEqual(deletion.rows_processed, rows_before + 5)
+
+        # Deleted: the account and everything that was only gone's
+        self.assertFalse(User.objects.filter(pk=self.gone.pk).exists())
+        self.assertFalse(UserProfile.objects.filter(user_id=self.gone.pk).exists())
+        self.assertFalse(PlayerDailySummary.objects.filter(player_id=self.gone.pk).exists())
+        self.assertFalse(SeasonPoints.objects.filter(player_id=self.gone.pk).exists())
+        self.assertFalse(PendingReferral.objects.filter(referral_code="GONE").exists())
+        # Anonymized: what belongs to others
+        self.assertIsNone(UserProfile.objects.get(user=self.kept).referred_by)
+        self.assertIsNone(PendingReferral.objects.get(referral_code="REF").redeemed_by)
+        self.assertEqual(GameHistory.objects.filter(player=self.other).count(), 2)
+        self.assertEqual(ReferralClosure.objects.count(), 0)
+
+    def test_gives_up_after_max_attempts(self):
+        deletion = schedule_account_deletion(self.gone)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            record_failure(deletion, "boom")
+            deletion.refresh_from_db()
+            self.assertEqual(deletion.attempts, attempt)
+        self.assertEqual(deletion.status, "failed")
+        # The worker only picks pending and processing requests
+        out = io.StringIO()
+        call_command("process_account_deletions", "--pause", "0", stdout=out)
+        self.assertTrue(User.objects.filter(pk=self.gone.pk).exists())
+
+    def test_endpoint_deactivates_and_queues(self):
+        token = Token.objects.create(user=self.gone)
+
+        def post(password):
+            request = APIRequestFactory().post("/api/auth/delete/", {"password": password}, format="json", secure=True)
+            force_authenticate(request, user=self.gone)
+            return DeleteUserAPIView.as_view()(request)
+
+        self.assertEqual(post("wrong-password").status_code, 400)
+        self.assertTrue(User.objects.get(pk=self.gone.pk).is_active)
+
+        response = post("old-password-1")
+        self.assertEqual(response.status_code, 202)
+        deletion = AccountDeletionRequest.objects.get(account_id=self.gone.pk)
+        self.assertEqual(response.data["due_at"], deletion.due_at)
+        self.assertFalse(User.objects.get(pk=self.gone.pk).is_active)
+        self.assertFalse(Token.objects.filter(pk=token.pk).exists())
+        # Nothing is deleted until the worker runs
+        self.assertEqual(GameHistory.objects.filter(player=self.gone).count(), 5)
+
+        out = io.StringIO()
+        call_command("process_account_deletions", "--pause", "0", stdout=out)
+        self.assertIn(f"Account {self.gone.pk}: deleted", out.getvalue())
+        self.assertFalse(User.objects.filter(pk=self.gone.pk).exists())
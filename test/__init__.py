@@ -1,2 +0,0 @@
-from .user import *
-from .game import *
\ No newline at end of file